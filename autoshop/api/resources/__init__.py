@@ -1,4 +1,5 @@
 from .account import (
+    AccountBalanceResource,
     AccountEntriesList,
     AccountEntriesResource,
     AccountList,
@@ -8,7 +9,7 @@ from .account_type import AccountTypeList, AccountTypeResource
 from .vehicle import VehicleList, VehicleResource
 from .customer import CustomerList, CustomerResource
 from .entity import EntityList, EntityResource, EntityVendorList, EntityVendorResource
-from .entry import EntryList, EntryResource
+from .entry import EntryBatch, EntryList, EntryResource
 from .payment_type import PaymentTypeList, PaymentTypeResource
 from .customer_type import CustomerTypeList, CustomerTypeResource
 from .role import RoleList, RoleResource
@@ -36,8 +37,10 @@ from .local_purchase_order import LocalPurchaseOrderResource, LocalPurchaseOrder
 from .lpo_item import LpoItemResource, LpoItemList
 from .expense import ExpenseResource, ExpenseList
 from .commission_account import CommissionAccountList, CommissionAccountResource
+from .charge import ChargeQuote
 
 __all__ = [
+    "ChargeQuote",
     "ItemEntriesResource",
     "ItemEntriesList",
     "CommissionAccountList",
@@ -81,6 +84,7 @@ __all__ = [
     "AccountTypeResource",
     "AccountTypeList",
     "AccountResource",
+    "AccountBalanceResource",
     "AccountList",
     "AccountEntriesList",
     "AccountEntriesResource",
@@ -90,6 +94,7 @@ __all__ = [
     "SettingList",
     "EntryResource",
     "EntryList",
+    "EntryBatch",
     "TransactionTypeResource",
     "TransactionTypeList",
     "RoleResource",
@@ -5,6 +5,9 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from autoshop.models import AccessLog
 from autoshop.extensions import ma, db
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from flask_jwt_extended import get_jwt_identity
 from marshmallow import validate
@@ -35,9 +38,10 @@ class AccessLogResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, access_log_id):
-        schema = AccessLogSchema()
-        access_log = AccessLog.query.get_or_404(access_log_id)
-        return {'access_log': schema.dump(access_log).data}
+        schema = select_fields(AccessLogSchema())
+        access_log = load_fields(AccessLog.query, schema).get_or_404(access_log_id)
+        state = object_validator(access_log)
+        return not_modified(state) or with_validator({'access_log': schema.dump(access_log).data}, state)
 
 
 class AccessLogList(Resource):
@@ -73,5 +77,5 @@ class AccessLogList(Resource):
             return ({'msg': 'access_log created',
                      'access_log': schema.dump(access_log).data}, 201)
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': 'post error', 'exception': e.args}, 500)
@@ -1,20 +1,52 @@
-from flask import request
+from datetime import date, datetime
+
+from flask import request, url_for
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
-from autoshop.commons.dbaccess import query
-from autoshop.commons.pagination import paginate
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.dbaccess import stream
+from autoshop.commons.fieldsets import load_fields, select_fields
+from autoshop.commons.loader import BatchedSchema
+from autoshop.commons.pagination import (
+    DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, int_arg, paginate
+)
+from autoshop.commons.streaming import stream_json
 from autoshop.extensions import db, ma
-from autoshop.models import Account, Customer, Entity, Vendor
+from autoshop.models import (
+    Account, AccountBalanceSnapshot, AccountHold, Customer, Entity, Entry, Vendor
+)
+from autoshop.models.account import (
+    ACCOUNT_AVAILABLE, ACCOUNT_BALANCES, ACCOUNT_NAMES, ACCOUNT_WALLETS
+)
+from autoshop.models.base_mixin import CREATORS
+
 
+LEDGER = """ V.entry_id,account_id,B.uuid,H.name, V.reference, V.tran_type,V.tran_category,
+    V.date_created,amount, e.name as entity_id FROM account_ledgers AS V
+    inner join accounts AS B on B.id=V.account_id inner join account_holders H on
+    B.owner_id=H.uuid inner join entity e on e.uuid=V.entity_id """
+LEDGER_ORDER = " order by V.date_created desc,  V.entry_id desc, V.amount desc"
 
-class AccountSchema(ma.ModelSchema):
+
+class AccountSchema(BatchedSchema, ma.ModelSchema):
     minimum_balance = ma.Integer(required=True)
+
+    loaders = {
+        "creator": (CREATORS, lambda o: [o.created_by]),
+        "balance": (ACCOUNT_BALANCES, lambda o: [o.id]),
+        "available": (ACCOUNT_AVAILABLE, lambda o: [o.id]),
+        "name": (ACCOUNT_NAMES, lambda o: [o.id]),
+        "wallets": (ACCOUNT_WALLETS, lambda o: [o.id]),
+    }
+    requires = {"balance": (), "available": (), "name": (), "wallets": ()}
+
     class Meta:
         model = Account
         sqla_session = db.session
 
-        additional = ("creator", "balance", "name", "wallets")
+        additional = ("creator", "balance", "available", "name", "wallets")
 
 
 class AccountResource(Resource):
@@ -24,9 +56,10 @@ class AccountResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, account_id):
-        schema = AccountSchema()
-        account = Account.query.get_or_404(account_id)
-        return {"account": schema.dump(account).data}
+        schema = select_fields(AccountSchema())
+        account = load_fields(Account.query, schema).get_or_404(account_id)
+        state = object_validator(account, account.balance, account.available)
+        return not_modified(state) or with_validator({"account": schema.dump(account).data}, state)
 
     def put(self, account_id):
         schema = AccountSchema(partial=True)
@@ -34,13 +67,13 @@ class AccountResource(Resource):
         account, errors = schema.load(request.json, instance=account)
         if errors:
             return errors, 422
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "account updated", "account": schema.dump(account).data}
 
     def delete(self, account_id):
         account = Account.query.get_or_404(account_id)
         db.session.delete(account)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "account deleted"}
 
@@ -64,7 +97,11 @@ class AccountList(Resource):
             query = Account.query.filter_by(group=request.args.get("entity"))
         else:
             query = Account.query
-        return paginate(query, schema)
+        # balances move with the ledger, whose ids only grow, and with holds
+        return paginate(query, schema, watermark=lambda: db.session.query(
+            db.session.query(db.func.max(Entry.id)).as_scalar(),
+            db.session.query(db.func.max(AccountHold.date_modified)).as_scalar(),
+        ).one())
 
     def post(self):
         schema = AccountSchema()
@@ -83,41 +120,137 @@ class AccountList(Resource):
 
         try:
             db.session.add(account)
-            db.session.commit()
+            unit_of_work.commit()
 
             return {"msg": "account created", "account": schema.dump(account).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, 500
 
 
+class AccountBalanceResource(Resource):
+    """Balance of an account at the end of a day
+
+    Answered from the nearest closed-period snapshot plus the entries
+    dated after it, so old dates cost as little as recent ones.
+    """
+
+    method_decorators = [jwt_required]
+
+    def get(self, account_id):
+        account = Account.query.get_or_404(account_id)
+        if request.args.get("as_of"):
+            try:
+                as_of = datetime.strptime(request.args.get("as_of"), "%Y-%m-%d").date()
+            except ValueError:
+                return {"msg": "as_of must be a date formatted YYYY-MM-DD"}, 422
+        else:
+            as_of = date.today()
+
+        balance, snapshot = AccountBalanceSnapshot.balance_as_of(account.id, as_of)
+        return {
+            "account_id": account.id,
+            "as_of": as_of.isoformat(),
+            "balance": balance,
+            "snapshot": snapshot and {
+                "accounting_period": snapshot.accounting_period,
+                "closing_date": snapshot.closing_date.isoformat(),
+                "balance": float(snapshot.balance),
+            },
+        }
+
+
 class AccountEntriesResource(Resource):
-    """Single object resource
+    """Account statement
+
+    Rows come newest first by accounting date, the date `to` cuts on, with
+    the running balance after each entry, so back-dated entries take their
+    place in the running balance. The balance is carried in the signed
+    `after` cursor, so every page is one range scan of the (account,
+    accounting_date, id) index per ledger side plus a window sum over the
+    page, however deep it is. The first page starts from the stored
+    account balance.
     """
 
     method_decorators = [jwt_required]
 
     def get(self, account_id):
+        account = Account.query.get_or_404(account_id)
+        page_size = int_arg("page_size", DEFAULT_PAGE_SIZE)
+        if page_size is None:
+            return {"msg": "page_size must be a positive integer"}, 422
+        from_date = request.args.get("from")
+        to_date = request.args.get("to")
+
+        params = {"account_id": account.id, "limit": page_size + 1}
+        where = " account_id = :account_id"
+        if from_date:
+            where += " and accounting_date >= :from_date"
+            params["from_date"] = from_date
+        if to_date:
+            where += " and accounting_date <= :to_date"
+            params["to_date"] = to_date
+
+        if request.args.get("after"):
+            cursor = decode_cursor(request.args.get("after"))
+            try:
+                params["accounting_date"] = cursor["accounting_date"]
+                params["entry_id"] = cursor["entry_id"]
+                params["tran_category"] = cursor["tran_category"]
+                params["start"] = cursor["balance"]
+            except (KeyError, TypeError):
+                return {"msg": "Invalid cursor"}, 422
+            where += """ and (accounting_date, entry_id, tran_category)
+            < (CAST(:accounting_date AS DATE), :entry_id, :tran_category)"""
+        else:
+            params["start"] = account.balance
+            if to_date:
+                params["start"] -= float(db.session.execute(
+                    """select COALESCE(sum(amount), 0.0) from account_ledgers
+                    where account_id = :account_id and accounting_date > :to_date""",
+                    params,
+                ).scalar())
+
         sql = (
-            """ 0 as entry_id,'' as tran_type,'credit' as tran_category,
-                (select date_created from accounts where id="""
-            + str(account_id)
-            + """)
-                as date_created,0 as amount,0 as balance
-                union
-                select entry_id,tran_type,tran_category,date_created,amount,
-                (select sum(amount) from account_ledgers b where account_id="""
-            + str(account_id)
-            + """
-                and b.entry_id<=a.entry_id ) as balance from account_ledgers a
-                where account_id="""
-            + str(account_id)
-            + """
-                order by entry_id desc"""
+            """select json_agg(t) from (select entry_id, reference, tran_type,
+            tran_category, category, amount, date_created, accounting_date,
+            CAST(:start AS NUMERIC) - COALESCE(sum(amount) over (order by
+            accounting_date desc, entry_id desc, tran_category desc
+            rows between unbounded preceding and 1 preceding), 0.0) as balance
+            from (select * from account_ledgers where"""
+            + where
+            + """ order by accounting_date desc, entry_id desc, tran_category desc
+            limit :limit) page
+            order by accounting_date desc, entry_id desc, tran_category desc) t"""
         )
+        rows = db.session.execute(sql, params).scalar() or []
+
+        next = None
+        opening_balance = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            args = request.args.to_dict()
+            args.update(request.view_args)
+            args["page_size"] = page_size
+            args["after"] = encode_cursor({
+                "accounting_date": last["accounting_date"],
+                "entry_id": last["entry_id"],
+                "tran_category": last["tran_category"],
+                "balance": round(last["balance"] - last["amount"], 2),
+            })
+            next = url_for(request.endpoint, **args)
+        elif rows:
+            opening_balance = round(rows[-1]["balance"] - rows[-1]["amount"], 2)
+        else:
+            opening_balance = params["start"]
 
-        response = query(sql)
-        return response, 200
+        return {
+            "account_id": account.id,
+            "opening_balance": opening_balance,
+            "next": next,
+            "results": rows,
+        }, 200
 
 
 class AccountEntriesList(Resource):
@@ -127,17 +260,10 @@ class AccountEntriesList(Resource):
     method_decorators = [jwt_required]
 
     def get(self):
-        sql = """ V.entry_id,account_id,B.uuid,H.name, V.reference, V.tran_type,V.tran_category,
-        V.date_created,amount, e.name as entity_id FROM account_ledgers AS V
-        inner join accounts AS B on B.id=V.account_id inner join account_holders H on
-        B.owner_id=H.uuid inner join entity e on e.uuid=V.entity_id """
-
         if request.args.get("company") is not None:
-            where = " where entity_id='" + request.args.get("company") + "'"
-            sql = sql + where
-
-        order_by = " order by V.date_created desc,  V.entry_id desc, V.amount desc"
-        sql = sql + order_by
-
-        response = query(sql)
-        return response, 200
+            rows = stream(
+                LEDGER + " where entity_id = :company" + LEDGER_ORDER,
+                company=request.args.get("company"))
+        else:
+            rows = stream(LEDGER + LEDGER_ORDER)
+        return stream_json(rows)
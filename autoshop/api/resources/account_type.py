@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import AccountType
 
@@ -21,27 +24,31 @@ class AccountTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(AccountType)
     def get(self, user_id):
-        schema = AccountTypeSchema()
-        account_type = AccountType.query.get_or_404(user_id)
+        schema = select_fields(AccountTypeSchema())
+        account_type = load_fields(AccountType.query, schema).get_or_404(user_id)
         return {"account_type": schema.dump(account_type).data}
 
+    @invalidates(AccountType)
     def put(self, user_id):
         schema = AccountTypeSchema(partial=True)
         account_type = AccountType.query.get_or_404(user_id)
         account_type, errors = schema.load(request.json, instance=account_type)
         if errors:
             return errors, 422
+        unit_of_work.commit()
 
         return {
             "msg": "account_type updated",
             "account_type": schema.dump(account_type).data,
         }
 
+    @invalidates(AccountType)
     def delete(self, user_id):
         account_type = AccountType.query.get_or_404(user_id)
         db.session.delete(account_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "account_type deleted"}
 
@@ -52,11 +59,13 @@ class AccountTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(AccountType)
     def get(self):
         schema = AccountTypeSchema(many=True)
         query = AccountType.query
         return paginate(query, schema)
 
+    @invalidates(AccountType)
     def post(self):
         schema = AccountTypeSchema()
         account_type, errors = schema.load(request.json)
@@ -69,7 +78,7 @@ class AccountTypeList(Resource):
             return {"msg": "The supplied name already exists"}, 409
 
         db.session.add(account_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return (
             {
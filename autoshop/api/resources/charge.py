@@ -1,13 +1,16 @@
-from flask import current_app as app
 from flask import json, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 from sqlalchemy import and_
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Charge, Tarriff
+from autoshop.models.charge import fee_schedule, get_charge_fee
 
 
 class ChargeSchema(ma.ModelSchema):
@@ -34,9 +37,10 @@ class ChargeResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, charge_id):
-        schema = ChargeSchema()
-        charge = Charge.query.get_or_404(charge_id)
-        return {"charge": schema.dump(charge).data}
+        schema = select_fields(ChargeSchema())
+        charge = load_fields(Charge.query, schema).get_or_404(charge_id)
+        state = object_validator(charge)
+        return not_modified(state) or with_validator({"charge": schema.dump(charge).data}, state)
 
     def put(self, charge_id):
         identity = get_jwt_identity()
@@ -50,16 +54,16 @@ class ChargeResource(Resource):
         charge.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "charge updated", "charge": schema.dump(charge).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": "post error", "exception": e.args}, 500
 
     def delete(self, charge_id):
         charge = Charge.query.get_or_404(charge_id)
         db.session.delete(charge)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "charge deleted"}
 
@@ -76,21 +80,10 @@ class ChargeList(Resource):
         amount = request.args.get("amount")
 
         if chargecode and amount:
-            # query = get_charge(chargecode, amount)
-            query = Charge.query.filter(
-                and_(
-                    Charge.code == chargecode,
-                    Charge.min_value <= amount,
-                    Charge.max_value >= amount,
-                )
-            ).first()
-            app.logger.info(query.amount)
-            if query.charge_type == "percentage":
-                charge_fee = (int(query.amount) / 100) * int(amount)
-                response = {"charge": charge_fee}
-            else:
-                response = {"charge": query.amount}
-            return json.dumps(response), 207
+            charge_fee = get_charge_fee(chargecode, amount)
+            if charge_fee is None:
+                return {"msg": "No charge band covers the supplied amount"}, 404
+            return json.dumps({"charge": charge_fee}), 207
 
         elif chargecode:
             query = Charge.query.filter_by(code=chargecode)
@@ -139,16 +132,75 @@ class ChargeList(Resource):
                 )
             else:
                 db.session.add(charge)
-                db.session.commit()
+                unit_of_work.commit()
                 return (
                     {"msg": "charge created", "charge": schema.dump(charge).data},
                     201,
                 )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args, "exception": e.args}, 500
 
 
+class ChargeQuote(Resource):
+    """Price many amounts at once
+
+    Accepts either {"code": ..., "amounts": [...]} or
+    {"quotes": [{"code": ..., "amount": ...}, ...]} and answers with the
+    fee and its split breakdown for every amount, in request order.
+    """
+
+    method_decorators = [jwt_required]
+
+    def post(self):
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return {"msg": "Supply a code with amounts, or a list of quotes"}, 422
+        if "amounts" in data:
+            if not isinstance(data["amounts"], list):
+                return {"msg": "amounts must be a list"}, 422
+            pairs = [(data.get("code"), amount) for amount in data["amounts"]]
+        elif "quotes" in data:
+            requested = data["quotes"]
+            if not isinstance(requested, list) or not all(isinstance(q, dict) for q in requested):
+                return {"msg": "quotes must be a list of objects"}, 422
+            pairs = [(quote.get("code"), quote.get("amount")) for quote in requested]
+        else:
+            return {"msg": "Supply a code with amounts, or a list of quotes"}, 422
+
+        if not all(code is None or isinstance(code, str) for code, amount in pairs):
+            return {"msg": "Codes must be strings"}, 422
+        try:
+            [float(amount) for code, amount in pairs]
+        except (TypeError, ValueError):
+            return {"msg": "Amounts must be numbers"}, 422
+
+        schedule = fee_schedule()
+        positions = {}
+        for position, (code, amount) in enumerate(pairs):
+            positions.setdefault(code, []).append(position)
+
+        quotes = [None] * len(pairs)
+        for code, indexes in positions.items():
+            plan = schedule.plan(code)
+            amounts = [pairs[i][1] for i in indexes]
+            fees = plan.fees(amounts) if plan else [None] * len(indexes)
+            for i, amount, fee in zip(indexes, amounts, fees):
+                quote = {"code": code, "amount": amount, "charge": fee}
+                if plan is None:
+                    quote["msg"] = "Unknown charge code"
+                elif fee is None:
+                    quote["msg"] = "No charge band covers the supplied amount"
+                else:
+                    quote["splits"] = [
+                        {"account_code": split.account_code, "amount": share}
+                        for split, share in plan.shares(fee)
+                    ]
+                quotes[i] = quote
+
+        return {"quotes": quotes}, 200
+
+
 def get_charge(charge_code, charge_value):
     result = Charge.query.filter(
         and_(
@@ -4,6 +4,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from autoshop.models import Account, CommissionAccount, Customer, Entity, Vendor
 from autoshop.extensions import ma, db
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.commons.dbaccess import query
 from autoshop.api.resources.account import AccountSchema
@@ -29,9 +32,10 @@ class CommissionAccountResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, comm_account_id):
-        schema = CommissionAccountSchema()
-        comm_account = CommissionAccount.query.get_or_404(comm_account_id)
-        return {"comm_account": schema.dump(comm_account).data}
+        schema = select_fields(CommissionAccountSchema())
+        comm_account = load_fields(CommissionAccount.query, schema).get_or_404(comm_account_id)
+        state = object_validator(comm_account)
+        return not_modified(state) or with_validator({"comm_account": schema.dump(comm_account).data}, state)
 
     def put(self, comm_account_id):
         schema = CommissionAccountSchema(partial=True)
@@ -39,13 +43,13 @@ class CommissionAccountResource(Resource):
         comm_account, errors = schema.load(request.json, instance=comm_account)
         if errors:
             return errors, 422
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "comm_account updated", "comm_account": schema.dump(comm_account).data}
 
     def delete(self, user_id):
         comm_account = CommissionAccount.query.get_or_404(user_id)
         db.session.delete(comm_account)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "comm_account deleted"}
 
@@ -95,7 +99,7 @@ class CommissionAccountList(Resource):
 
             return {"msg": "comm_account created", "comm_account": schema.dump(comm_account).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
 
             return {"msg": e.args[0]}, 500
 
@@ -4,6 +4,9 @@ from flask_restful import Resource
 from marshmallow import validate
 
 from autoshop.api.resources.account import AccountSchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Account, Customer, Entity, CustomerType
@@ -42,9 +45,10 @@ class CustomerResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, customer_id):
-        schema = CustomerSchema()
-        customer = Customer.query.get_or_404(customer_id)
-        return {"customer": schema.dump(customer).data}
+        schema = select_fields(CustomerSchema())
+        customer = load_fields(Customer.query, schema).get_or_404(customer_id)
+        state = object_validator(customer)
+        return not_modified(state) or with_validator({"customer": schema.dump(customer).data}, state)
 
     def put(self, customer_id):
         schema = CustomerSchema(partial=True)
@@ -53,13 +57,13 @@ class CustomerResource(Resource):
         if errors:
             return errors, 422
         customer.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "customer updated", "customer": schema.dump(customer).data}
 
     def delete(self, customer_id):
         customer = Customer.query.get_or_404(customer_id)
         db.session.delete(customer)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "customer deleted"}
 
@@ -119,7 +123,7 @@ class CustomerList(Resource):
                     minimum_balance=10000000
                 )
                 db.session.add(account)
-                db.session.commit()
+                unit_of_work.commit()
 
             return (
                 {"msg": "customer created", "customer": schema.dump(customer).data},
@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import CustomerType
 
@@ -24,11 +27,13 @@ class CustomerTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(CustomerType)
     def get(self, customer_type_id):
-        schema = CustomerTypeSchema()
-        customer_type = CustomerType.query.get_or_404(customer_type_id)
+        schema = select_fields(CustomerTypeSchema())
+        customer_type = load_fields(CustomerType.query, schema).get_or_404(customer_type_id)
         return {"customer_type": schema.dump(customer_type).data}
 
+    @invalidates(CustomerType)
     def put(self, customer_type_id):
         schema = CustomerTypeSchema(partial=True)
         customer_type = CustomerType.query.get_or_404(customer_type_id)
@@ -36,16 +41,17 @@ class CustomerTypeResource(Resource):
         if errors:
             return errors, 422
         customer_type.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "customer_type updated",
             "customer_type": schema.dump(customer_type).data,
         }
 
+    @invalidates(CustomerType)
     def delete(self, customer_type_id):
         customer_type = CustomerType.query.get_or_404(customer_type_id)
         db.session.delete(customer_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "customer_type deleted"}
 
@@ -56,6 +62,7 @@ class SubCustomerTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(CustomerType)
     def get(self, parent_id):
         schema = CustomerTypeSchema(many=True)
 
@@ -73,6 +80,7 @@ class CustomerTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(CustomerType)
     def get(self):
         schema = CustomerTypeSchema(many=True)
 
@@ -86,6 +94,7 @@ class CustomerTypeList(Resource):
             query = CustomerType.query
         return paginate(query, schema)
 
+    @invalidates(CustomerType)
     def post(self):
         schema = CustomerTypeSchema()
         customer_type, errors = schema.load(request.json)
@@ -101,7 +110,7 @@ class CustomerTypeList(Resource):
                 return {"msg": "The supplied customer_type already exists"}, 409
             else:
                 db.session.add(customer_type)
-            db.session.commit()
+            unit_of_work.commit()
 
             return (
                 {
@@ -111,5 +120,5 @@ class CustomerTypeList(Resource):
                 201,
             )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, 500
@@ -3,6 +3,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Employee, Entity, EmployeeType
@@ -39,9 +42,10 @@ class EmployeeResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, employee_id):
-        schema = EmployeeSchema()
-        employee = Employee.query.get_or_404(employee_id)
-        return {"employee": schema.dump(employee).data}
+        schema = select_fields(EmployeeSchema())
+        employee = load_fields(Employee.query, schema).get_or_404(employee_id)
+        state = object_validator(employee)
+        return not_modified(state) or with_validator({"employee": schema.dump(employee).data}, state)
 
     def put(self, employee_id):
         schema = EmployeeSchema(partial=True)
@@ -50,13 +54,13 @@ class EmployeeResource(Resource):
         if errors:
             return errors, 422
         employee.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "employee updated", "employee": schema.dump(employee).data}
 
     def delete(self, employee_id):
         employee = Employee.query.get_or_404(employee_id)
         db.session.delete(employee)
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "employee deleted"}
 
 
@@ -107,7 +111,7 @@ class EmployeeList(Resource):
             else:
 
                 db.session.add(employee)
-                db.session.commit()
+                unit_of_work.commit()
 
             return (
                 {"msg": "employee created", "employee": schema.dump(employee).data},
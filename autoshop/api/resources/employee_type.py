@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import EmployeeType, Entity
 
@@ -24,11 +27,13 @@ class EmployeeTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(EmployeeType)
     def get(self, employee_type_id):
-        schema = EmployeeTypeSchema()
-        employee_type = EmployeeType.query.get_or_404(employee_type_id)
+        schema = select_fields(EmployeeTypeSchema())
+        employee_type = load_fields(EmployeeType.query, schema).get_or_404(employee_type_id)
         return {"employee_type": schema.dump(employee_type).data}
 
+    @invalidates(EmployeeType)
     def put(self, employee_type_id):
         schema = EmployeeTypeSchema(partial=True)
         employee_type = EmployeeType.query.get_or_404(employee_type_id)
@@ -36,16 +41,17 @@ class EmployeeTypeResource(Resource):
         if errors:
             return errors, 422
         employee_type.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "employee_type updated",
             "employee_type": schema.dump(employee_type).data,
         }
 
+    @invalidates(EmployeeType)
     def delete(self, employee_type_id):
         employee_type = EmployeeType.query.get_or_404(employee_type_id)
         db.session.delete(employee_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "employee_type deleted"}
 
@@ -56,6 +62,7 @@ class SubEmployeeTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(EmployeeType)
     def get(self, parent_id):
         schema = EmployeeTypeSchema(many=True)
 
@@ -73,6 +80,7 @@ class EmployeeTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(EmployeeType)
     def get(self):
         schema = EmployeeTypeSchema(many=True)
 
@@ -86,6 +94,7 @@ class EmployeeTypeList(Resource):
             query = EmployeeType.query
         return paginate(query, schema)
 
+    @invalidates(EmployeeType)
     def post(self):
         schema = EmployeeTypeSchema()
         employee_type, errors = schema.load(request.json)
@@ -103,7 +112,7 @@ class EmployeeTypeList(Resource):
                 return {"msg": "The supplied employee_type already exists"}, 409
             else:
                 db.session.add(employee_type)
-            db.session.commit()
+            unit_of_work.commit()
 
             return (
                 {
@@ -113,5 +122,5 @@ class EmployeeTypeList(Resource):
                 201,
             )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, 500
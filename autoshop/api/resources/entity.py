@@ -1,13 +1,23 @@
-from flask import json, jsonify, request
+from flask import json, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from autoshop.api.resources.account import AccountSchema
 from autoshop.api.resources.vendor import VendorSchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.dbaccess import stream
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.streaming import stream_json
 from autoshop.extensions import db, ma
 from autoshop.models import Account, Entity, Vendor
 
+ENTITY_VENDORS = """ c.vendor_id, v.uuid as vendor_uuid,
+    v.name as vendor, c.entity_id, e.uuid as entity_uuid, e.name as entity
+    FROM entity_vendors c INNER JOIN entity e on e.id=c.entity_id
+    INNER JOIN vendor v on v.id=c.vendor_id"""
+
 
 class EntitySchema(ma.ModelSchema):
     account = ma.Nested(AccountSchema)
@@ -26,9 +36,10 @@ class EntityResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, entity_id):
-        schema = EntitySchema()
-        entity = Entity.query.get_or_404(entity_id)
-        return {"entity": schema.dump(entity).data}
+        schema = select_fields(EntitySchema())
+        entity = load_fields(Entity.query, schema).get_or_404(entity_id)
+        state = object_validator(entity)
+        return not_modified(state) or with_validator({"entity": schema.dump(entity).data}, state)
 
     def put(self, entity_id):
         schema = EntitySchema(partial=True)
@@ -38,14 +49,14 @@ class EntityResource(Resource):
             return errors, 422
 
         entity.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "entity updated", "entity": schema.dump(entity).data}
 
     def delete(self, entity_id):
         entity = Entity.query.get_or_404(entity_id)
         db.session.delete(entity)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "entity deleted"}
 
@@ -88,11 +99,11 @@ class EntityList(Resource):
                 db.session.add(entity)
                 db.session.add(account)
 
-            db.session.commit()
+            unit_of_work.commit()
 
             return {"msg": "entity created", "entity": schema.dump(entity).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, 500
 
         def batch(self):
@@ -131,7 +142,7 @@ class EntityList(Resource):
                     db.session.add(entity)
                     db.session.add(account)
 
-            db.session.commit()
+            unit_of_work.commit()
 
             responses.append({"msg": "entities created"})
 
@@ -148,7 +159,7 @@ class EntityVendorResource(Resource):
         entity = Entity.query.get_or_404(entity_id)
         vendor = Vendor.query.get_or_404(vendor_id)
         entity.remove_vendor(vendor)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "partnership deleted"}
 
@@ -175,17 +186,7 @@ class EntityVendorList(Resource):
             else:
                 query = {}
         else:
-            from autoshop.commons.dbaccess import query
-
-            sql = """ c.vendor_id, v.uuid as vendor_uuid, v.name as vendor,
-            c.entity_id, e.uuid as entity_uuid, e.name as entity
-            FROM entity_vendors c INNER JOIN entity e on e.id=c.entity_id
-            INNER JOIN vendor v on v.id=c.vendor_id
-            """
-
-            data = query(sql)
-            return jsonify(data)
-            # return [] if data is None else data
+            return stream_json(stream(ENTITY_VENDORS))
 
         return schema.dump(query).data
 
@@ -205,8 +206,8 @@ class EntityVendorList(Resource):
 
         try:
             entity.add_vendor(vendor)
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "operation successful"}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, 500
@@ -5,14 +5,32 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from autoshop.api.resources.user import UserSchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.dbaccess import retry_on_conflict
+from autoshop.commons.fieldsets import load_fields, select_fields
+from autoshop.commons.loader import BatchedSchema
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
-from autoshop.models import Account, Entry, TransactionType, Vendor
+from autoshop.models import Entry, Vendor
+from autoshop.models.account import ACCOUNT_NAMES
+from autoshop.models.entity import ENTITY_NAMES
 
 
-class EntrySchema(ma.ModelSchema):
+class EntrySchema(BatchedSchema, ma.ModelSchema):
     creator = ma.Nested(UserSchema)
 
+    loaders = {
+        "debit_account": (ACCOUNT_NAMES, lambda o: [o.debit]),
+        "credit_account": (ACCOUNT_NAMES, lambda o: [o.credit]),
+        "entity": (ENTITY_NAMES, lambda o: [o.entity_id]),
+    }
+    requires = {
+        "debit_account": ("debit",),
+        "credit_account": ("credit",),
+        "entity": ("entity_id",),
+    }
+
     debit = ma.Integer()
     credit = ma.Integer()
     reference = ma.String(required=True)
@@ -38,9 +56,10 @@ class EntryResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, entry_id):
-        schema = EntrySchema()
-        entry = Entry.query.get_or_404(entry_id)
-        return {"entry": schema.dump(entry).data}
+        schema = select_fields(EntrySchema())
+        entry = load_fields(Entry.query, schema).get_or_404(entry_id)
+        state = object_validator(entry)
+        return not_modified(state) or with_validator({"entry": schema.dump(entry).data}, state)
 
     def put(self, entry_id):
         schema = EntrySchema(partial=True)
@@ -54,7 +73,7 @@ class EntryResource(Resource):
     def delete(self, entry_id):
         entry = Entry.query.get_or_404(entry_id)
         db.session.delete(entry)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "entry deleted"}
 
@@ -84,7 +103,7 @@ class EntryList(Resource):
         else:
             query = Entry.query
         query = query.order_by(Entry.date_created.desc(), Entry.amount.desc())
-        return paginate(query, schema)
+        return paginate(query, schema, cursor=(Entry.date_created, Entry.id))
 
     def post(self):
         schema = EntrySchema()
@@ -96,28 +115,52 @@ class EntryList(Resource):
         entry.accounting_period = datetime.now().strftime("%Y-%m")
 
         try:
-            if not TransactionType.get(uuid=entry.tran_type):
-                return {"msg": "The transaction type supplied doesn't exist"}, 422
-            if not Account.get(id=entry.credit) and not Account.get(id=entry.debit):
-                return {"msg": "The supplied account id does not exist"}, 422
-            if Entry.get(reference=entry.reference):
-                return {"msg": "The supplied reference already exists"}, 409
-            if Entry.get(reference=entry.cheque_number):
-                return {"msg": "This transaction is already reversed"}, 409
-            if entry.tran_type == "reversal" and not Entry.get(
-                reference=entry.cheque_number
-            ):
-                return {"msg": "You can only reverse an existing transaction"}, 422
-
-            if entry.tran_type == "reversal":
-                orig = Entry.get(reference=entry.cheque_number)
-                entry.debit = orig.credit
-                entry.credit = orig.debit
-                entry.amount = orig.amount
-                entry.entity_id = orig.entity_id
-
-            entry.transact()
+            valid, reason, status = entry.is_valid()
+            if not valid:
+                return reason, status
+
+            retry_on_conflict(entry.transact)
             return {"msg": "entry created", "entry": schema.dump(entry).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args, "exception": e.args}, 500
+
+
+class EntryBatch(Resource):
+    """Post many entries in one atomic transaction
+    """
+
+    method_decorators = [jwt_required]
+
+    def post(self):
+        """Post a list of entries. :statuscode 207: Multi status"""
+        if not isinstance(request.json, list):
+            return {"msg": "Expected a list of entries"}, 400
+
+        schema = EntrySchema()
+        results = [None] * len(request.json)
+        entries = []
+        for index, data in enumerate(request.json):
+            entry, errors = schema.load(data)
+            if errors:
+                results[index] = {"status": 422, "msg": errors}
+            else:
+                entries.append((index, entry))
+
+        if any(results):
+            for index, entry in entries:
+                results[index] = {
+                    "status": 424, "msg": "Not posted, the batch has invalid entries"
+                }
+        else:
+            posted = Entry.transact_batch([entry for index, entry in entries])
+            for (index, entry), (ok, reason, status) in zip(entries, posted):
+                results[index] = {
+                    "status": status,
+                    "msg": "entry created" if ok else reason.get("msg"),
+                }
+
+        for index, data in enumerate(request.json):
+            if isinstance(data, dict):
+                results[index]["reference"] = data.get("reference")
+        return {"msg": "batch processed", "results": results}, 207
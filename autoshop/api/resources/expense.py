@@ -2,6 +2,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Expense, Entry
@@ -25,9 +28,10 @@ class ExpenseResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, expense_id):
-        schema = ExpenseSchema()
-        expense = Expense.query.get_or_404(expense_id)
-        return {"expense": schema.dump(expense).data}
+        schema = select_fields(ExpenseSchema())
+        expense = load_fields(Expense.query, schema).get_or_404(expense_id)
+        state = object_validator(expense)
+        return not_modified(state) or with_validator({"expense": schema.dump(expense).data}, state)
 
     def put(self, expense_id):
         schema = ExpenseSchema(partial=True)
@@ -36,7 +40,7 @@ class ExpenseResource(Resource):
         if errors:
             return errors, 422
         expense.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
 
         try:
             if expense.on_credit and expense.pay_type != 'credit' and expense.credit_status == 'PAID':
@@ -53,7 +57,7 @@ class ExpenseResource(Resource):
     def delete(self, expense_id):
         expense = Expense.query.get_or_404(expense_id)
         db.session.delete(expense)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "expense deleted"}
 
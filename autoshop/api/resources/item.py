@@ -1,17 +1,47 @@
-from flask import request, current_app as app
+from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
-from autoshop.commons.dbaccess import query
+from autoshop.commons.dbaccess import prepare, stream
+from autoshop.commons.loader import BatchedSchema
+from autoshop.commons.streaming import stream_json
 from autoshop.extensions import db, ma
-from autoshop.models import Item, Entity, VehicleModel, ItemCategory
+from autoshop.models import Item, ItemLog, Entity, VehicleModel, ItemCategory
+from autoshop.models.base_mixin import CREATORS
+from autoshop.models.item import ITEM_QUANTITIES
 from autoshop.api.resources.item_category import ItemCategorySchema
 from autoshop.api.resources.entity import EntitySchema
 from autoshop.api.resources.vendor import VendorSchema
 
 
-class ItemSchema(ma.ModelSchema):
+ITEM_ENTRIES = prepare("item_entries", """ 0 as entry_id,'' as tran_type,'credit' as tran_category,
+    (select date_created from item where uuid = :item_id)
+    as date_created,0 as quantity,0 as balance
+    union
+    select entry_id,'' as tran_type,tran_category,date_created,quantity,
+    (select sum(quantity) from item_ledger b where account_id = :item_id
+    and b.entry_id<=a.entry_id ) as balance from item_ledger a
+    where account_id = :item_id
+    order by entry_id desc""")
+
+ITEM_LEDGER = """ V.entry_id,account_id,B.uuid,B.name, V.reference,
+    V.date_created,quantity,amount, e.name as entity_id FROM item_ledger AS V
+    inner join item_accounts AS B on B.uuid=V.account_id
+    inner join item I on B.uuid=I.uuid
+    inner join entity e on e.uuid=I.entity_id """
+ITEM_LEDGER_ORDER = " order by V.date_created desc,  V.entry_id desc, V.amount desc"
+
+
+class ItemSchema(BatchedSchema, ma.ModelSchema):
+    loaders = {
+        "creator": (CREATORS, lambda o: [o.created_by]),
+        "quantity": (ITEM_QUANTITIES, lambda o: [o.uuid]),
+    }
+    requires = {"quantity": ("uuid",)}
 
     entity = ma.Nested(EntitySchema, only=("name", "address", "email", "phone"))
     category = ma.Nested(ItemCategorySchema)
@@ -40,9 +70,10 @@ class ItemResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, item_id):
-        schema = ItemSchema()
-        item = Item.query.get_or_404(item_id)
-        return {"item": schema.dump(item).data}
+        schema = select_fields(ItemSchema())
+        item = load_fields(Item.query, schema).get_or_404(item_id)
+        state = object_validator(item, item.quantity)
+        return not_modified(state) or with_validator({"item": schema.dump(item).data}, state)
 
     def put(self, item_id):
         schema = ItemSchema(partial=True)
@@ -51,13 +82,13 @@ class ItemResource(Resource):
         if errors:
             return errors, 422
         item.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "item updated", "item": schema.dump(item).data}
 
     def delete(self, item_id):
         item = Item.query.get_or_404(item_id)
         db.session.delete(item)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "item deleted"}
 
@@ -77,7 +108,8 @@ class ItemList(Resource):
             query = Item.query.filter_by(entity_id=request.args.get("entity"))
         else:
             query = Item.query
-        return paginate(query, schema)
+        # quantities move with the item log, whose ids only grow
+        return paginate(query, schema, watermark=lambda: db.session.query(db.func.max(ItemLog.id)).scalar())
 
     def post(self):
         schema = ItemSchema()
@@ -99,7 +131,7 @@ class ItemList(Resource):
             return {"msg": "The supplied item category doesnt exist"}, 422
 
         db.session.add(item)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "item created", "item": schema.dump(item).data}, 201
 
@@ -111,27 +143,7 @@ class ItemEntriesResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, item_id):
-
-        sql = (
-            """ 0 as entry_id,'' as tran_type,'credit' as tran_category,
-                (select date_created from item where uuid='"""
-            + str(item_id)
-            + """')
-                as date_created,0 as quantity,0 as balance
-                union
-                select entry_id,'' as tran_type,tran_category,date_created,quantity,
-                (select sum(quantity) from item_ledger b where account_id='"""
-            + str(item_id)
-            + """'
-                and b.entry_id<=a.entry_id ) as balance from item_ledger a
-                where account_id='"""
-            + str(item_id)
-            + """'
-                order by entry_id desc"""
-        )
-
-        app.logger.info(sql)
-        response = query(sql)
+        response = ITEM_ENTRIES(item_id=str(item_id))
         return response, 200
 
 
@@ -142,18 +154,10 @@ class ItemEntriesList(Resource):
     method_decorators = [jwt_required]
 
     def get(self):
-        sql = """ V.entry_id,account_id,B.uuid,B.name, V.reference,
-        V.date_created,quantity,amount, e.name as entity_id FROM item_ledger AS V
-        inner join item_accounts AS B on B.uuid=V.account_id
-        inner join item I on B.uuid=I.uuid
-        inner join entity e on e.uuid=I.entity_id """
-
         if request.args.get("company") is not None:
-            where = " where entity_id='" + request.args.get("company") + "'"
-            sql = sql + where
-
-        order_by = " order by V.date_created desc,  V.entry_id desc, V.amount desc"
-        sql = sql + order_by
-
-        response = query(sql)
-        return response, 200
+            rows = stream(
+                ITEM_LEDGER + " where entity_id = :company" + ITEM_LEDGER_ORDER,
+                company=request.args.get("company"))
+        else:
+            rows = stream(ITEM_LEDGER + ITEM_LEDGER_ORDER)
+        return stream_json(rows)
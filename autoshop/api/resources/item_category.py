@@ -2,6 +2,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import ItemCategory
@@ -22,9 +25,10 @@ class ItemCategoryResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, item_category_id):
-        schema = ItemCategorySchema()
-        item_category = ItemCategory.query.get_or_404(item_category_id)
-        return {"item_category": schema.dump(item_category).data}
+        schema = select_fields(ItemCategorySchema())
+        item_category = load_fields(ItemCategory.query, schema).get_or_404(item_category_id)
+        state = object_validator(item_category)
+        return not_modified(state) or with_validator({"item_category": schema.dump(item_category).data}, state)
 
     def put(self, item_category_id):
         schema = ItemCategorySchema(partial=True)
@@ -33,13 +37,13 @@ class ItemCategoryResource(Resource):
         if errors:
             return errors, 422
         item_category.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "item_category updated", "item_category": schema.dump(item_category).data}
 
     def delete(self, item_category_id):
         item_category = ItemCategory.query.get_or_404(item_category_id)
         db.session.delete(item_category)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "item_category deleted"}
 
@@ -70,6 +74,6 @@ class ItemCategoryList(Resource):
             return {"msg": "The supplied name already exists"}, 409
 
         db.session.add(item_category)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "item_category created", "item_category": schema.dump(item_category).data}, 201
@@ -5,13 +5,26 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from autoshop.api.resources.entity import EntitySchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
+from autoshop.commons.loader import BatchedSchema
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import ItemLog, Vendor
+from autoshop.models.base_mixin import CREATORS
+from autoshop.models.item import ITEM_ACCOUNT_NAMES
 from autoshop.api.resources.item import ItemSchema
 
 
-class ItemLogSchema(ma.ModelSchema):
+class ItemLogSchema(BatchedSchema, ma.ModelSchema):
+    loaders = {
+        "debit_account": (ITEM_ACCOUNT_NAMES, lambda o: [o.debit]),
+        "credit_account": (ITEM_ACCOUNT_NAMES, lambda o: [o.credit]),
+        "creator": (CREATORS, lambda o: [o.created_by]),
+    }
+    requires = {"debit_account": ("debit",), "credit_account": ("credit",)}
+
     item = ma.Nested(ItemSchema, only=('name', 'uuid'))
 
     entity = ma.Nested(EntitySchema, only=('name', 'address', 'email', 'phone'))
@@ -40,9 +53,10 @@ class ItemLogResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, item_log_id):
-        schema = ItemLogSchema()
-        item_log = ItemLog.query.get_or_404(item_log_id)
-        return {"item_log": schema.dump(item_log).data}
+        schema = select_fields(ItemLogSchema())
+        item_log = load_fields(ItemLog.query, schema).get_or_404(item_log_id)
+        state = object_validator(item_log)
+        return not_modified(state) or with_validator({"item_log": schema.dump(item_log).data}, state)
 
     def put(self, item_log_id):
         schema = ItemLogSchema(partial=True)
@@ -56,7 +70,7 @@ class ItemLogResource(Resource):
     def delete(self, item_log_id):
         item_log = ItemLog.query.get_or_404(item_log_id)
         db.session.delete(item_log)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "item_log deleted"}
 
@@ -79,7 +93,7 @@ class ItemLogList(Resource):
             if item:
                 query = ItemLog.query.filter_by(category=tran_type, item_id=item)
             if from_date and to_date:
-                query = query.filter(ItemLog.date_created.between(from_date,to_date))
+                query = query.filter(ItemLog.accounting_date.between(from_date, to_date))
 
 
         elif request.args.get("uuid") and request.args.get("tran_type"):
@@ -100,7 +114,7 @@ class ItemLogList(Resource):
         else:
             query = ItemLog.query
         query = query.order_by(ItemLog.date_created.desc())
-        return paginate(query, schema)
+        return paginate(query, schema, cursor=(ItemLog.date_created, ItemLog.id))
 
     def post(self):
         schema = ItemLogSchema()
@@ -115,5 +129,5 @@ class ItemLogList(Resource):
             item_log.transact()
             return {"msg": "item_log created", "item_log": schema.dump(item_log).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0]}, e.args[1] if len(e.args) > 1 else 500
@@ -5,6 +5,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from datetime import datetime, timezone
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Job, Employee, ServiceRequest
@@ -42,9 +45,10 @@ class JobResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, job_id):
-        schema = JobSchema()
-        job = Job.query.get_or_404(job_id)
-        return {'job': schema.dump(job).data}
+        schema = select_fields(JobSchema())
+        job = load_fields(Job.query, schema).get_or_404(job_id)
+        state = object_validator(job)
+        return not_modified(state) or with_validator({'job': schema.dump(job).data}, state)
 
     def put(self, job_id):
         identity = get_jwt_identity()
@@ -61,16 +65,16 @@ class JobResource(Resource):
             job.complete()
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {'msg': 'job updated', 'job': schema.dump(job).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': 'post error', 'exception': e.args}, 500)
 
     def delete(self, job_id):
         job = Job.query.get_or_404(job_id)
         db.session.delete(job)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {'msg': 'job deleted'}
 
@@ -127,11 +131,11 @@ class JobList(Resource):
             job.entity_id = employee.entity_id
 
             db.session.add(job)
-            db.session.commit()
+            unit_of_work.commit()
             return ({'msg': 'job created',
                      'job': schema.dump(job).data}, 201)
         except Exception as e:
 
-            db.session.rollback()
+            unit_of_work.rollback()
 
             return ({'msg': e.args[0], 'exception': e.args}, 500)
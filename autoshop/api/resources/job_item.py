@@ -5,6 +5,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import JobItem, Job, ItemLog
@@ -42,9 +45,10 @@ class JobItemResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, job_item_id):
-        schema = JobItemSchema()
-        job_item = JobItem.query.get_or_404(job_item_id)
-        return {'job_item': schema.dump(job_item).data}
+        schema = select_fields(JobItemSchema())
+        job_item = load_fields(JobItem.query, schema).get_or_404(job_item_id)
+        state = object_validator(job_item)
+        return not_modified(state) or with_validator({'job_item': schema.dump(job_item).data}, state)
 
     def put(self, job_item_id):
         identity = get_jwt_identity()
@@ -59,17 +63,17 @@ class JobItemResource(Resource):
         job_item.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {'msg': 'job_item updated',
                     'job_item': schema.dump(job_item).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': 'post error', 'exception': e.args}, 500)
 
     def delete(self, job_item_id):
         job_item = JobItem.query.get_or_404(job_item_id)
         db.session.delete(job_item)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {'msg': 'job_item deleted'}
 
@@ -114,5 +118,5 @@ class JobItemList(Resource):
                 return ({'msg': 'job_item created',
                          'job_item': schema.dump(job_item).data}, 201)
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': e.args, 'exception': e.args}, 500)
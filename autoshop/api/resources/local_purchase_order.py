@@ -5,6 +5,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from autoshop.api.resources.entity import EntitySchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Account, LocalPurchaseOrder, Vendor
@@ -30,9 +33,10 @@ class LocalPurchaseOrderResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, lpo_id):
-        schema = LocalPurchaseOrderSchema()
-        lpo = LocalPurchaseOrder.query.get_or_404(lpo_id)
-        return {"lpo": schema.dump(lpo).data}
+        schema = select_fields(LocalPurchaseOrderSchema())
+        lpo = load_fields(LocalPurchaseOrder.query, schema).get_or_404(lpo_id)
+        state = object_validator(lpo)
+        return not_modified(state) or with_validator({"lpo": schema.dump(lpo).data}, state)
 
     def put(self, lpo_id):
         schema = LocalPurchaseOrderSchema(partial=True)
@@ -57,7 +61,7 @@ class LocalPurchaseOrderResource(Resource):
     def delete(self, lpo_id):
         lpo = LocalPurchaseOrder.query.get_or_404(lpo_id)
         db.session.delete(lpo)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "lpo deleted"}
 
@@ -103,5 +107,5 @@ class LocalPurchaseOrderList(Resource):
             lpo.save()
             return {"msg": "lpo created", "lpo": schema.dump(lpo).data}, 201
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args, "exception": e.args}, 500
@@ -5,6 +5,9 @@ from flask_restful import Resource
 from marshmallow import validate
 from sqlalchemy import and_
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import LpoItem, LocalPurchaseOrder, Item
@@ -35,9 +38,10 @@ class LpoItemResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, lpo_item_id):
-        schema = LpoItemSchema()
-        lpo_item = LpoItem.query.get_or_404(lpo_item_id)
-        return {"lpo_item": schema.dump(lpo_item).data}
+        schema = select_fields(LpoItemSchema())
+        lpo_item = load_fields(LpoItem.query, schema).get_or_404(lpo_item_id)
+        state = object_validator(lpo_item)
+        return not_modified(state) or with_validator({"lpo_item": schema.dump(lpo_item).data}, state)
 
     def put(self, lpo_item_id):
         identity = get_jwt_identity()
@@ -51,16 +55,16 @@ class LpoItemResource(Resource):
         lpo_item.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "lpo_item updated", "lpo_item": schema.dump(lpo_item).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": "post error", "exception": e.args}, 500
 
     def delete(self, lpo_item_id):
         lpo_item = LpoItem.query.get_or_404(lpo_item_id)
         db.session.delete(lpo_item)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "lpo_item deleted"}
 
@@ -103,12 +107,12 @@ class LpoItemList(Resource):
                 lpo_item.entity_id = lpo.entity_id
 
                 db.session.add(lpo_item)
-                db.session.commit()
+                unit_of_work.commit()
                 return (
                     {"msg": "lpo_item created", "lpo_item": schema.dump(lpo_item).data},
                     201,
                 )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args, "exception": e.args}, 500
 
@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import Make
 
@@ -21,11 +24,13 @@ class MakeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(Make)
     def get(self, make_id):
-        schema = MakeSchema()
-        make = Make.query.get_or_404(make_id)
+        schema = select_fields(MakeSchema())
+        make = load_fields(Make.query, schema).get_or_404(make_id)
         return {"make": schema.dump(make).data}
 
+    @invalidates(Make)
     def put(self, make_id):
         schema = MakeSchema(partial=True)
         make = Make.query.get_or_404(make_id)
@@ -38,10 +43,11 @@ class MakeResource(Resource):
             "make": schema.dump(make).data,
         }
 
+    @invalidates(Make)
     def delete(self, make_id):
         make = Make.query.get_or_404(make_id)
         db.session.delete(make)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "make deleted"}
 
@@ -52,11 +58,13 @@ class MakeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(Make)
     def get(self):
         schema = MakeSchema(many=True)
         query = Make.query
         return paginate(query, schema)
 
+    @invalidates(Make)
     def post(self):
         schema = MakeSchema()
         make, errors = schema.load(request.json)
@@ -69,7 +77,7 @@ class MakeList(Resource):
             return {"msg": "The supplied name already exists"}, 409
 
         db.session.add(make)
-        db.session.commit()
+        unit_of_work.commit()
 
         return (
             {
@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import PaymentType
 
@@ -21,11 +24,13 @@ class PaymentTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(PaymentType)
     def get(self, payment_type_id):
-        schema = PaymentTypeSchema()
-        payment_type = PaymentType.query.get_or_404(payment_type_id)
+        schema = select_fields(PaymentTypeSchema())
+        payment_type = load_fields(PaymentType.query, schema).get_or_404(payment_type_id)
         return {"payment_type": schema.dump(payment_type).data}
 
+    @invalidates(PaymentType)
     def put(self, payment_type_id):
         schema = PaymentTypeSchema(partial=True)
         payment_type = PaymentType.query.get_or_404(payment_type_id)
@@ -33,16 +38,17 @@ class PaymentTypeResource(Resource):
         if errors:
             return errors, 422
         payment_type.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "payment_type updated",
             "payment_type": schema.dump(payment_type).data,
         }
 
+    @invalidates(PaymentType)
     def delete(self, payment_type_id):
         payment_type = PaymentType.query.get_or_404(payment_type_id)
         db.session.delete(payment_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "payment_type deleted"}
 
@@ -53,6 +59,7 @@ class PaymentTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(PaymentType)
     def get(self):
         schema = PaymentTypeSchema(many=True)
         if request.args.get("uuid"):
@@ -61,6 +68,7 @@ class PaymentTypeList(Resource):
             query = PaymentType.query
         return paginate(query.order_by(PaymentType.uuid.asc()), schema)
 
+    @invalidates(PaymentType)
     def post(self):
         schema = PaymentTypeSchema()
         payment_type, errors = schema.load(request.json)
@@ -2,6 +2,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Role
@@ -20,9 +23,10 @@ class RoleResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, role_id):
-        schema = RoleSchema()
-        role = Role.query.get_or_404(role_id)
-        return {"role": schema.dump(role).data}
+        schema = select_fields(RoleSchema())
+        role = load_fields(Role.query, schema).get_or_404(role_id)
+        state = object_validator(role)
+        return not_modified(state) or with_validator({"role": schema.dump(role).data}, state)
 
     def put(self, role_id):
         schema = RoleSchema(partial=True)
@@ -31,13 +35,13 @@ class RoleResource(Resource):
         if errors:
             return errors, 422
         role.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "role updated", "role": schema.dump(role).data}
 
     def delete(self, role_id):
         role = Role.query.get_or_404(role_id)
         db.session.delete(role)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "role deleted"}
 
@@ -69,6 +73,6 @@ class RoleList(Resource):
             return {"msg": "The supplied rolename already exists"}, 409
 
         db.session.add(role)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "role created", "role": schema.dump(role).data}, 201
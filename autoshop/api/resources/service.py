@@ -3,6 +3,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Service
@@ -28,9 +31,10 @@ class ServiceResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, service_id):
-        schema = ServiceSchema()
-        service = Service.query.get_or_404(service_id)
-        return {"service": schema.dump(service).data}
+        schema = select_fields(ServiceSchema())
+        service = load_fields(Service.query, schema).get_or_404(service_id)
+        state = object_validator(service)
+        return not_modified(state) or with_validator({"service": schema.dump(service).data}, state)
 
     def put(self, service_id):
         identity = get_jwt_identity()
@@ -44,16 +48,16 @@ class ServiceResource(Resource):
         service.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "service updated", "service": schema.dump(service).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": "post error", "exception": e.args}, 500
 
     def delete(self, service_id):
         service = Service.query.get_or_404(service_id)
         db.session.delete(service)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "service deleted"}
 
@@ -88,11 +92,11 @@ class ServiceList(Resource):
                 return {"msg": "The supplied service name already exists"}, 409
             else:
                 db.session.add(service)
-                db.session.commit()
+                unit_of_work.commit()
                 return (
                     {"msg": "service created", "service": schema.dump(service).data},
                     201,
                 )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0], "exception": e.args}, 500
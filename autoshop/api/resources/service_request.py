@@ -3,6 +3,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import (
@@ -40,9 +43,10 @@ class ServiceRequestResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, service_request_id):
-        schema = ServiceRequestSchema()
-        service_request = ServiceRequest.query.get_or_404(service_request_id)
-        return {"service_request": schema.dump(service_request).data}
+        schema = select_fields(ServiceRequestSchema())
+        service_request = load_fields(ServiceRequest.query, schema).get_or_404(service_request_id)
+        state = object_validator(service_request)
+        return not_modified(state) or with_validator({"service_request": schema.dump(service_request).data}, state)
 
     def put(self, service_request_id):
         identity = get_jwt_identity()
@@ -56,16 +60,16 @@ class ServiceRequestResource(Resource):
         service_request.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "service_request updated", "service_request": schema.dump(service_request).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": "post error", "exception": e.args}, 500
 
     def delete(self, service_request_id):
         service_request = ServiceRequest.query.get_or_404(service_request_id)
         db.session.delete(service_request)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "service_request deleted"}
 
@@ -97,12 +101,12 @@ class ServiceRequestList(Resource):
 
         try:
             db.session.add(service_request)
-            db.session.commit()
+            unit_of_work.commit()
             return (
                 {"msg": "service_request created", "service_request": schema.dump(service_request).data},
                 201,
             )
 
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0], "exception": e.args}, 500
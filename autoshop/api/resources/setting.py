@@ -2,6 +2,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Setting
@@ -22,9 +25,10 @@ class SettingResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, setting_id):
-        schema = SettingSchema()
-        setting = Setting.query.get_or_404(setting_id)
-        return {"setting": schema.dump(setting).data}
+        schema = select_fields(SettingSchema())
+        setting = load_fields(Setting.query, schema).get_or_404(setting_id)
+        state = object_validator(setting)
+        return not_modified(state) or with_validator({"setting": schema.dump(setting).data}, state)
 
     def put(self, setting_id):
         schema = SettingSchema(partial=True)
@@ -33,13 +37,13 @@ class SettingResource(Resource):
         if errors:
             return errors, 422
         setting.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "setting updated", "setting": schema.dump(setting).data}
 
     def delete(self, setting_id):
         setting = Setting.query.get_or_404(setting_id)
         db.session.delete(setting)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "setting deleted"}
 
@@ -67,6 +71,6 @@ class SettingList(Resource):
             return {"msg": "The supplied name already exists"}, 409
 
         db.session.add(setting)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "setting created", "setting": schema.dump(setting).data}, 201
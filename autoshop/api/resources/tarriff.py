@@ -3,6 +3,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Entity, Tarriff, TransactionType
@@ -29,9 +32,10 @@ class TarriffResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, tarriff_id):
-        schema = TarriffSchema()
-        tarriff = Tarriff.query.get_or_404(tarriff_id)
-        return {"tarriff": schema.dump(tarriff).data}
+        schema = select_fields(TarriffSchema())
+        tarriff = load_fields(Tarriff.query, schema).get_or_404(tarriff_id)
+        state = object_validator(tarriff)
+        return not_modified(state) or with_validator({"tarriff": schema.dump(tarriff).data}, state)
 
     def put(self, tarriff_id):
         identity = get_jwt_identity()
@@ -45,16 +49,16 @@ class TarriffResource(Resource):
         tarriff.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {"msg": "tarriff updated", "tarriff": schema.dump(tarriff).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": "post error", "exception": e.args}, 500
 
     def delete(self, tarriff_id):
         tarriff = Tarriff.query.get_or_404(tarriff_id)
         db.session.delete(tarriff)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "tarriff deleted"}
 
@@ -102,11 +106,11 @@ class TarriffList(Resource):
                 )
             else:
                 db.session.add(tarriff)
-                db.session.commit()
+                unit_of_work.commit()
                 return (
                     {"msg": "tarriff created", "tarriff": schema.dump(tarriff).data},
                     201,
                 )
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {"msg": e.args[0], "exception": e.args}, 500
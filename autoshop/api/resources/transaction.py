@@ -3,10 +3,13 @@ from flask import request, current_app as app
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import (
-    Account, Customer, Entry,
+    Account, Customer,
     PaymentType, Transaction, User,
     TransactionType, CommissionAccount
 )
@@ -42,6 +45,8 @@ class TransactionViewSchema(ma.ModelSchema):
             "phone",
             "narration",
             "reference",
+            "status",
+            "reason",
             "created_on",
         )
 
@@ -53,9 +58,10 @@ class TransactionResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, transaction_id):
-        schema = TransactionSchema()
-        transaction = Transaction.query.get_or_404(transaction_id)
-        return {"transaction": schema.dump(transaction).data}
+        schema = select_fields(TransactionSchema())
+        transaction = load_fields(Transaction.query, schema).get_or_404(transaction_id)
+        state = object_validator(transaction)
+        return not_modified(state) or with_validator({"transaction": schema.dump(transaction).data}, state)
 
     def put(self, transaction_id):
         schema = TransactionSchema(partial=True)
@@ -64,7 +70,7 @@ class TransactionResource(Resource):
         if errors:
             return errors, 422
         transaction.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "transaction updated",
             "transaction": schema.dump(transaction).data,
@@ -73,7 +79,7 @@ class TransactionResource(Resource):
     def delete(self, transaction_id):
         transaction = Transaction.query.get_or_404(transaction_id)
         db.session.delete(transaction)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "transaction deleted"}
 
@@ -104,7 +110,11 @@ class TransactionList(Resource):
         else:
             query = Transaction.query
 
-        return paginate(query.order_by(Transaction.date_created.desc()), schema)
+        return paginate(
+            query.order_by(Transaction.date_created.desc()),
+            schema,
+            cursor=(Transaction.date_created, Transaction.id),
+        )
 
     def post(self):
         schema = TransactionSchema()
@@ -117,40 +127,37 @@ class TransactionList(Resource):
 
         if not Customer.get(uuid=transaction.reference):
             return {"msg": "This reference does not exist in our customer list"}, 422
-        if Transaction.get(tranid=transaction.tranid, vendor_id=transaction.vendor_id):
-            return {"msg": "The supplied transaction already exists"}, 409
         if not TransactionType.get(uuid=transaction.tran_type):
             return {"msg": "Unknown transaction type supplied"}, 422
         if not PaymentType.get(uuid=transaction.pay_type):
             return {"msg": "Unknown payment type supplied"}, 422
 
+        result_schema = TransactionViewSchema()
         try:
             if transaction.is_synchronous:
-                transaction.processed = True
-                transaction.status = "SUCCESS"
-                cust_acct = Account.get(owner_id=transaction.reference)
-                transaction.entity_id = cust_acct.group
-
-                entry = Entry.init_transaction(transaction)
-                transaction.save()
-                entry.transact()
+                transaction, created = Transaction.post(transaction)
             else:
-                # just save transaction, and update later in background service
-                transaction.save()
+                # hold the amount now, the background service posts it later
+                transaction, created = Transaction.submit(transaction)
+        except Exception as e:
+            return {"msg": e.args[0] if e.args else str(e)}, e.args[1] if len(e.args) > 1 else 500
 
-            result_schema = TransactionViewSchema()
+        if not created:
+            # a retry of a request we already took, answer with its outcome
             return (
                 {
-                    "msg": "transaction created",
+                    "msg": "The supplied transaction already exists",
                     "transaction": result_schema.dump(transaction).data,
                 },
-                201,
+                200,
             )
-        except Exception as e:
-            transaction.status = 'FAILED'
-            transaction.reason = str(e.args[0])
-            transaction.update()
-            return {"msg": e.args[0]}, e.args[1] if len(e.args) > 1 else 500
+        return (
+            {
+                "msg": "transaction created",
+                "transaction": result_schema.dump(transaction).data,
+            },
+            201,
+        )
 
 
 def str2bool(v):
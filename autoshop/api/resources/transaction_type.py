@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import TransactionType
 
@@ -21,11 +24,13 @@ class TransactionTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(TransactionType)
     def get(self, transaction_type_id):
-        schema = TransactionTypeSchema()
-        transaction_type = TransactionType.query.get_or_404(transaction_type_id)
+        schema = select_fields(TransactionTypeSchema())
+        transaction_type = load_fields(TransactionType.query, schema).get_or_404(transaction_type_id)
         return {"transaction_type": schema.dump(transaction_type).data}
 
+    @invalidates(TransactionType)
     def put(self, transaction_type_id):
         schema = TransactionTypeSchema(partial=True)
         transaction_type = TransactionType.query.get_or_404(transaction_type_id)
@@ -33,16 +38,17 @@ class TransactionTypeResource(Resource):
         if errors:
             return errors, 422
         transaction_type.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "transaction_type updated",
             "transaction_type": schema.dump(transaction_type).data,
         }
 
+    @invalidates(TransactionType)
     def delete(self, transaction_type_id):
         transaction_type = TransactionType.query.get_or_404(transaction_type_id)
         db.session.delete(transaction_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "transaction_type deleted"}
 
@@ -53,6 +59,7 @@ class TransactionTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(TransactionType)
     def get(self):
         schema = TransactionTypeSchema(many=True)
         if request.args.get("uuid") is not None:
@@ -62,6 +69,7 @@ class TransactionTypeList(Resource):
             query = TransactionType.query
         return paginate(query, schema)
 
+    @invalidates(TransactionType)
     def post(self):
         schema = TransactionTypeSchema()
         transaction_type, errors = schema.load(request.json)
@@ -74,7 +82,7 @@ class TransactionTypeList(Resource):
             return {"msg": "The supplied name already exists"}, 409
 
         db.session.add(transaction_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return (
             {
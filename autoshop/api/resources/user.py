@@ -5,6 +5,9 @@ from loguru import logger
 
 from autoshop.models import User
 from autoshop.extensions import ma, db
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 
 
@@ -26,9 +29,10 @@ class UserResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, user_id):
-        schema = UserSchema()
-        user = User.query.get_or_404(user_id)
-        return {"user": schema.dump(user).data}
+        schema = select_fields(UserSchema())
+        user = load_fields(User.query, schema).get_or_404(user_id)
+        state = object_validator(user)
+        return not_modified(state) or with_validator({"user": schema.dump(user).data}, state)
 
     def put(self, user_id):
         schema = UserSchema(partial=True)
@@ -37,13 +41,13 @@ class UserResource(Resource):
         if errors:
             return errors, 422
         user.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "user updated", "user": schema.dump(user).data}
 
     def delete(self, user_id):
         user = User.query.get_or_404(user_id)
         db.session.delete(user)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "user deleted"}
 
@@ -76,6 +80,6 @@ class UserList(Resource):
         user.created_by = get_jwt_identity()
 
         db.session.add(user)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "user created", "user": schema.dump(user).data}, 201
@@ -2,6 +2,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Vehicle, VehicleModel, Customer
@@ -34,9 +37,10 @@ class VehicleResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, vehicle_id):
-        schema = VehicleSchema()
-        vehicle = Vehicle.query.get_or_404(vehicle_id)
-        return {"vehicle": schema.dump(vehicle).data}
+        schema = select_fields(VehicleSchema())
+        vehicle = load_fields(Vehicle.query, schema).get_or_404(vehicle_id)
+        state = object_validator(vehicle)
+        return not_modified(state) or with_validator({"vehicle": schema.dump(vehicle).data}, state)
 
     def put(self, vehicle_id):
         schema = VehicleSchema(partial=True)
@@ -45,13 +49,13 @@ class VehicleResource(Resource):
         if errors:
             return errors, 422
         vehicle.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {"msg": "vehicle updated", "vehicle": schema.dump(vehicle).data}
 
     def delete(self, vehicle_id):
         vehicle = Vehicle.query.get_or_404(vehicle_id)
         db.session.delete(vehicle)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vehicle deleted"}
 
@@ -86,6 +90,6 @@ class VehicleList(Resource):
             return {"msg": "The supplied vehicle already exists"}, 409
 
         db.session.add(vehicle)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vehicle created", "vehicle": schema.dump(vehicle).data}, 201
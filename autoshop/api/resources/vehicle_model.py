@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import VehicleModel, VehicleType
 from autoshop.api.resources.vehicle_type import VehicleTypeSchema
@@ -28,11 +31,13 @@ class VehicleModelResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(VehicleModel, VehicleType)
     def get(self, vehicle_model_id):
-        schema = VehicleModelSchema()
-        vehicle_model = VehicleModel.query.get_or_404(vehicle_model_id)
+        schema = select_fields(VehicleModelSchema())
+        vehicle_model = load_fields(VehicleModel.query, schema).get_or_404(vehicle_model_id)
         return {"vehicle_model": schema.dump(vehicle_model).data}
 
+    @invalidates(VehicleModel)
     def put(self, vehicle_model_id):
         schema = VehicleModelSchema(partial=True)
         vehicle_model = VehicleModel.query.get_or_404(vehicle_model_id)
@@ -40,16 +45,17 @@ class VehicleModelResource(Resource):
         if errors:
             return errors, 422
         vehicle_model.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "vehicle_model updated",
             "vehicle_model": schema.dump(vehicle_model).data,
         }
 
+    @invalidates(VehicleModel)
     def delete(self, vehicle_model_id):
         vehicle_model = VehicleModel.query.get_or_404(vehicle_model_id)
         db.session.delete(vehicle_model)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vehicle_model deleted"}
 
@@ -60,11 +66,13 @@ class VehicleModelList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(VehicleModel, VehicleType)
     def get(self):
         schema = VehicleModelSchema(many=True)
         query = VehicleModel.query
         return paginate(query, schema)
 
+    @invalidates(VehicleModel)
     def post(self):
         schema = VehicleModelSchema()
         vehicle_model, errors = schema.load(request.json)
@@ -79,7 +87,7 @@ class VehicleModelList(Resource):
             return {"msg": "The supplied vehicle_model already exists"}, 409
 
         db.session.add(vehicle_model)
-        db.session.commit()
+        unit_of_work.commit()
 
         return (
             {
@@ -2,7 +2,10 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
+from autoshop.commons.reference import cached, invalidates
 from autoshop.extensions import db, ma
 from autoshop.models import VehicleType
 
@@ -22,11 +25,13 @@ class VehicleTypeResource(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(VehicleType)
     def get(self, vehicle_type_id):
-        schema = VehicleTypeSchema()
-        vehicle_type = VehicleType.query.get_or_404(vehicle_type_id)
+        schema = select_fields(VehicleTypeSchema())
+        vehicle_type = load_fields(VehicleType.query, schema).get_or_404(vehicle_type_id)
         return {"vehicle_type": schema.dump(vehicle_type).data}
 
+    @invalidates(VehicleType)
     def put(self, vehicle_type_id):
         schema = VehicleTypeSchema(partial=True)
         vehicle_type = VehicleType.query.get_or_404(vehicle_type_id)
@@ -34,16 +39,17 @@ class VehicleTypeResource(Resource):
         if errors:
             return errors, 422
         vehicle_type.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
         return {
             "msg": "vehicle_type updated",
             "vehicle_type": schema.dump(vehicle_type).data,
         }
 
+    @invalidates(VehicleType)
     def delete(self, vehicle_type_id):
         vehicle_type = VehicleType.query.get_or_404(vehicle_type_id)
         db.session.delete(vehicle_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vehicle_type deleted"}
 
@@ -54,11 +60,13 @@ class VehicleTypeList(Resource):
 
     method_decorators = [jwt_required]
 
+    @cached(VehicleType)
     def get(self):
         schema = VehicleTypeSchema(many=True)
         query = VehicleType.query
         return paginate(query, schema)
 
+    @invalidates(VehicleType)
     def post(self):
         schema = VehicleTypeSchema()
         vehicle_type, errors = schema.load(request.json)
@@ -71,7 +79,7 @@ class VehicleTypeList(Resource):
             return {"msg": "The supplied vehicle type already exists"}, 409
 
         db.session.add(vehicle_type)
-        db.session.commit()
+        unit_of_work.commit()
 
         return (
             {
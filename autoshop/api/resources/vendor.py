@@ -3,6 +3,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 
 from autoshop.api.resources.account import AccountSchema
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import Account, Vendor
@@ -25,9 +28,10 @@ class VendorResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, vendor_id):
-        schema = VendorSchema()
-        vendor = Vendor.query.get_or_404(vendor_id)
-        return {"vendor": schema.dump(vendor).data}
+        schema = select_fields(VendorSchema())
+        vendor = load_fields(Vendor.query, schema).get_or_404(vendor_id)
+        state = object_validator(vendor)
+        return not_modified(state) or with_validator({"vendor": schema.dump(vendor).data}, state)
 
     def put(self, vendor_id):
         schema = VendorSchema(partial=True)
@@ -37,14 +41,14 @@ class VendorResource(Resource):
             return errors, 422
 
         vendor.modified_by = get_jwt_identity()
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vendor updated", "vendor": schema.dump(vendor).data}
 
     def delete(self, vendor_id):
         vendor = Vendor.query.get_or_404(vendor_id)
         db.session.delete(vendor)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {"msg": "vendor deleted"}
 
@@ -81,7 +85,7 @@ class VendorList(Resource):
 
             db.session.add(vendor)
             db.session.add(account)
-            db.session.commit()
+            unit_of_work.commit()
 
             return {"msg": "vendor created", "vendor": schema.dump(vendor).data}, 201
         except Exception as e:
@@ -6,6 +6,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from marshmallow import validate
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.conditional import not_modified, object_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 from autoshop.commons.pagination import paginate
 from autoshop.extensions import db, ma
 from autoshop.models import WorkItem, ServiceRequest
@@ -40,9 +43,10 @@ class WorkItemResource(Resource):
     method_decorators = [jwt_required]
 
     def get(self, work_item_id):
-        schema = WorkItemSchema()
-        work_item = WorkItem.query.get_or_404(work_item_id)
-        return {'work_item': schema.dump(work_item).data}
+        schema = select_fields(WorkItemSchema())
+        work_item = load_fields(WorkItem.query, schema).get_or_404(work_item_id)
+        state = object_validator(work_item)
+        return not_modified(state) or with_validator({'work_item': schema.dump(work_item).data}, state)
 
     def put(self, work_item_id):
         identity = get_jwt_identity()
@@ -57,17 +61,17 @@ class WorkItemResource(Resource):
         work_item.modified_by = identity
 
         try:
-            db.session.commit()
+            unit_of_work.commit()
             return {'msg': 'work_item updated',
                     'work_item': schema.dump(work_item).data}
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': 'post error', 'exception': e.args}, 500)
 
     def delete(self, work_item_id):
         work_item = WorkItem.query.get_or_404(work_item_id)
         db.session.delete(work_item)
-        db.session.commit()
+        unit_of_work.commit()
 
         return {'msg': 'work_item deleted'}
 
@@ -111,9 +115,9 @@ class WorkItemList(Resource):
                          }, 409)
             else:
                 db.session.add(work_item)
-                db.session.commit()
+                unit_of_work.commit()
                 return ({'msg': 'work_item created',
                          'work_item': schema.dump(work_item).data}, 201)
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return ({'msg': e.args, 'exception': e.args}, 500)
@@ -4,6 +4,7 @@ from flask import Blueprint
 from flask_restful import Api
 
 from autoshop.api.resources import (
+    AccountBalanceResource,
     AccountEntriesList,
     AccountEntriesResource,
     AccountList,
@@ -18,6 +19,7 @@ from autoshop.api.resources import (
     EntityResource,
     EntityVendorList,
     EntityVendorResource,
+    EntryBatch,
     EntryList,
     EntryResource,
     PaymentTypeList,
@@ -75,7 +77,8 @@ from autoshop.api.resources import (
     CommissionAccountList,
     CommissionAccountResource,
     ItemEntriesResource,
-    ItemEntriesList
+    ItemEntriesList,
+    ChargeQuote
 )
 
 blueprint = Blueprint("api", __name__, url_prefix="/api/v1")
@@ -140,12 +143,14 @@ api.add_resource(AccountTypeResource, "/account_types/<int:account_type_id>")
 api.add_resource(AccountTypeList, "/account_types")
 api.add_resource(AccountResource, "/accounts/<int:account_id>")
 api.add_resource(AccountList, "/accounts")
+api.add_resource(AccountBalanceResource, "/accounts/<int:account_id>/balance")
 api.add_resource(AccountEntriesResource, "/accounts/entries/<int:account_id>")
 api.add_resource(AccountEntriesList, "/accounts/entries")
 api.add_resource(CustomerTypeResource, "/customer_types/<int:customer_type_id>")
 api.add_resource(CustomerTypeList, "/customer_types")
 api.add_resource(EntryResource, "/entries/<int:entry_id>")
 api.add_resource(EntryList, "/entries")
+api.add_resource(EntryBatch, "/entries/batch")
 api.add_resource(TransactionResource, "/transactions/<int:transaction_id>")
 api.add_resource(TransactionList, "/transactions")
 
@@ -158,6 +163,8 @@ api.add_resource(PaymentTypeList, "/payment_types")
 api.add_resource(SettingResource, "/settings/<int:setting_id>")
 api.add_resource(SettingList, "/settings")
 
+api.add_resource(ChargeQuote, "/charges/quote")
+
 api.add_resource(SearchList, "/search")
 api.add_resource(QueryList, "/query")
 
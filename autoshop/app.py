@@ -4,6 +4,8 @@ from loguru import logger
 from logging import StreamHandler
 
 from autoshop import auth, api
+from autoshop.commons.compression import init_compression
+from autoshop.commons.unit_of_work import init_unit_of_work
 from autoshop.extensions import db, jwt, migrate
 
 
@@ -21,7 +23,11 @@ def create_app(testing=False, cli=False):
 
     configure_extensions(app, cli)
     register_blueprints(app)
+    # after_request hooks run last registered first: log, then compress
+    init_compression(app)
     register_requestloggers(app)
+    # commits before the response is logged and sent
+    init_unit_of_work(app)
 
     return app
 
@@ -50,6 +56,8 @@ def register_requestloggers(app):
     from flask import g, request
     from rfc3339 import rfc3339
 
+    from autoshop.commons.dbaccess import pool_status
+
     @app.before_request
     def start_timer():
         g.start = time.time()
@@ -79,6 +87,7 @@ def register_requestloggers(app):
             ("ip", ip, "red"),
             ("host", host, "red"),
             ("params", args, "blue"),
+            ("pool", pool_status(), "green"),
         ]
 
         request_id = request.headers.get("X-Request-ID")
@@ -95,5 +104,7 @@ def register_requestloggers(app):
 
         app.logger.info(line)
         app.logger.info(request.get_data())
-        app.logger.info(response.data)
+        if not response.is_streamed:
+            # reading a streamed body here would buffer all of it
+            app.logger.info(response.data)
         return response
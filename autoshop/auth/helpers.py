@@ -8,6 +8,7 @@ from datetime import datetime
 from flask_jwt_extended import decode_token
 from sqlalchemy.orm.exc import NoResultFound
 
+from autoshop.commons import unit_of_work
 from autoshop.extensions import db
 from autoshop.models import TokenBlacklist
 
@@ -33,7 +34,7 @@ def add_token_to_database(encoded_token, identity_claim):
         revoked=revoked,
     )
     db.session.add(db_token)
-    db.session.commit()
+    unit_of_work.commit()
 
 
 def is_token_revoked(decoded_token):
@@ -60,6 +61,6 @@ def revoke_token(token_jti, user):
     try:
         token = TokenBlacklist.query.filter_by(jti=token_jti, user_id=user).one()
         token.revoked = True
-        db.session.commit()
+        unit_of_work.commit()
     except NoResultFound:
         raise Exception("Could not find the token {}".format(token_jti))
@@ -0,0 +1,90 @@
+"""Response compression: gzip, or brotli when the brotli package is installed
+
+Buffered responses are compressed once they reach COMPRESS_MIN_SIZE bytes;
+streamed responses are compressed chunk by chunk and flushed after each
+one, so clients still receive rows as they are produced.
+"""
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def _encoding():
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    accepted = [coding for coding in offered if request.accept_encodings[coding]]
+    if not accepted:
+        return None
+    return max(accepted, key=lambda coding: request.accept_encodings[coding])
+
+
+def _compressor(encoding, level):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(level, 11))
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def _stream(chunks, encoding, level, charset):
+    compress, flush, finish = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response, config):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in config["COMPRESS_MIMETYPES"]
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding, level, response.charset)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        compress, _, finish = _compressor(encoding, level)
+        response.set_data(compress(data) + finish())
+
+    response.headers["Content-Encoding"] = encoding
+    # the encoded bytes differ from the identity ones, so a strong tag
+    # can no longer vouch for them byte for byte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress the responses of `app` as configured by COMPRESS_* settings"""
+
+    @app.after_request
+    def compress(response):
+        return compress_response(response, app.config)
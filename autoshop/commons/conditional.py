@@ -0,0 +1,88 @@
+"""Conditional GET: ETag / If-None-Match and Last-Modified / If-Modified-Since
+
+A validator is computed from cheap state (a row's date_modified, or the
+ids and max(date_modified) of a loaded page) before anything is
+serialized, so a poll that finds nothing changed is answered with a
+bodyless 304.
+"""
+import hashlib
+from collections import namedtuple
+from datetime import timezone
+
+from flask import current_app, request
+from sqlalchemy import inspect
+from werkzeug.http import http_date
+
+Validator = namedtuple("Validator", "etag last_modified")
+
+
+def _utc(moment):
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def validator(last_modified, *tokens):
+    """Validator of the current request's representation
+
+    The ETag covers the request path and query string, so pages, filters
+    and fieldsets of the same data each get their own.
+    """
+    last_modified = _utc(last_modified)
+    raw = "|".join(
+        [request.full_path, last_modified.isoformat() if last_modified else ""]
+        + [str(token) for token in tokens]
+    )
+    return Validator(hashlib.sha1(raw.encode("utf-8")).hexdigest(), last_modified)
+
+
+def object_validator(obj, *tokens):
+    """Validator for a single row, from its date_modified"""
+    return validator(getattr(obj, "date_modified", None), obj.id, *tokens)
+
+
+def rows_validator(rows, *tokens):
+    """Validator for loaded `rows`: their ids and max(date_modified)
+
+    Built from a page already fetched, so it adds no query and never
+    touches rows outside the page. Models without date_modified are
+    append only, their ids suffice.
+    """
+    stamps = [_utc(row.date_modified) for row in rows if getattr(row, "date_modified", None)]
+    identities = [inspect(row).identity for row in rows]
+    return validator(max(stamps) if stamps else None, identities, *tokens)
+
+
+def not_modified(state):
+    """A 304 response when the client's copy is still current, else None"""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(state.etag)
+    elif request.if_modified_since and state.last_modified:
+        fresh = state.last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    response = current_app.response_class(status=304)
+    response.headers.extend(_headers(state))
+    return response
+
+
+def with_validator(rv, state):
+    """Attach the validator headers to a resource's return value"""
+    if isinstance(rv, current_app.response_class):
+        rv.headers.extend(_headers(state))
+        return rv
+    if not isinstance(rv, tuple):
+        rv = (rv, 200)
+    body, status, headers = (tuple(rv) + ({},))[:3]
+    if status != 200:
+        return rv
+    return body, status, dict(headers, **_headers(state))
+
+
+def _headers(state):
+    headers = {"ETag": 'W/"%s"' % state.etag, "Cache-Control": "private, no-cache"}
+    if state.last_modified:
+        headers["Last-Modified"] = http_date(state.last_modified)
+    return headers
@@ -1,29 +1,201 @@
-import psycopg2
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
 import sqlalchemy
 from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+from autoshop.commons import unit_of_work
+from autoshop.extensions import db
+
+# connections opened, checked out and discarded by this worker process
+pool_events = Counter()
+
+
+@event.listens_for(Pool, "connect")
+def _remember_pid(dbapi_connection, connection_record):
+    pool_events["connect"] += 1
+    connection_record.info["pid"] = os.getpid()
+
+
+@event.listens_for(Pool, "checkout")
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    """Never hand a forked worker the parent's socket
+
+    gunicorn forks its workers after the app may have connected; a
+    connection inherited that way is dropped and replaced by a new one.
+    """
+    pool_events["checkout"] += 1
+    if connection_record.info.get("pid") != os.getpid():
+        pool_events["forked"] += 1
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            "Connection record belongs to pid %s, attempting to check out in pid %s"
+            % (connection_record.info.get("pid"), os.getpid())
+        )
+
+
+def pool_status():
+    """Current state of this worker's pool, plus its lifetime counters."""
+    pool = db.engine.pool
+    status = dict(pool_events)
+    if hasattr(pool, "checkedout"):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return status
+
+
+@contextmanager
+def _connect():
+    """The session's connection inside a request, a pooled one elsewhere
+
+    Within a request's unit of work, reads must see what the request has
+    flushed but not yet committed.
+    """
+    if unit_of_work.current() is not None:
+        yield db.session.connection()
+    else:
+        with db.engine.connect() as conn:
+            yield conn
+
+
+# deadlock_detected: the work lost a race and can be run again from a
+# savepoint. serialization_failure (40001) is not here, the snapshot it
+# failed on belongs to the whole transaction and a retry inside it fails
+# the same way; the caller has to retry the transaction itself.
+RETRYABLE = ("40P01",)
+
+
+def retryable(error):
+    return getattr(getattr(error, "orig", None), "pgcode", None) in RETRYABLE
+
+
+def retry_on_conflict(work, attempts=3):
+    """Run `work` in a savepoint, again if it is chosen as a deadlock victim
+
+    Only the savepoint is rolled back between attempts, so a retry keeps
+    what the transaction did before and leaves its other locks in place.
+    `work` must only flush, never commit, so the savepoint is still open
+    when it returns. Any other error, serialization failures included,
+    rolls the savepoint back and is raised.
+    """
+    for attempt in range(attempts):
+        savepoint = db.session.begin_nested()
+        try:
+            result = work()
+        except Exception as e:
+            if savepoint.is_active:
+                savepoint.rollback()
+            if not retryable(e) or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+            continue
+        if savepoint.is_active:
+            savepoint.commit()
+        return result
+
+
+def _json_agg(sql):
+    with _connect() as conn:
+        return conn.execution_options(no_parameters=True).execute(sql).scalar()
+
+
+_BIND = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+_prepared = {}
+
+
+class PreparedQuery:
+    """A json_agg query prepared once per pooled connection
+
+    Values are bound as `:name` parameters, never concatenated, so each
+    connection plans the statement on first use and then only sends
+    EXECUTE with the values. Use `prepare` to create one.
+    """
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.keys = []
+        self.sql = _BIND.sub(self._number, "select json_agg(t) from (SELECT " + sql + ")  t")
+        args = ", ".join(":" + key for key in self.keys)
+        self.statement = sqlalchemy.text(
+            "EXECUTE {0}({1})".format(name, args) if args else "EXECUTE " + name)
+
+    def _number(self, match):
+        if match.group(1) not in self.keys:
+            self.keys.append(match.group(1))
+        return "$%d" % (self.keys.index(match.group(1)) + 1)
+
+    def execute(self, conn, **params):
+        prepared = conn.connection.info.setdefault("prepared", set())
+        if self.name not in prepared:
+            conn.execution_options(no_parameters=True).execute(
+                "PREPARE {0} AS {1}".format(self.name, self.sql))
+            prepared.add(self.name)
+        return conn.execute(self.statement, **params).scalar()
+
+    def __call__(self, **params):
+        with _connect() as conn:
+            return self.execute(conn, **params)
+
+
+def prepare(name, sql):
+    """Register a named server-side prepared query
+
+    `sql` follows the `query` convention (the part after SELECT) with
+    `:name` placeholders; calling the result with those names as keyword
+    arguments returns the json_agg rows, or None when there are none.
+    """
+    prepared = PreparedQuery(name, sql)
+    if _prepared.setdefault(name, prepared).sql != prepared.sql:
+        raise ValueError("prepared query %s is already defined" % name)
+    return _prepared[name]
 
 
 def query(sql):
     current_app.logger.info(sql)
-    conn = psycopg2.connect(current_app.config["SQLALCHEMY_DATABASE_URI"])
-    cursor = conn.cursor()
-    cursor.execute("select json_agg(t) from (SELECT " + sql + ")  t")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows[0][0]
+    return _json_agg("select json_agg(t) from (SELECT " + sql + ")  t")
+
+
+def fetch_in(sql, keys):
+    """Rows of `sql` for a list of keys, bound as the expanding :keys parameter"""
+    statement = sqlalchemy.text(sql).bindparams(sqlalchemy.bindparam("keys", expanding=True))
+    with _connect() as conn:
+        return conn.execute(statement, keys=list(keys)).fetchall()
+
+
+def stream(sql, batch_size=500, **params):
+    """Yield the rows of `SELECT sql` in batches of JSON texts
+
+    Rows come through a server-side cursor, so only one batch is held in
+    memory at a time; Postgres renders each row with row_to_json, the same
+    way json_agg would. Values are bound as `:name` parameters. The pooled
+    connection stays checked out until the generator is exhausted or closed.
+    """
+    statement = sqlalchemy.text("SELECT row_to_json(t)::text FROM (SELECT " + sql + ") t")
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(statement, **params)
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
 
 
 def execute_sql(file):
     # file = open(file_path)
-    engine = sqlalchemy.create_engine(current_app.config["SQLALCHEMY_DATABASE_URI"])
     escaped_sql = sqlalchemy.text(file.read())
-    engine.execute(escaped_sql)
+    with db.engine.begin() as conn:
+        conn.execute(escaped_sql)
 
 
 def search(query):
-    conn = psycopg2.connect(current_app.config["SQLALCHEMY_DATABASE_URI"])
-    cursor = conn.cursor()
-    cursor.execute("select json_agg(t) from (SELECT * FROM " + query + ")  t")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows[0][0]
+    return _json_agg("select json_agg(t) from (SELECT * FROM " + query + ")  t")
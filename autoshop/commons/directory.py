@@ -0,0 +1,101 @@
+"""Per-process cache of holder names from a directory table
+
+`account_holders` and `item_accounts` are tables keyed by uuid, kept in
+step with their source tables by triggers (see sql/views.sql and
+sql/items.sql), so a name is a single primary key probe. Names seen by
+this process are kept for up to DIRECTORY_CACHE_TTL seconds; a commit
+that writes a row of a source table drops that row's name at once, and
+so does a rollback, as a name read inside the transaction may be one
+that never got committed.
+"""
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from autoshop.commons.dbaccess import fetch_in
+
+_directories = []
+
+
+class Directory:
+    def __init__(self, table, sources):
+        self.table = table
+        self.sources = set(sources)
+        self.sql = "SELECT uuid, name FROM {0} WHERE uuid IN :keys".format(table)
+        _directories.append(self)
+
+    def _cache(self):
+        caches = current_app.extensions.setdefault("directory_cache", {})
+        return caches.setdefault(self.table, OrderedDict())
+
+    def names(self, uuids):
+        """{uuid: name} for `uuids`, one query for those not cached"""
+        cache = self._cache()
+        now = time.time()
+        ttl = current_app.config.get("DIRECTORY_CACHE_TTL", 300)
+        found, missing = {}, set()
+        for uuid in uuids:
+            if uuid is None or uuid in found:
+                continue
+            entry = cache.get(uuid)
+            if entry is not None and now - entry[1] <= ttl:
+                cache.move_to_end(uuid)
+                found[uuid] = entry[0]
+            else:
+                missing.add(uuid)
+
+        if missing:
+            for uuid, name in fetch_in(self.sql, missing):
+                cache[uuid] = (name, now)
+                found[uuid] = name
+            size = current_app.config.get("DIRECTORY_CACHE_SIZE", 10000)
+            while len(cache) > size:
+                cache.popitem(last=False)
+        return found
+
+    def name(self, uuid):
+        return self.names([uuid]).get(uuid)
+
+    def forget(self, *uuids):
+        cache = self._cache()
+        for uuid in uuids:
+            cache.pop(uuid, None)
+
+
+def _written_holders(session, flush_context):
+    written = session.info.setdefault("directory_writes", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        uuid = getattr(obj, "uuid", None)
+        if uuid is not None and any(table in d.sources for d in _directories):
+            written.add((table, uuid))
+
+
+def _forget(written):
+    if not written or not has_app_context():
+        return
+    for directory in _directories:
+        directory.forget(*[uuid for table, uuid in written if table in directory.sources])
+
+
+def _forget_written(session):
+    # a released savepoint commits nothing yet, wait for the transaction
+    if session.transaction is not None and session.transaction.nested:
+        return
+    _forget(session.info.pop("directory_writes", None))
+
+
+def _forget_rolled_back(session, previous_transaction):
+    # writes from before a rolled back savepoint may still be committed
+    if previous_transaction.nested:
+        _forget(session.info.get("directory_writes"))
+    else:
+        _forget(session.info.pop("directory_writes", None))
+
+
+event.listen(Session, "after_flush", _written_holders)
+event.listen(Session, "after_commit", _forget_written)
+event.listen(Session, "after_soft_rollback", _forget_rolled_back)
@@ -0,0 +1,64 @@
+"""Sparse fieldsets for resources: ?fields=name,code&expand=entity
+
+`fields` lists the top level fields to dump, `entity.name` picks inside a
+nested object; `expand` adds nested objects and loads their relationships
+up front. Without either the full schema is dumped, as before.
+"""
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+# columns behind computed fields shared by many schemas; a schema adds its
+# own in a `requires` dict
+REQUIRES = {"creator": ("created_by",)}
+
+
+def _names(arg):
+    return [name.strip() for name in request.args.get(arg, "").split(",") if name.strip()]
+
+
+def select_fields(schema):
+    """`schema` restricted to the fields the request asked for"""
+    fields, expand = _names("fields"), _names("expand")
+    if not fields:
+        return schema
+    only = [
+        name for name in fields + expand if name.split(".")[0] in schema.fields
+    ]
+    return type(schema)(
+        only=only, many=schema.many, exclude=schema.exclude, context=schema.context
+    )
+
+
+def load_fields(query, schema, *columns):
+    """`query` loading only the columns `schema` dumps, plus `columns`
+
+    Relationships being expanded are loaded in one extra query each. When
+    a dumped computed field has unknown column needs every column is loaded.
+    """
+    mapper = inspect(query.column_descriptions[0]["entity"])
+    expand = [name.split(".")[0] for name in _names("expand") + _names("fields")]
+    for name in expand:
+        relationship = mapper.relationships.get(name)
+        if name in schema.fields and relationship and relationship.lazy != "dynamic":
+            query = query.options(selectinload(getattr(mapper.class_, name)))
+
+    if not _names("fields"):
+        return query
+    requires = dict(REQUIRES, **getattr(schema, "requires", {}))
+    keys = {column.key for column in columns}
+    keys.update(mapper.get_property_by_column(column).key for column in mapper.primary_key)
+    if "date_modified" in mapper.column_attrs:
+        keys.add("date_modified")
+    for name, field in schema.fields.items():
+        attribute = field.attribute or name
+        if attribute in mapper.column_attrs:
+            keys.add(attribute)
+        elif attribute in mapper.relationships:
+            for column in mapper.relationships[attribute].local_columns:
+                keys.add(mapper.get_property_by_column(column).key)
+        elif all(key in mapper.column_attrs for key in requires.get(attribute, ("",))):
+            keys.update(requires[attribute])
+        else:
+            return query
+    return query.options(load_only(*keys))
@@ -0,0 +1,80 @@
+from flask import current_app, g, has_request_context
+from marshmallow import pre_dump
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class Loader:
+    """Batch loader for one computed value, e.g. account names by id
+
+    `fetch` takes a list of keys and returns a {key: value} dict from a
+    single query. Within a request values are cached on `g` until the
+    next flush or commit, and keys primed together are fetched together; outside
+    a request every `get` fetches its own key.
+    """
+
+    def __init__(self, name, fetch, default=None):
+        self.name = name
+        self.fetch = fetch
+        self.default = default
+
+    def _cache(self):
+        if not has_request_context():
+            return None
+        return g.setdefault("loaders", {}).setdefault(self.name, {})
+
+    def prime(self, keys):
+        cache = self._cache()
+        if cache is None:
+            return
+        missing = {key for key in keys if key is not None and key not in cache}
+        if not missing:
+            return
+        try:
+            found = self.fetch(list(missing))
+        except Exception as e:
+            # leave the keys unprimed, each read then fails on its own
+            current_app.logger.warning("loader {0} failed: {1}".format(self.name, e))
+            return
+        for key in missing:
+            cache[key] = found.get(key, self.default)
+
+    def get(self, key):
+        if key is None:
+            return self.default
+        cache = self._cache()
+        if cache is None:
+            return self.fetch([key]).get(key, self.default)
+        if key not in cache:
+            cache[key] = self.fetch([key]).get(key, self.default)
+        return cache[key]
+
+
+def _forget_after_write(session, *args):
+    if has_request_context():
+        g.pop("loaders", None)
+
+
+# a flush already changes what the next read sees, balance triggers included
+event.listen(Session, "after_flush", _forget_after_write)
+event.listen(Session, "after_commit", _forget_after_write)
+
+
+class BatchedSchema:
+    """Schema mixin priming loaders for every object being dumped
+
+    `loaders` maps a dumped field to a (loader, keys) pair, where `keys`
+    returns the loader keys of one object. A page of rows then costs one
+    query per field instead of one per row; fields left out of the dump
+    are not loaded.
+    """
+
+    loaders = {}
+
+    @pre_dump(pass_many=True)
+    def prime_loaders(self, data, many):
+        objs = data if many else [data]
+        for field, (loader, keys) in self.loaders.items():
+            if field in self.fields:
+                loader.prime(key for obj in objs for key in keys(obj))
+        return data
@@ -1,32 +1,172 @@
 """Simple helper to paginate query
 """
-from flask import url_for, request
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, url_for, request
+from sqlalchemy import tuple_
+
+from autoshop.commons.conditional import not_modified, rows_validator, with_validator
+from autoshop.commons.fieldsets import load_fields, select_fields
 
 DEFAULT_PAGE_SIZE = 50
 DEFAULT_PAGE_NUMBER = 1
 
 
-def paginate(query, schema):
-    page = request.args.get('page', DEFAULT_PAGE_NUMBER)
-    per_page = request.args.get('page_size', DEFAULT_PAGE_SIZE)
-    page_obj = query.paginate(page=page, per_page=per_page)
-    next = url_for(
-        request.endpoint,
-        page=page_obj.next_num if page_obj.has_next else page_obj.page,
-        per_page=per_page,
-        **request.view_args
-    )
-    prev = url_for(
-        request.endpoint,
-        page=page_obj.prev_num if page_obj.has_prev else page_obj.page,
-        per_page=per_page,
-        **request.view_args
-    )
+def paginate(query, schema, cursor=None, watermark=None):
+    """Page of `query` dumped with `schema`
+
+    Pages are numbered (`page`, `page_size`) unless the endpoint passes
+    `cursor`, the columns of a unique descending sort key such as
+    (date_created, id), and the request carries `after`. The first cursor
+    page is asked for with an empty `after`; each `next` link then holds
+    the position of the last row, so deep pages cost the same as the
+    first. `include_total=false` skips the count in either mode.
+    `fields` and `expand` trim the dump and the columns loaded.
+
+    Pages carry an ETag and Last-Modified from the rows on the page (their
+    ids and max(date_modified)), the total and next link, and `watermark()`
+    when the endpoint dumps values kept elsewhere (balances, quantities).
+    An unchanged page is a 304 answered before it is serialized, at no
+    cost beyond the page query itself.
+    """
+    schema = select_fields(schema)
+    page = _paginate(query, schema, cursor)
+    if isinstance(page, tuple):
+        return page
+    state = rows_validator(
+        page['results'], page['total'], page['next'], watermark() if watermark else None)
+    response = not_modified(state)
+    if response is None:
+        page['results'] = schema.dump(page['results']).data
+        response = with_validator(page, state)
+    return response
+
+
+def _paginate(query, schema, cursor):
+    query = load_fields(query, schema, *(cursor or ()))
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
+    per_page = int_arg('page_size', DEFAULT_PAGE_SIZE)
+    page = int_arg('page', DEFAULT_PAGE_NUMBER)
+    if per_page is None or page is None:
+        return {'msg': 'page and page_size must be positive integers'}, 422
+    if cursor is not None and 'after' in request.args:
+        return _paginate_after(query, schema, cursor, per_page, include_total)
+
+    if include_total:
+        page_obj = query.paginate(page=page, per_page=per_page)
+        total, pages, items = page_obj.total, page_obj.pages, page_obj.items
+        has_next = page_obj.has_next
+    else:
+        # without a count, peek one row past the page instead
+        total = pages = None
+        items = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+        has_next = len(items) > per_page
+        items = items[:per_page]
+    next = url_for(request.endpoint, **_args(page=page + 1 if has_next else page))
+    prev = url_for(request.endpoint, **_args(page=page - 1 if page > 1 else page))
 
     return {
-        'total': page_obj.total,
-        'pages': page_obj.pages,
+        'total': total,
+        'pages': pages,
         'next': next,
         'prev': prev,
-        'results': schema.dump(page_obj.items).data
+        'results': items
+    }
+
+
+def _paginate_after(query, schema, cursor, per_page, include_total):
+    total = query.order_by(None).count() if include_total else None
+    if request.args.get('after'):
+        position = decode_cursor(request.args.get('after'))
+        if not isinstance(position, list) or len(position) != len(cursor):
+            return {'msg': 'Invalid cursor'}, 422
+        try:
+            values = [_from_json(column, value) for column, value in zip(cursor, position)]
+        except (TypeError, ValueError):
+            return {'msg': 'Invalid cursor'}, 422
+        query = query.filter(tuple_(*cursor) < tuple_(*values))
+
+    query = query.order_by(None).order_by(*[column.desc() for column in cursor])
+    items = query.limit(per_page + 1).all()
+
+    next = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = [getattr(items[-1], column.key) for column in cursor]
+        next = url_for(
+            request.endpoint,
+            **_args(after=encode_cursor([_to_json(value) for value in last]))
+        )
+
+    return {
+        'total': total,
+        'next': next,
+        'results': items
     }
+
+
+def int_arg(name, default):
+    """Positive integer query argument `name`, None when it is not one"""
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def _args(**changes):
+    args = request.args.to_dict()
+    args.update(request.view_args)
+    args.update(changes)
+    return args
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(column, value):
+    python_type = column.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(position):
+    """Opaque token for a keyset position, signed with the app's SECRET_KEY
+
+    Cursors may carry values the server relies on (a running balance), so
+    a client can't hand back one it edited.
+    """
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    payload = base64.urlsafe_b64encode(raw).decode('ascii')
+    return payload + '.' + _signature(payload)
+
+
+def decode_cursor(token):
+    """Keyset position from a token made by `encode_cursor`, None if invalid"""
+    try:
+        payload, signature = token.rsplit('.', 1)
+        if not hmac.compare_digest(signature, _signature(payload)):
+            return None
+        return json.loads(base64.urlsafe_b64decode(payload.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _signature(payload):
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, payload.encode('ascii'), hashlib.sha256).hexdigest()[:32]
@@ -0,0 +1,121 @@
+"""Read-through cache for reference data
+
+Payment types, transaction types, makes and the like change rarely but are
+read on most requests. Their GET responses and rows are kept per process
+(per app) until a write through the API invalidates them, and at most
+REFERENCE_CACHE_TTL seconds so that writes made through other worker
+processes are picked up.
+"""
+import hashlib
+import json
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy.orm import Session
+
+from autoshop.commons import unit_of_work
+from autoshop.extensions import db
+
+
+def _cache():
+    return current_app.extensions.setdefault(
+        "reference_cache", {"versions": Counter(), "responses": {}, "rows": {}}
+    )
+
+
+def _expired(entry):
+    return time.time() - entry["cached_at"] > current_app.config.get("REFERENCE_CACHE_TTL", 300)
+
+
+def invalidate(*models):
+    """Drop cached rows and responses built from any of `models`"""
+    cache = _cache()
+    for model in models:
+        cache["versions"][model.__tablename__] += 1
+        cache["rows"].pop(model.__tablename__, None)
+
+
+def reference_rows(model):
+    """All rows of `model`, detached from any session"""
+    rows = _cache()["rows"]
+    entry = rows.get(model.__tablename__)
+    if entry is None or _expired(entry):
+        session = Session(bind=db.engine)
+        try:
+            entry = {"rows": session.query(model).all(), "cached_at": time.time()}
+        finally:
+            session.close()
+        rows[model.__tablename__] = entry
+    return entry["rows"]
+
+
+class ReferenceMixin:
+    """Serve `get` lookups from the reference cache"""
+
+    @classmethod
+    def get(cls, **kwargs):
+        for row in reference_rows(cls):
+            if all(getattr(row, key) == value for key, value in kwargs.items()):
+                return db.session.merge(row, load=False)
+        return None
+
+
+def _etag(body):
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cached(*models):
+    """Cache a resource's GET responses until one of `models` is written
+
+    Responses carry a strong ETag; a request whose If-None-Match still
+    matches (weakly, compression weakens the tag) gets a 304 without a body.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = _cache()
+            key = (view.__qualname__, request.full_path)
+            versions = [cache["versions"][model.__tablename__] for model in models]
+            entry = cache["responses"].get(key)
+            if entry is None or entry["versions"] != versions or _expired(entry):
+                rv = view(*args, **kwargs)
+                body, status = (rv[0], rv[1]) if isinstance(rv, tuple) else (rv, 200)
+                if status != 200 or not isinstance(body, dict):
+                    return rv
+                entry = {
+                    "body": body,
+                    "etag": _etag(body),
+                    "versions": versions,
+                    "cached_at": time.time(),
+                }
+                cache["responses"][key] = entry
+
+            if request.if_none_match.contains_weak(entry["etag"]):
+                response = current_app.response_class(status=304)
+                response.set_etag(entry["etag"])
+                return response
+            return entry["body"], 200, {"ETag": '"%s"' % entry["etag"]}
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*models):
+    """Invalidate `models` once a write handler's work is committed"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            finally:
+                unit_of_work.on_commit(lambda: invalidate(*models))
+
+        return wrapper
+
+    return decorator
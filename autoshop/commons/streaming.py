@@ -0,0 +1,34 @@
+from flask import Response, request, stream_with_context
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+
+
+def wants_ndjson():
+    """True when the client asked for newline delimited JSON"""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best_match([JSON, NDJSON]) == NDJSON
+
+
+def stream_json(batches):
+    """Stream batches of JSON rows as one JSON array, or as NDJSON
+
+    `batches` yields lists of rows already rendered as JSON text (see
+    `dbaccess.stream`), which are written out as they arrive.
+    """
+    if wants_ndjson():
+        def generate():
+            for rows in batches:
+                yield "".join(row + "\n" for row in rows)
+
+        return Response(stream_with_context(generate()), mimetype=NDJSON)
+
+    def generate():
+        separator = "["
+        for rows in batches:
+            yield separator + ",".join(rows)
+            separator = ","
+        yield "]" if separator == "," else "[]"
+
+    return Response(stream_with_context(generate()), mimetype=JSON)
@@ -0,0 +1,80 @@
+"""Request scoped unit of work
+
+Inside a request `commit()` only flushes: statements run and surface
+their errors where they are issued, ids and defaults are assigned, but the
+database transaction stays open until the request is finished and is then
+committed once. Outside a request (CLI, worker) `commit()` commits at once.
+
+A `rollback()` anywhere in the request, or a 5xx response, discards the
+whole request's work.
+"""
+from flask import current_app, g, has_request_context, jsonify
+
+from autoshop.extensions import db
+
+
+class UnitOfWork:
+    def __init__(self):
+        self.pending = False
+        self.failed = False
+        self.callbacks = []
+
+
+def current():
+    if has_request_context():
+        return g.get("unit_of_work")
+    return None
+
+
+def commit():
+    """Commit, or flush and leave the commit to the enclosing request"""
+    work = current()
+    if work is None:
+        db.session.commit()
+        return
+    db.session.flush()
+    work.pending = True
+
+
+def rollback():
+    db.session.rollback()
+    work = current()
+    if work is not None:
+        work.failed = True
+
+
+def on_commit(callback):
+    """Run `callback` once the current work is committed"""
+    work = current()
+    if work is None:
+        callback()
+    else:
+        work.callbacks.append(callback)
+
+
+def finish(response):
+    work = g.pop("unit_of_work", None)
+    if work is None or not work.pending:
+        return response
+    if work.failed or response.status_code >= 500:
+        db.session.rollback()
+        return response
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("unit of work failed to commit")
+        response = jsonify(msg=str(e))
+        response.status_code = 500
+        return response
+    for callback in work.callbacks:
+        callback()
+    return response
+
+
+def init_unit_of_work(app):
+    @app.before_request
+    def begin():
+        g.unit_of_work = UnitOfWork()
+
+    app.after_request(finish)
@@ -23,8 +23,34 @@ SECRET_KEY = os.getenv("SECRET_KEY", "not-secret")
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", get_db_url())
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# per process: with 9 gunicorn workers the database sees up to
+# 9 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+if not SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
 JWT_BLACKLIST_ENABLED = True
 JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
 
 APP_KEY = os.getenv("APP_KEY", default="admin")
 APP_SECRET = os.getenv("APP_SECRET", default="admin")
+
+# seconds a worker keeps its compiled fee schedule before reloading it
+FEE_SCHEDULE_TTL = int(os.getenv("FEE_SCHEDULE_TTL", 60))
+
+# responses smaller than COMPRESS_MIN_SIZE bytes are sent as they are
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+COMPRESS_MIMETYPES = ["application/json", "application/x-ndjson", "text/csv", "text/plain"]
+
+# seconds a worker keeps cached reference data (payment types, makes, ...)
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", 300))
+
+# holder names a worker keeps, and for how many seconds
+DIRECTORY_CACHE_SIZE = int(os.getenv("DIRECTORY_CACHE_SIZE", 10000))
+DIRECTORY_CACHE_TTL = int(os.getenv("DIRECTORY_CACHE_TTL", 300))
@@ -1,7 +1,9 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 import click
+import datetime
 import os
+import time
 from flask.cli import FlaskGroup
 from flask import current_app as app
 
@@ -9,7 +11,8 @@ from autoshop.app import create_app
 from autoshop.extensions import db
 from autoshop.commons.dbaccess import execute_sql
 from autoshop.models import User, Role, PaymentType, TransactionType, \
-    CustomerType, Entity, Account, CommissionAccount
+    CustomerType, Entity, Account, AccountBalance, AccountBalanceSnapshot, \
+    CommissionAccount, ItemBalance, Transaction
 
 
 def create_autoshop(info):
@@ -91,6 +94,144 @@ def recreate_views():
     execute_sql(file)
 
 
+@cli.command('balances')
+@click.option('--verify', is_flag=True,
+              help='Only report accounts that drifted from the ledger')
+def balances(verify):
+    """Rebuild account_balances from the ledger and verify it
+    """
+
+    if not verify:
+        click.echo('rebuild account balances')
+        count = AccountBalance.rebuild()
+        click.echo('rebuilt {0} balances'.format(count))
+
+    drift = AccountBalance.drift()
+    for row in drift:
+        click.echo('account {id}: stored {stored} ledger {computed}'.format(**row))
+
+    if drift:
+        raise click.ClickException(
+            '{0} account balances do not match the ledger'.format(len(drift)))
+    click.echo('account balances match the ledger')
+
+
+@cli.command('item_balances')
+@click.option('--verify', is_flag=True,
+              help='Only report item accounts that drifted from the item ledger')
+def item_balances(verify):
+    """Rebuild item_balances from the item ledger and verify it
+    """
+
+    if not verify:
+        click.echo('rebuild item balances')
+        count = ItemBalance.rebuild()
+        click.echo('rebuilt {0} item balances'.format(count))
+
+    drift = ItemBalance.drift()
+    for row in drift:
+        click.echo('item account {uuid}: stored {stored} ({stored_value}) '
+                   'ledger {computed} ({computed_value})'.format(**row))
+
+    if drift:
+        raise click.ClickException(
+            '{0} item balances do not match the item ledger'.format(len(drift)))
+    click.echo('item balances match the item ledger')
+
+
+@cli.command('close_period')
+@click.argument('period', required=False)
+def close_period(period):
+    """Snapshot every account's closing balance for PERIOD (YYYY-MM)
+
+    Defaults to the previous month.
+    """
+
+    if period is None:
+        first = datetime.date.today().replace(day=1)
+        period = (first - datetime.timedelta(days=1)).strftime('%Y-%m')
+    try:
+        AccountBalanceSnapshot.closing_date_of(period)
+    except ValueError:
+        raise click.BadParameter('expected YYYY-MM', param_hint='period')
+
+    click.echo('close period {0}'.format(period))
+    try:
+        count = AccountBalanceSnapshot.close(period)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo('wrote {0} balance snapshots'.format(count))
+
+
+@cli.command('partitions')
+@click.option('--months', default=3, show_default=True,
+              help='Months ahead of the current one to prepare')
+def partitions(months):
+    """Create the monthly entries and item_log partitions ahead of time
+    """
+
+    today = datetime.date.today()
+    last = today.replace(day=1)
+    for _ in range(months):
+        last = (last + datetime.timedelta(days=31)).replace(day=1)
+    for table in ('entries', 'item_log'):
+        created = db.session.execute(
+            'SELECT create_accounting_partitions(:table, :start, :end)',
+            {'table': table, 'start': today, 'end': last}).scalar()
+        click.echo('{0}: {1} partitions created'.format(table, created))
+    db.session.commit()
+
+
+@cli.command('archive_period')
+@click.argument('period')
+def archive_period(period):
+    """Detach the entries partition of a closed PERIOD (YYYY-MM)
+
+    The detached table is left in place to be dumped and dropped.
+    """
+
+    partition = db.session.execute(
+        'SELECT detach_accounting_period(:period)', {'period': period}).scalar()
+    db.session.commit()
+    click.echo('detached {0}'.format(partition))
+
+
+@cli.command('worker')
+@click.option('--batch-size', default=100, show_default=True,
+              help='Transactions claimed per batch')
+@click.option('--interval', default=5.0, show_default=True,
+              help='Seconds to sleep when the queue is empty')
+@click.option('--once', is_flag=True, help='Drain the queue once and exit')
+def worker(batch_size, interval, once):
+    """Post pending (asynchronous) transactions
+
+    Run as many workers as needed, rows are claimed with SKIP LOCKED.
+    """
+
+    click.echo('worker started, {0} pending'.format(Transaction.pending()))
+    while True:
+        started = time.time()
+        try:
+            succeeded, failed = Transaction.drain(batch_size)
+        except Exception as e:
+            # e.g. a lost connection: the claimed row is unlocked, try again
+            app.logger.exception('drain failed: {0}'.format(e))
+            db.session.rollback()
+            time.sleep(interval)
+            continue
+        claimed = succeeded + failed
+        if claimed:
+            elapsed = time.time() - started
+            click.echo(
+                '{0} posted, {1} failed in {2:.2f}s ({3:.1f}/s), {4} pending'.format(
+                    succeeded, failed, elapsed, claimed / elapsed,
+                    Transaction.pending()))
+        if claimed < batch_size:
+            if once:
+                break
+            time.sleep(interval)
+
+
 @cli.command('truncate')
 def truncate():
     """truncate
@@ -135,8 +276,13 @@ def init():
     db.create_all()
     click.echo('done')
 
-    click.echo('add account balances view')
+    click.echo('partition ledger tables')
     fileDir = os.path.dirname(os.path.realpath('__file__'))
+    filename = os.path.join(fileDir, 'autoshop/sql/partitions.sql')
+    file = open(filename)
+    execute_sql(file)
+
+    click.echo('add account balances view')
     filename = os.path.join(fileDir, 'autoshop/sql/accounting.sql')
     file = open(filename)
     execute_sql(file)
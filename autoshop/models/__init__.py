@@ -1,15 +1,19 @@
-from .account import Account, AccountType, CommissionAccount
+from .account import (
+    Account, AccountBalance, AccountBalanceSnapshot, AccountHold, AccountType,
+    CommissionAccount
+)
 from .blacklist import TokenBlacklist
+from .directory import AccountHolder, ItemAccount
 from .charge import Charge, ChargeSplit, Tarriff
 from .customer import Customer
 from .entity import Entity, Vendor
-from .entry import Entry, Transaction
+from .entry import Entry, PostingContext, Transaction
 from .setting import PaymentType, Setting, TransactionType, CustomerType
 from .user import Role, User
 from .vehicle import Vehicle, VehicleModel, VehicleType, Make
 from .access_log import AccessLog
 from .service import Service, ServiceRequest, WorkItem
-from .item import Item, ItemLog, ItemCategory
+from .item import Item, ItemBalance, ItemLog, ItemCategory
 from .employee import Employee, EmployeeType, Job, JobItem
 from .local_purchase_order import LocalPurchaseOrder, LpoItem
 from .expense import Expense
@@ -25,18 +29,25 @@ __all__ = [
     "Job",
     "JobItem",
     "Item",
+    "ItemBalance",
     "ItemLog",
     "ItemCategory",
+    "ItemAccount",
     "User",
     "Role",
     "AccessLog",
     "TokenBlacklist",
     "Account",
+    "AccountBalance",
+    "AccountBalanceSnapshot",
+    "AccountHold",
+    "AccountHolder",
     "AccountType",
     "Customer",
     "Entity",
     "Vendor",
     "Entry",
+    "PostingContext",
     "Transaction",
     "Setting",
     "TransactionType",
@@ -1,4 +1,5 @@
 import datetime
+from autoshop.commons import unit_of_work
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.extensions import db
 
@@ -28,10 +29,10 @@ class AccessLog(db.Model, AuditableMixin):
         try:
             # db.session.session.expire_on_commit = False
             db.session.add(self)
-            db.session.commit()
+            unit_of_work.commit()
             return self
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -1,10 +1,57 @@
-from autoshop.commons.dbaccess import query
+import calendar
+import datetime
+
+from autoshop.commons import unit_of_work
+from autoshop.commons.dbaccess import fetch_in, prepare
+from autoshop.commons.loader import Loader
+from autoshop.commons.reference import ReferenceMixin
+from autoshop.commons.util import commas
 from autoshop.extensions import db
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin
+from autoshop.models.directory import HOLDERS
 from autoshop.models.user import User
 
-class AccountType(db.Model, BaseMixin, AuditableMixin):
+
+def _account_names(ids):
+    owners = dict(fetch_in("SELECT id, owner_id FROM accounts WHERE id IN :keys", ids))
+    names = HOLDERS.names(owners.values())
+    return {id: names.get(owner_id) for id, owner_id in owners.items()}
+
+
+ACCOUNT_NAMES = Loader("account_names", _account_names)
+
+
+def _wallets(ids):
+    wallets = {}
+    for row in fetch_in(
+        """SELECT accounts.id,account_ledgers.category, vehicle.registration_no,
+        COALESCE(sum(account_ledgers.amount), 0.0) as balance FROM accounts
+        LEFT OUTER JOIN account_ledgers ON accounts.id = account_ledgers.account_id
+        INNER JOIN vehicle on vehicle.uuid=account_ledgers.category where
+        acc_type='customer' and accounts.id IN :keys
+        GROUP BY accounts.id,account_ledgers.category,vehicle.registration_no""", ids
+    ):
+        wallets.setdefault(row.id, []).append({
+            "id": row.id,
+            "category": row.category,
+            "registration_no": row.registration_no,
+            "balance": float(row.balance),
+        })
+    return wallets
+
+
+ACCOUNT_WALLETS = Loader("account_wallets", _wallets)
+
+ACCOUNT_CATEGORIES = prepare("account_categories", """ accounts.id,account_ledgers.category,
+    category.name, COALESCE(sum(account_ledgers.amount), 0.0) as balance FROM accounts
+    LEFT OUTER JOIN account_ledgers ON accounts.id = account_ledgers.account_id
+    INNER JOIN category on category.uuid=account_ledgers.category
+    where accounts.id = :account_id
+    GROUP BY accounts.id,account_ledgers.category,category.name""")
+
+
+class AccountType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     """AccountType model
     Types are entity, vendor, customer, suspense, commission
     """
@@ -48,12 +95,12 @@ class Account(db.Model, BaseMixin, AuditableMixin):
     @property
     def balance(self):
         """Get the account balance."""
-        try:
-            return query(" balance from account_balances where id=" + str(self.id))[0][
-                "balance"
-            ]
-        except Exception:
-            return 0
+        return ACCOUNT_BALANCES.get(self.id) or 0
+
+    @property
+    def available(self):
+        """Balance less the amounts held for pending postings."""
+        return ACCOUNT_AVAILABLE.get(self.id) or 0
 
     @property
     def name(self):
@@ -61,16 +108,7 @@ class Account(db.Model, BaseMixin, AuditableMixin):
         Get the limits per category..
         this is the summation of all entries under a category
         """
-        sql = (
-            """ name FROM accounts INNER JOIN account_holders on
-        account_holders.uuid=accounts.owner_id where accounts.id =
-        """
-            + str(self.id)
-            + """"""
-        )
-
-        data = query(sql)
-        return data if data is None else data[0]["name"]
+        return ACCOUNT_NAMES.get(self.id)
 
     @property
     def wallets(self):
@@ -78,21 +116,7 @@ class Account(db.Model, BaseMixin, AuditableMixin):
         Get the limits per category..
         this is the summation of all entries under a category
         """
-        sql = (
-            """ accounts.id,account_ledgers.category,vehicle.registration_no,
-        COALESCE(sum(account_ledgers.amount), 0.0) as balance FROM accounts
-        LEFT OUTER JOIN account_ledgers ON accounts.id = account_ledgers.account_id
-        INNER JOIN vehicle on vehicle.uuid=account_ledgers.category where
-        acc_type='customer' and accounts.id = """
-            + str(self.id)
-            + """
-        GROUP BY accounts.id,account_ledgers.category,vehicle.registration_no """
-        )
-
-        wallets = query(sql)
-        if not wallets:
-            return []
-        return wallets
+        return ACCOUNT_WALLETS.get(self.id) or []
 
     @property
     def no_of_wallets(self):
@@ -100,22 +124,296 @@ class Account(db.Model, BaseMixin, AuditableMixin):
         Get the limits per category..
         this is the summation of all entries under a category
         """
-        sql = (
-            """ accounts.id,account_ledgers.category,category.name,
-        COALESCE(sum(account_ledgers.amount), 0.0) as balance FROM accounts
-        LEFT OUTER JOIN account_ledgers ON accounts.id = account_ledgers.account_id
-        INNER JOIN category on category.uuid=account_ledgers.category
-        where accounts.id = """
-            + str(self.id)
-            + """
-        GROUP BY accounts.id,account_ledgers.category,category.name"""
-        )
-
-        wallets = query(sql)
+        wallets = ACCOUNT_CATEGORIES(account_id=self.id)
         if wallets is None:
             return 0
         return len(wallets)
 
+
+# Closing balances of the last archived accounting period: the entries up
+# to it are detached from the ledger (see sql/partitions.sql), so anything
+# summing the ledger from the start has to begin from these.
+ARCHIVED_BALANCES = """WITH archived AS (
+    SELECT account_id, balance FROM account_balance_snapshots
+    WHERE accounting_period = (SELECT max(accounting_period) FROM ledger_archives)
+) """
+
+
+class AccountBalance(db.Model):
+    """Running balance of an account
+
+    Rows are kept up to date by the statement triggers on `entries`
+    (see sql/accounting.sql): every write applies its net debit/credit
+    per touched account in the same database transaction. `held` is the
+    sum of the account's open holds, moved by `AccountHold`.
+    """
+
+    __tablename__ = "account_balances"
+
+    id = db.Column(
+        db.Integer, db.ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    balance = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    held = db.Column(db.Numeric(20, 2), nullable=False, default=0, server_default="0")
+    date_modified = db.Column(
+        db.DateTime(timezone=True), default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return "<AccountBalance %s %s>" % (self.id, self.balance)
+
+    @staticmethod
+    def available_of(account_id):
+        """Available balance of one account, read from its single row."""
+        available = (
+            db.session.query(AccountBalance.balance - AccountBalance.held)
+            .filter(AccountBalance.id == account_id)
+            .scalar()
+        )
+        return float(available) if available is not None else 0
+
+    @staticmethod
+    def rebuild():
+        """Recompute every balance from the ledger.
+
+        Writers to `entries` are blocked while the rebuild runs so the
+        result matches the ledger at commit time. Archived periods count
+        through their closing snapshot. Held amounts are recomputed from
+        the open holds.
+        """
+        db.session.execute("LOCK TABLE entries IN SHARE MODE")
+        result = db.session.execute(
+            ARCHIVED_BALANCES
+            + """INSERT INTO account_balances (id, balance, date_modified)
+            SELECT accounts.id, COALESCE(archived.balance, 0.0)
+            + COALESCE(sum(account_ledgers.amount), 0.0), now()
+            FROM accounts
+            LEFT OUTER JOIN archived ON archived.account_id = accounts.id
+            LEFT OUTER JOIN account_ledgers ON accounts.id = account_ledgers.account_id
+            GROUP BY accounts.id, archived.balance
+            ON CONFLICT (id) DO UPDATE SET balance = EXCLUDED.balance,
+            date_modified = EXCLUDED.date_modified"""
+        )
+        db.session.execute(
+            """UPDATE account_balances SET held = COALESCE((
+            SELECT sum(amount) FROM account_holds WHERE account_holds.status = 'HELD'
+            AND account_holds.account_id = account_balances.id), 0.0)"""
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def drift():
+        """List the accounts whose stored balance differs from the ledger."""
+        rows = db.session.execute(
+            ARCHIVED_BALANCES
+            + """SELECT accounts.id, COALESCE(account_balances.balance, 0.0) as stored,
+            COALESCE(archived.balance, 0.0) + COALESCE(ledger.balance, 0.0) as computed
+            FROM accounts
+            LEFT OUTER JOIN account_balances ON account_balances.id = accounts.id
+            LEFT OUTER JOIN archived ON archived.account_id = accounts.id
+            LEFT OUTER JOIN (
+                SELECT account_id, sum(amount) as balance FROM account_ledgers
+                GROUP BY account_id
+            ) ledger ON ledger.account_id = accounts.id
+            WHERE account_balances.id IS NULL OR account_balances.balance
+            <> COALESCE(archived.balance, 0.0) + COALESCE(ledger.balance, 0.0)
+            ORDER BY accounts.id"""
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class AccountHold(db.Model):
+    """An amount reserved on an account for a posting still to come
+
+    Placing a hold adds its amount to the account's `held`, so the
+    available balance (balance less held) drops straight away; capturing
+    the hold once its entries are posted, or releasing it, takes the
+    amount back off. A reference holds at most once.
+    """
+
+    __tablename__ = "account_holds"
+    __table_args__ = (
+        db.Index(
+            "account_holds_held_idx", "account_id",
+            postgresql_where=db.text("status = 'HELD'"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(
+        db.Integer, db.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False
+    )
+    reference = db.Column(db.String(50), unique=True, nullable=False)
+    amount = db.Column(db.Numeric(20, 2), nullable=False)
+    status = db.Column(db.String(50), nullable=False, default="HELD")
+    date_created = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+    date_modified = db.Column(
+        db.DateTime(timezone=True), default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return "<AccountHold %s %s %s>" % (self.reference, self.amount, self.status)
+
+    @classmethod
+    def place(cls, account_id, amount, reference):
+        """Hold `amount` on an account, if its available balance allows
+
+        The balance row stays locked until the transaction ends, so two
+        holds on the same account can't both take the last of it. The hold
+        is only flushed, the caller's transaction commits it.
+        """
+        balance = (
+            db.session.query(AccountBalance.balance, AccountBalance.held)
+            .filter(AccountBalance.id == account_id)
+            .with_for_update()
+            .first()
+        )
+        available = float(balance.balance - balance.held) if balance else 0
+        minimum = db.session.query(Account.minimum_balance).filter_by(id=account_id).scalar()
+        if minimum is not None and available - float(amount) < float(minimum):
+            raise Exception("Insufficient balance on {0} account {1}".format(
+                ACCOUNT_NAMES.get(account_id), commas(available)), 409)
+
+        hold = cls(account_id=account_id, amount=amount, reference=reference)
+        db.session.add(hold)
+        cls._move(account_id, amount)
+        db.session.flush()
+        return hold
+
+    @classmethod
+    def open(cls, reference):
+        """The hold placed for `reference` if it is still held"""
+        return cls.query.filter_by(reference=reference, status="HELD").first()
+
+    def capture(self):
+        """Settle the hold once its entries are posted"""
+        self._settle("CAPTURED")
+
+    def release(self):
+        """Give the held amount back to the account"""
+        self._settle("RELEASED")
+
+    def _settle(self, status):
+        if self.status != "HELD":
+            raise Exception("This hold is already {0}".format(self.status.lower()), 409)
+        self.status = status
+        self._move(self.account_id, -self.amount)
+        db.session.flush()
+
+    @staticmethod
+    def _move(account_id, amount):
+        db.session.query(AccountBalance).filter(AccountBalance.id == account_id).update(
+            {AccountBalance.held: AccountBalance.held + amount}, synchronize_session=False
+        )
+
+
+class AccountBalanceSnapshot(db.Model):
+    """Closing balance of an account for an accounting period
+
+    Written when a period is closed, so a point-in-time balance only has
+    to add the entries dated after the nearest earlier snapshot.
+    """
+
+    __tablename__ = "account_balance_snapshots"
+    # the latest closed period is looked up on every posting
+    __table_args__ = (
+        db.Index("account_balance_snapshots_period_idx", "accounting_period"),
+    )
+
+    account_id = db.Column(
+        db.Integer, db.ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True
+    )
+    accounting_period = db.Column(db.String(50), primary_key=True)
+    closing_date = db.Column(db.Date, nullable=False)
+    balance = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    date_created = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return "<AccountBalanceSnapshot %s %s>" % (self.account_id, self.accounting_period)
+
+    @staticmethod
+    def closing_date_of(period):
+        """Last day of a `YYYY-MM` accounting period."""
+        start = datetime.datetime.strptime(period, "%Y-%m").date()
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+    @classmethod
+    def close(cls, period):
+        """Write the closing balance of every account for `period`.
+
+        Each account carries its latest earlier snapshot forward by the
+        entries dated up to the end of the period. Once closed, the period
+        and those before it take no more entries (see `Entry.period_error`).
+        Closing a period again overwrites its snapshots; later periods then
+        need closing again too. Archived periods are final.
+        """
+        closing_date = cls.closing_date_of(period)
+        archived = db.session.execute(
+            "SELECT max(accounting_period) FROM ledger_archives").scalar()
+        if archived is not None and period <= archived:
+            raise ValueError("accounting period %s has been archived" % period)
+
+        result = db.session.execute(
+            """INSERT INTO account_balance_snapshots
+            (account_id, accounting_period, closing_date, balance, date_created)
+            SELECT accounts.id, :period, :closing_date,
+            COALESCE(previous.balance, 0.0) + COALESCE(movement.amount, 0.0), now()
+            FROM accounts
+            LEFT JOIN LATERAL (
+                SELECT balance, closing_date FROM account_balance_snapshots
+                WHERE account_id = accounts.id AND closing_date < :closing_date
+                ORDER BY closing_date DESC LIMIT 1
+            ) previous ON true
+            LEFT JOIN LATERAL (
+                SELECT sum(amount) as amount FROM account_ledgers
+                WHERE account_id = accounts.id AND accounting_date <= :closing_date
+                AND accounting_date > COALESCE(previous.closing_date, '-infinity')
+            ) movement ON true
+            ON CONFLICT (account_id, accounting_period) DO UPDATE SET
+            closing_date = EXCLUDED.closing_date, balance = EXCLUDED.balance,
+            date_created = EXCLUDED.date_created""",
+            {"period": period, "closing_date": closing_date},
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @classmethod
+    def balance_as_of(cls, account_id, as_of):
+        """Balance of an account at the end of `as_of`.
+
+        Returns the balance and the snapshot it was carried from, if any.
+        """
+        snapshot = (
+            cls.query.filter(cls.account_id == account_id, cls.closing_date <= as_of)
+            .order_by(cls.closing_date.desc())
+            .first()
+        )
+
+        params = {"account_id": account_id, "as_of": as_of}
+        sql = """select COALESCE(sum(amount), 0.0) from account_ledgers
+        where account_id = :account_id and accounting_date <= :as_of"""
+        if snapshot is not None:
+            sql += " and accounting_date > :closing_date"
+            params["closing_date"] = snapshot.closing_date
+
+        balance = db.session.execute(sql, params).scalar()
+        if snapshot is not None:
+            balance += snapshot.balance
+        return float(balance), snapshot
+
+
+ACCOUNT_BALANCES = Loader("account_balances", lambda ids: {
+    balance.id: float(balance.balance)
+    for balance in AccountBalance.query.filter(AccountBalance.id.in_(ids))
+})
+
+ACCOUNT_AVAILABLE = Loader("account_available", lambda ids: {
+    balance.id: float(balance.balance - balance.held)
+    for balance in AccountBalance.query.filter(AccountBalance.id.in_(ids))
+})
+
+
 class CommissionAccount(db.Model, BaseMixin, AuditableMixin):
     """Any other account created"""
     name = db.Column(db.String(50), unique=True)
@@ -149,7 +447,7 @@ class CommissionAccount(db.Model, BaseMixin, AuditableMixin):
         
             db.session.add(self)
             db.session.add(account)
-            db.session.commit()
+            unit_of_work.commit()
         else:
             raise Exception(msg, status)
 
@@ -25,8 +25,8 @@ import json
 from flask_jwt_extended import get_jwt_identity
 from sqlalchemy import Column, DateTime, Integer, String, UnicodeText, event, inspect
 from sqlalchemy.orm import class_mapper
-from sqlalchemy.orm.attributes import get_history
 
+from autoshop.commons import unit_of_work
 from autoshop.extensions import db
 
 ACTION_CREATE = "CREATE"
@@ -117,10 +117,10 @@ class AuditLog(TimestampableMixin, MyBase):
         try:
             # db.session.session.expire_on_commit = False
             db.session.add(self)
-            db.session.commit()
+            unit_of_work.commit()
             return self
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -186,7 +186,8 @@ class AuditableMixin:
         for attr in attrs:
             hist = getattr(inspr.attrs, attr.key).history
             if hist.has_changes():
-                state_before[attr.key] = get_history(target, attr.key)[2].pop()
+                # an attribute set after it was expired has no prior value loaded
+                state_before[attr.key] = hist.deleted[0] if hist.deleted else None
                 state_after[attr.key] = getattr(target, attr.key)
 
         target.create_audit(
@@ -4,10 +4,16 @@ import datetime
 from random import choice, randint
 from flask_jwt_extended import get_jwt_identity
 
-from autoshop.commons.dbaccess import query
+from autoshop.commons import unit_of_work
+from autoshop.commons.dbaccess import fetch_in
+from autoshop.commons.loader import Loader
 from autoshop.extensions import db
 
 
+CREATORS = Loader("creators", lambda ids: dict(fetch_in(
+    "SELECT id, first_name || ' ' || last_name FROM users WHERE id IN :keys", ids)))
+
+
 class PersonMixin:
     first_name = db.Column(db.String(50))
     last_name = db.Column(db.String(50))
@@ -48,10 +54,10 @@ class BaseMixin:
         try:
             # db.session.session.expire_on_commit = False
             db.session.add(self)
-            db.session.commit()
+            unit_of_work.commit()
             return self
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -69,16 +75,7 @@ class BaseMixin:
 
     def creator(self):
         try:
-            sql = (
-                """ first_name + ' ' + last_name as username
-            FROM users
-            where users.id = """
-                + str(self.created_by)
-                + """
-            """
-            )
-            data = query(sql)
-            return data if data is None else data[0]["username"]
+            return CREATORS.get(self.created_by)
         except Exception:
             return ""
 
@@ -90,9 +87,9 @@ class BaseMixin:
         try:
             self.save()
             self.__generate_code__(label)
-            db.session.commit()
+            unit_of_work.commit()
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -100,9 +97,9 @@ class BaseMixin:
 
     def update(self):
         try:
-            db.session.commit()
+            unit_of_work.commit()
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -1,6 +1,13 @@
-from sqlalchemy import and_
+import bisect
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import Session, object_session
 
+from autoshop.commons import unit_of_work
 from autoshop.extensions import db
 from autoshop.models import Account
 from autoshop.models.audit_mixin import AuditableMixin
@@ -43,10 +50,10 @@ class ChargeBase(db.Model, BaseMixin, AuditableMixin):
         try:
             # db.session.session.expire_on_commit = False
             db.session.add(self)
-            db.session.commit()
+            unit_of_work.commit()
             return self
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -54,9 +61,9 @@ class ChargeBase(db.Model, BaseMixin, AuditableMixin):
 
     def update(self):
         try:
-            db.session.commit()
+            unit_of_work.commit()
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -103,16 +110,170 @@ class ChargeSplit(ChargeBase):
         return Account.get(uuid=self.account_code).name
 
 
-def get_charge_fee(chargecode, amount):
-    query = Charge.query.filter(
-        and_(
-            Charge.code == chargecode,
-            Charge.min_value <= amount,
-            Charge.max_value >= amount,
+Band = namedtuple("Band", "min_value max_value charge_type amount")
+Split = namedtuple("Split", "account_id account_code percentage")
+
+
+class TarriffPlan:
+    """A tarriff with its charge bands sorted for bisect lookup
+    and the accounts its fees are split to
+    """
+
+    def __init__(self, code, name, bands, splits):
+        self.code = code
+        self.name = name
+        self.bands = sorted(bands)
+        self.mins = [band.min_value for band in self.bands]
+        self.splits = splits
+
+    def band(self, amount):
+        index = bisect.bisect_right(self.mins, amount) - 1
+        if index < 0 or amount > self.bands[index].max_value:
+            return None
+        return self.bands[index]
+
+    def fee(self, amount):
+        """Fee charged on amount, None if no band covers it."""
+        band = self.band(float(amount))
+        if band is None:
+            return None
+        if band.charge_type == "percentage":
+            return (float(band.amount) / 100) * float(amount)
+        return float(band.amount)
+
+    def fees(self, amounts):
+        """Fees for many amounts in one pass over the bands
+
+        Amounts are visited in ascending order alongside the bands, so
+        pricing n amounts costs a sort plus n + len(bands) steps.
+        Returns the fees in the order of `amounts`.
+        """
+        values = [float(amount) for amount in amounts]
+        fees = [None] * len(values)
+        index = 0
+        for position in sorted(range(len(values)), key=values.__getitem__):
+            amount = values[position]
+            while index < len(self.bands) and self.bands[index].max_value < amount:
+                index += 1
+            if index == len(self.bands):
+                break
+            band = self.bands[index]
+            if band.min_value <= amount:
+                if band.charge_type == "percentage":
+                    fees[position] = (float(band.amount) / 100) * amount
+                else:
+                    fees[position] = float(band.amount)
+        return fees
+
+    def shares(self, fee):
+        """Split a fee into (split, amount) pairs."""
+        return [(split, float(split.percentage) / 100 * fee) for split in self.splits]
+
+
+class FeeSchedule:
+    """All tarriffs compiled into memory
+
+    Built with three queries and kept per process by `fee_schedule`, so
+    pricing a posting needs no database access.
+    """
+
+    def __init__(self, plans, tarriffs):
+        self.plans = plans
+        self.tarriffs = tarriffs
+
+    @classmethod
+    def compile(cls):
+        bands = {}
+        for charge in Charge.query.order_by(Charge.min_value):
+            bands.setdefault(charge.code, []).append(Band(
+                charge.min_value, charge.max_value, charge.charge_type, charge.amount
+            ))
+
+        splits = {}
+        rows = (
+            db.session.query(ChargeSplit, Account.id)
+            .outerjoin(Account, Account.uuid == ChargeSplit.account_code)
+            .order_by(ChargeSplit.id)
         )
-    ).first()
+        for split, account_id in rows:
+            if account_id is None:
+                current_app.logger.error("Charge split {0} of tarriff {1} has no account".format(
+                    split.account_code, split.code))
+            splits.setdefault(split.code, []).append(Split(
+                account_id, split.account_code, split.percentage
+            ))
+
+        plans = {}
+        tarriffs = {}
+        for tarriff in Tarriff.query.order_by(Tarriff.id):
+            plan = TarriffPlan(
+                tarriff.uuid, tarriff.name,
+                bands.get(tarriff.uuid, []), splits.get(tarriff.uuid, [])
+            )
+            plans[plan.code] = plan
+            tarriffs.setdefault(
+                (tarriff.tran_type, tarriff.payment_type, tarriff.entity_id), plan
+            )
+        return cls(plans, tarriffs)
+
+    def plan(self, code):
+        return self.plans.get(code)
+
+    def tarriff(self, tran_type, payment_type, entity_id="ALL"):
+        return self.tarriffs.get((tran_type, payment_type, entity_id))
 
-    if query.charge_type == "percentage":
-        return (int(query.amount) / 100) * int(amount)
-    else:
-        return query.amount
+    def fee(self, code, amount):
+        plan = self.plans.get(code)
+        return plan.fee(amount) if plan else None
+
+
+_fee_schedule = {"schedule": None, "compiled_at": 0.0}
+
+
+def fee_schedule():
+    """The compiled fee schedule of this process
+
+    Recompiled after a commit that changed a tarriff, charge or split, and
+    at least every FEE_SCHEDULE_TTL seconds so that changes made through
+    other worker processes are picked up.
+    """
+    ttl = current_app.config.get("FEE_SCHEDULE_TTL", 60)
+    schedule = _fee_schedule["schedule"]
+    if schedule is None or time.time() - _fee_schedule["compiled_at"] > ttl:
+        schedule = FeeSchedule.compile()
+        _fee_schedule["schedule"] = schedule
+        _fee_schedule["compiled_at"] = time.time()
+    return schedule
+
+
+def invalidate_fee_schedule():
+    _fee_schedule["schedule"] = None
+
+
+def _mark_fee_schedule_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["fee_schedule_dirty"] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop("fee_schedule_dirty", False):
+        invalidate_fee_schedule()
+
+
+def _forget_after_rollback(session, previous_transaction):
+    # a savepoint rollback keeps whatever the enclosing transaction wrote
+    if not previous_transaction.nested:
+        session.info.pop("fee_schedule_dirty", None)
+
+
+for model in (Tarriff, Charge, ChargeSplit):
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, _mark_fee_schedule_dirty)
+
+event.listen(Session, "after_commit", _invalidate_after_commit)
+event.listen(Session, "after_soft_rollback", _forget_after_rollback)
+
+
+def get_charge_fee(chargecode, amount):
+    return fee_schedule().fee(chargecode, amount)
@@ -0,0 +1,41 @@
+from autoshop.commons.directory import Directory
+from autoshop.extensions import db
+
+
+class AccountHolder(db.Model):
+    """Everyone who can hold an account, by uuid
+
+    Maintained by triggers on customer, vendor, entity, commission_account
+    and payment_type (see sql/views.sql).
+    """
+
+    __tablename__ = "account_holders"
+
+    uuid = db.Column(db.String(50), primary_key=True)
+    group = db.Column(db.String(50))
+    name = db.Column(db.String(200))
+
+    def __repr__(self):
+        return "<AccountHolder %s>" % self.name
+
+
+class ItemAccount(db.Model):
+    """Items and the vendors and entities they move between, by uuid
+
+    Maintained by triggers on item, vendor and entity (see sql/items.sql).
+    """
+
+    __tablename__ = "item_accounts"
+
+    uuid = db.Column(db.String(50), primary_key=True)
+    group = db.Column(db.String(50))
+    id = db.Column(db.Integer)
+    name = db.Column(db.String(200))
+
+    def __repr__(self):
+        return "<ItemAccount %s>" % self.name
+
+
+HOLDERS = Directory(
+    "account_holders", ("customer", "vendor", "entity", "commission_account", "payment_type"))
+ITEM_ACCOUNTS = Directory("item_accounts", ("item", "vendor", "entity"))
@@ -1,12 +1,14 @@
 import datetime
 from flask import current_app
+from autoshop.commons import unit_of_work
+from autoshop.commons.reference import ReferenceMixin
 from autoshop.extensions import db
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin
 from autoshop.models.entity import Entity
 from autoshop.models.item import ItemLog
 
-class EmployeeType(db.Model, BaseMixin, AuditableMixin):
+class EmployeeType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     """"
        mechanic, finance,
     """
@@ -142,7 +144,7 @@ class Job(db.Model, BaseMixin, AuditableMixin):
 
             db.session.add(job_item)
             db.session.add(log)
-            db.session.commit()
+            unit_of_work.commit()
 
 class JobItem(db.Model, BaseMixin, AuditableMixin):
     job_id = db.Column(db.String(50), db.ForeignKey("job.uuid"))
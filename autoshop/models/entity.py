@@ -1,3 +1,4 @@
+from autoshop.commons.loader import Loader
 from autoshop.extensions import db
 from autoshop.models.account import Account
 from autoshop.models.audit_mixin import AuditableMixin
@@ -51,6 +52,11 @@ class Entity(db.Model, BaseMixin, AuditableMixin):
         return self.vendors.filter(entity_vendors.c.vendor_id == vendor.id).count() > 0
 
 
+ENTITY_NAMES = Loader("entity_names", lambda uuids: dict(
+    db.session.query(Entity.uuid, Entity.name).filter(Entity.uuid.in_(uuids))
+))
+
+
 class Vendor(db.Model, BaseMixin, AuditableMixin):
     """Vendor model
     """
@@ -1,21 +1,30 @@
+import json
 from datetime import datetime
 
 from flask import current_app as app
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, func, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
 
-from autoshop.commons.dbaccess import query
+from autoshop.commons import unit_of_work
+from autoshop.commons.dbaccess import retry_on_conflict
 from autoshop.commons.util import commas
 from autoshop.extensions import db
-from autoshop.models import Account, Entity, CommissionAccount
+from autoshop.models import (
+    Account, AccountBalance, AccountBalanceSnapshot, AccountHold, CommissionAccount
+)
+from autoshop.models.account import ACCOUNT_NAMES
+from autoshop.models.entity import ENTITY_NAMES
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin
-from autoshop.models.charge import ChargeSplit, Tarriff, get_charge_fee
+from autoshop.models.charge import fee_schedule
 from autoshop.models.setting import TransactionType
 
 
 class Entry(db.Model):
     """Ledger model
     An entry is a record of movement of value between accounts
+    The table is partitioned by accounting_date (see sql/partitions.sql)
     """
 
     __tablename__ = "entries"
@@ -45,7 +54,7 @@ class Entry(db.Model):
 
     @property
     def entity(self):
-        return Entity.get(uuid=self.entity_id).name
+        return ENTITY_NAMES.get(self.entity_id)
 
     @property
     def debit_account(self):
@@ -53,16 +62,7 @@ class Entry(db.Model):
         Get the limits per category..
         this is the summation of all entries under a category
         """
-        sql = (
-            """ name FROM accounts INNER JOIN account_holders on
-            account_holders.uuid=accounts.owner_id where accounts.id = """
-            + str(self.debit)
-            + """
-            """
-        )
-
-        data = query(sql)
-        return data if data is None else data[0]["name"]
+        return ACCOUNT_NAMES.get(self.debit)
 
     @property
     def credit_account(self):
@@ -70,25 +70,16 @@ class Entry(db.Model):
         Get the limits per category..
         this is the summation of all entries under a category
         """
-        sql = (
-            """ name FROM accounts INNER JOIN account_holders on
-            account_holders.uuid=accounts.owner_id where accounts.id =
-            """
-            + str(self.credit)
-            + """ """
-        )
-
-        data = query(sql)
-        return data if data is None else data[0]["name"]
+        return ACCOUNT_NAMES.get(self.credit)
 
     def save(self):
         """Save an object in the database."""
         try:
             db.session.add(self)
-            db.session.commit()
+            unit_of_work.commit()
             return self
         except Exception as e:
-            db.session.rollback()
+            unit_of_work.rollback()
             return {
                 "message": "Ensure the object you're saving is valid.",
                 "exception": str(e),
@@ -105,42 +96,81 @@ class Entry(db.Model):
         """Get a specific object from the database."""
         return cls.query.filter_by(**kwargs).first()
 
-    def is_valid(self):
+    def is_valid(self, context=None):
         """validate the object"""
-        
-        if not TransactionType.get(uuid=self.tran_type):
+        context = context or getattr(self, "context", None) or PostingContext.for_entries([self])
+
+        if not context.has_tran_type(self.tran_type):
             return False, {"msg": "The transaction type {0} doesn't exist".format(self.tran_type)}, 422
-        if not Account.get(id=self.credit) and not Account.get(id=self.debit):
-            return False, {"msg": "The supplied account id does not exist"}, 422
-        if Entry.get(reference=self.reference):
+        if context.has_reference(self.reference):
             return False, {"msg": "The supplied reference already exists"}, 409
-        if Entry.get(reference=self.cheque_number):
-            return False, {"msg": "This transaction is already reversed"}, 409
-        if self.tran_type == "reversal" and not Entry.get(
-                reference=self.cheque_number
-            ):
-            return False, {"msg": "You can only reverse an existing transaction"}, 422
-        
-        # check balance
-        account = Account.get(id=self.debit)
-        bal_after = int(account.balance) - int(self.amount)
+        error = self.period_error(context) or self.reversal_error(context)
+        if error:
+            return (False,) + error
+        self.reverse(context)
+        if not context.account(self.credit) and not context.account(self.debit):
+            return False, {"msg": "The supplied account id does not exist"}, 422
+
+        # check the available balance, what is held for pending postings excluded
+        account = context.account(self.debit)
+        balance = context.available(self.debit)
+        bal_after = int(balance) - int(self.amount)
         app.logger.info(self.amount)
 
-        if account.minimum_balance is not None and float(bal_after) < float(account.minimum_balance):
-            return False, {"msg": "Insufficient balance on {0} account {1}".format(account.name,commas(account.balance))}, 409
+        if (account is not None and account.minimum_balance is not None
+                and float(bal_after) < float(account.minimum_balance)):
+            return False, {"msg": "Insufficient balance on {0} account {1}".format(
+                Account.query.get(account.id).name, commas(balance))}, 409
+
+        return True, self, 200
+
+    def period_error(self, context):
+        """(reason, status) if this entry is dated into a closed accounting period, else None
 
+        The period's closing snapshots, and once archived its detached
+        partition, would no longer add up with the entry in it.
+        """
+        closed = context.closed_through()
+        day = self.accounting_date or datetime.now().date()
+        if isinstance(day, datetime):
+            day = day.date()
+        if closed is not None and day <= closed:
+            return {"msg": "The accounting period {0} is closed".format(day.strftime("%Y-%m"))}, 422
+        return None
+
+    def reversal_error(self, context, reversed_in_batch=()):
+        """(reason, status) if this entry may not reverse `cheque_number`, else None
+
+        A reversal needs an existing original that no entry, stored or
+        earlier in the same batch, reverses already.
+        """
+        if self.tran_type != "reversal":
+            if self.cheque_number and context.has_reference(self.cheque_number):
+                return {"msg": "This transaction is already reversed"}, 409
+            return None
+        if not context.has_reference(self.cheque_number):
+            return {"msg": "You can only reverse an existing transaction"}, 422
+        if self.cheque_number in reversed_in_batch or context.is_reversed(self.cheque_number):
+            return {"msg": "This transaction is already reversed"}, 409
+        return None
+
+    def reverse(self, context):
+        """Take the accounts and amount of a reversal from its original"""
         if self.tran_type == "reversal":
-            orig = Entry.get(tranid=self.cheque_number)
+            orig = context.original(self.cheque_number)
             self.debit = orig.credit
             self.credit = orig.debit
             self.amount = orig.amount
             self.entity_id = orig.entity_id
 
-        
-        return True, self, 200
-
     @staticmethod
-    def init_expense(expense):
+    def init_expense(expense, context=None):
+        context = context or PostingContext(
+            owners=[expense.pay_type],
+            codes=['credit', 'expenses'],
+            tran_types=['expense'],
+            references=[expense.uuid, expense.uuid + '-credit', expense.reference],
+        )
         entry = Entry(
             reference=expense.uuid,
             amount=expense.amount,
@@ -152,26 +182,33 @@ class Entry(db.Model):
             category=expense.item,
             pay_type=expense.pay_type,
         )
-                        
+        entry.context = context
+
         if expense.pay_type == 'credit':
-            entry.debit = CommissionAccount.get(code='credit').account.id
-            entry.credit = CommissionAccount.get(code='expenses').account.id
+            entry.debit = context.commission('credit').id
+            entry.credit = context.commission('expenses').id
             entry.reference = entry.reference + '-credit'
         elif expense.on_credit and expense.pay_type != 'credit' and expense.credit_status in ('PAID','PARTIAL'):
-            entry.debit = Account.get(owner_id=expense.pay_type).id
-            entry.credit = CommissionAccount.get(code='credit').account.id
+            entry.debit = context.owner(expense.pay_type).id
+            entry.credit = context.commission('credit').id
         else:
-            entry.debit = Account.get(owner_id=expense.pay_type).id
-            entry.credit = CommissionAccount.get(code='expenses').account.id
+            entry.debit = context.owner(expense.pay_type).id
+            entry.credit = context.commission('expenses').id
 
-        valid, reason, status = entry.is_valid()
+        valid, reason, status = entry.is_valid(context)
         if valid:
             return entry
         else:
             raise Exception(reason, status)
 
     @staticmethod
-    def init_item_log(item_log):
+    def init_item_log(item_log, context=None):
+        context = context or PostingContext(
+            owners=[item_log.pay_type, item_log.debit],
+            codes=['credit'],
+            tran_types=[item_log.category],
+            references=[item_log.uuid, item_log.uuid + '-credit'],
+        )
         entry = Entry(
             reference=item_log.uuid,
             amount=item_log.amount,
@@ -182,26 +219,33 @@ class Entry(db.Model):
             category=item_log.item_id,
             pay_type=item_log.pay_type,
         )
-                        
+        entry.context = context
+
         if item_log.pay_type == 'credit':
-            entry.debit = CommissionAccount.get(code='credit').account.id
-            entry.credit = Account.get(owner_id=item_log.debit).id
+            entry.debit = context.commission('credit').id
+            entry.credit = context.owner(item_log.debit).id
             entry.reference = entry.reference + '-credit'
         elif item_log.on_credit and item_log.pay_type != 'credit' and item_log.credit_status == 'PAID':
-            entry.debit = Account.get(owner_id=item_log.pay_type).id
-            entry.credit = CommissionAccount.get(code='credit').account.id
+            entry.debit = context.owner(item_log.pay_type).id
+            entry.credit = context.commission('credit').id
         else:
-            entry.debit = Account.get(owner_id=item_log.pay_type).id
-            entry.credit = Account.get(owner_id=item_log.debit).id
+            entry.debit = context.owner(item_log.pay_type).id
+            entry.credit = context.owner(item_log.debit).id
 
-        valid, reason, status = entry.is_valid()
+        valid, reason, status = entry.is_valid(context)
         if valid:
             return entry
         else:
             raise Exception(reason, status)
-    
+
     @staticmethod
-    def init_expenditure(expenditure):
+    def init_expenditure(expenditure, context=None):
+        context = context or PostingContext(
+            owners=[expenditure.pay_type],
+            codes=['credit', expenditure.category],
+            tran_types=[expenditure.category],
+            references=[expenditure.uuid, expenditure.uuid + '-credit', expenditure.reference],
+        )
         entry = Entry(
             reference=expenditure.uuid,
             amount=expenditure.amount,
@@ -213,22 +257,24 @@ class Entry(db.Model):
             category=expenditure.vendor_id,
             pay_type=expenditure.pay_type,
         )
-                        
+        entry.context = context
+
         if expenditure.pay_type == 'credit':
-            entry.debit = CommissionAccount.get(code='credit').account.id
-            entry.credit = CommissionAccount.get(code=expenditure.category).account.id
+            entry.debit = context.commission('credit').id
+            entry.credit = context.commission(expenditure.category).id
             entry.reference = entry.reference + '-credit'
         elif expenditure.on_credit and expenditure.pay_type != 'credit' and expenditure.credit_status in ('PAID','PARTIAL'):
-            entry.debit = Account.get(owner_id=expenditure.pay_type).id
-            entry.credit = CommissionAccount.get(code='credit').account.id
+            entry.debit = context.owner(expenditure.pay_type).id
+            entry.credit = context.commission('credit').id
         else:
-            entry.debit = Account.get(owner_id=expenditure.pay_type).id
-            entry.credit = CommissionAccount.get(code=expenditure.category).account.id
+            entry.debit = context.owner(expenditure.pay_type).id
+            entry.credit = context.commission(expenditure.category).id
 
         return entry
 
     @staticmethod
-    def init_transaction(transaction):
+    def init_transaction(transaction, context=None):
+        context = context or PostingContext.for_transaction(transaction)
         entry = Entry(
             reference=transaction.uuid,
             amount=transaction.amount,
@@ -239,50 +285,47 @@ class Entry(db.Model):
             category=transaction.category,
             pay_type=transaction.pay_type,
         )
-        
-        cust_acct = Account.get(owner_id=transaction.reference)
+        entry.context = context
+
+        cust_acct = context.owner(transaction.reference)
 
         if transaction.tran_type == 'payment':
-            entry.debit = CommissionAccount.get(code='escrow').account.id
+            entry.debit = context.commission('escrow').id
             entry.credit = cust_acct.id
         elif transaction.tran_type == 'bill':
-            entry.debit = cust_acct.id        
-            entry.credit = Account.get(owner_id=transaction.entity_id).id
+            entry.debit = cust_acct.id
+            entry.credit = context.owner(transaction.entity_id).id
         else:
             raise Exception("Failed to determine transaction accounts")
 
-        valid, reason, status = entry.is_valid()
+        valid, reason, status = entry.is_valid(context)
         if valid:
             return entry
         else:
             raise Exception(reason, status)
 
-    def get_entries(self):
+    def get_entries(self, context=None):
+        context = context or getattr(self, "context", None) or PostingContext.for_entries([self])
         entries = [self]
 
-        charge = Tarriff.get(
-            tran_type=self.tran_type, payment_type=self.pay_type, entity_id="ALL"
-        )
-
-        if charge:
-            charge_fee = get_charge_fee(charge.code, self.amount)
-
-            splits = ChargeSplit.query.filter_by(code=charge.code).all()
-
-            for split in splits:
-                name = "charge-" + str(splits.index(split) + 1)
-                fee = float(split.percentage / 100) * float(charge_fee)
+        plan = fee_schedule().tarriff(self.tran_type, self.pay_type, "ALL")
+        fee = plan.fee(self.amount) if plan else None
 
+        if fee:
+            for split, share in plan.shares(fee):
+                # never post a share nobody is credited with
+                if split.account_id is None:
+                    raise Exception("The {0} charge split {1} has no account".format(
+                        plan.name, split.account_code), 500)
                 e = Entry(
                     reference=self.reference,
-                    amount=fee,
+                    amount=share,
                     debit=self.debit,
-                    credit=Account.get(code=split.account_code).id,
-                    description=charge.name,
+                    credit=split.account_id,
+                    description=plan.name,
                     tran_type="charge",
                     phone=self.phone,
                     pay_type=self.pay_type,
-                    utility_code=name,
                     entity_id=self.entity_id,
                 )
                 entries.append(e)
@@ -297,13 +340,13 @@ class Entry(db.Model):
                 pay_type=self.pay_type,
                 entity_id=self.entity_id
             )
-            payment_entry.debit = Account.get(owner_id=self.entity_id).id
-            payment_entry.credit = Account.get(owner_id=self.pay_type).id
+            payment_entry.debit = context.owner(self.entity_id).id
+            payment_entry.credit = context.owner(self.pay_type).id
             entries.append(payment_entry)
 
         return entries
 
-    def transact(self):
+    def transact(self, context=None):
         """
         :rtype: object
         If a customer is invoiced, value is debited off their account onto
@@ -313,18 +356,130 @@ class Entry(db.Model):
 
         In the future, the payment type account ought to be created per entity
         """
-        valid, reason, status = self.is_valid()
+        context = context or getattr(self, "context", None) or PostingContext.for_entries([self])
+        valid, reason, status = self.is_valid(context)
         if not valid:
             raise Exception(reason.get('msg'), status)
 
-        entries = self.get_entries()
+        entries = self.get_entries(context)
+
+        # check again against the balances held under lock
+        context.lock({e.debit for e in entries} | {e.credit for e in entries})
+        valid, reason, status = self.is_valid(context)
+        if not valid:
+            raise Exception(reason.get('msg'), status)
 
         for entr in entries:
             db.session.add(entr)
 
-        db.session.commit()
+        # committed by the caller: the request's unit of work or the worker
+        db.session.flush()
+
+    @classmethod
+    def validate_batch(cls, entries):
+        """Validate a list of entries with one query per lookup
+
+        Applies the same rules as `is_valid` to every entry, plus reference
+        uniqueness within the batch and one balance check per debited
+        account against the net movement of the whole batch.
+        Returns a (valid, reason, status) tuple per entry.
+        """
+        for entry in entries:
+            entry.debit = int(entry.debit) if entry.debit else None
+            entry.credit = int(entry.credit) if entry.credit else None
+
+        context = PostingContext.for_entries(entries)
+        results = []
+        seen = set()
+        reversed_in_batch = set()
+        for entry in entries:
+            entry.context = context
+            error = entry.period_error(context) or entry.reversal_error(context, reversed_in_batch)
+            if not context.has_tran_type(entry.tran_type):
+                results.append((False, {"msg": "The transaction type {0} doesn't exist".format(entry.tran_type)}, 422))
+            elif context.has_reference(entry.reference) or entry.reference in seen:
+                results.append((False, {"msg": "The supplied reference already exists"}, 409))
+            elif error:
+                results.append((False,) + error)
+            else:
+                entry.reverse(context)
+                if not context.account(entry.debit) and not context.account(entry.credit):
+                    results.append((False, {"msg": "The supplied account id does not exist"}, 422))
+                else:
+                    results.append((True, entry, 200))
+                    if entry.tran_type == "reversal":
+                        reversed_in_batch.add(entry.cheque_number)
+            seen.add(entry.reference)
+
+        # net movement per account over everything the batch would post
+        deltas = {}
+        for valid, entry, status in results:
+            if valid:
+                for e in entry.get_entries(context):
+                    deltas[e.debit] = deltas.get(e.debit, 0) - float(e.amount)
+                    deltas[e.credit] = deltas.get(e.credit, 0) + float(e.amount)
+        context.lock(deltas)
+
+        for index, (valid, entry, status) in enumerate(results):
+            if not valid:
+                continue
+            account = context.account(entry.debit)
+            if account is None or account.minimum_balance is None:
+                continue
+            balance = context.available(account.id)
+            if balance + deltas[account.id] < float(account.minimum_balance):
+                results[index] = (False, {"msg": "Insufficient balance on {0} account {1}".format(
+                    Account.query.get(account.id).name, commas(balance))}, 409)
+
+        return results
+
+    @classmethod
+    def transact_batch(cls, entries):
+        """Validate and post a list of entries in one database transaction
+
+        The batch is all or nothing: if any entry is invalid nothing is
+        posted. Valid entries (and their charges) are written with a
+        single INSERT, so the balance triggers run once per touched
+        account, and the whole batch is committed once.
+        Returns a (posted, reason, status) tuple per entry.
+        """
+        results = cls.validate_batch(entries)
+        if not all(valid for valid, reason, status in results):
+            return [
+                (False, reason, status) if not valid
+                else (False, {"msg": "Not posted, the batch has invalid entries"}, 424)
+                for valid, reason, status in results
+            ]
+
+        rows = []
+        for entry in entries:
+            for e in entry.get_entries():
+                e.accounting_date = e.accounting_date or entry.accounting_date
+                row = e.serialize()
+                row.pop("id")
+                if e.accounting_date:
+                    row["accounting_period"] = e.accounting_date.strftime("%Y-%m")
+                rows.append(row)
+
+        try:
+            db.session.execute(
+                """INSERT INTO entries (reference, amount, debit, credit, tran_type,
+                phone, category, pay_type, description, cheque_number, entity_id,
+                date_created, accounting_date, accounting_period)
+                SELECT reference, amount, debit, credit, tran_type, phone, category,
+                pay_type, description, cheque_number, entity_id,
+                COALESCE(date_created, now()), COALESCE(accounting_date, current_date),
+                accounting_period
+                FROM json_populate_recordset(NULL::entries, :rows)""",
+                {"rows": json.dumps(rows, default=str)},
+            )
+            unit_of_work.commit()
+        except Exception as e:
+            unit_of_work.rollback()
+            return [(False, {"msg": str(e)}, 500) for entry in entries]
+
+        return [(True, entry, 201) for entry in entries]
 
-        
     def sms(self, phone):
         try:
             from autoshop.commons.messaging import send_sms_async
@@ -351,7 +506,253 @@ class Entry(db.Model):
             pass
 
 
+class PostingContext:
+    """Lookups shared by the entries of one posting
+
+    Accounts (with their balance and commission code) come back in one
+    query, and transaction types together with already used references in
+    another. `is_valid`, the `init_*` factories and `get_entries` all read
+    from here, so a posting costs the same number of queries however many
+    entries it produces. Keys that were not asked for up front are looked
+    up on first use and cached, misses included.
+    """
+
+    def __init__(self, ids=(), owners=(), codes=(), groups_of=(), tran_types=(), references=(),
+                 reversals=()):
+        self.accounts = {}
+        self.owners = {}
+        self.codes = {}
+        self.tran_types = {}
+        self.references = {}
+        self.originals = {}
+        self.reversed = {}
+        self.periods = {}
+        self.locked = {}
+        self.released = {}
+        self.load_accounts(ids=ids, owners=owners, codes=codes, groups_of=groups_of)
+        self.load_keys(tran_types=tran_types, references=references, reversals=reversals)
+
+    @classmethod
+    def for_entries(cls, entries):
+        references = {e.reference for e in entries} | {
+            e.cheque_number for e in entries if e.cheque_number
+        }
+        reversals = [e.cheque_number for e in entries if e.tran_type == "reversal"]
+        context = cls(
+            ids={e.debit for e in entries} | {e.credit for e in entries},
+            tran_types={e.tran_type for e in entries},
+            references=references,
+            reversals=reversals,
+        )
+        context.load_originals(reversals)
+        return context
+
+    @classmethod
+    def for_transaction(cls, transaction):
+        """Customer, its entity, escrow and pay type accounts"""
+        return cls(
+            owners=[transaction.reference, transaction.pay_type],
+            groups_of=[transaction.reference],
+            codes=["escrow"],
+            tran_types=[transaction.tran_type],
+            references=[transaction.uuid],
+        )
+
+    def load_accounts(self, ids=(), owners=(), codes=(), groups_of=()):
+        ids = {int(i) for i in ids if i is not None} - set(self.accounts)
+        owners = {o for o in owners if o is not None} - set(self.owners)
+        codes = {c for c in codes if c is not None} - set(self.codes)
+        groups_of = {g for g in groups_of if g is not None}
+
+        conditions = []
+        if ids:
+            conditions.append(Account.id.in_(ids))
+        if owners:
+            conditions.append(Account.owner_id.in_(owners))
+        if codes:
+            conditions.append(CommissionAccount.code.in_(codes))
+        if groups_of:
+            holder = aliased(Account)
+            conditions.append(Account.owner_id.in_(
+                db.session.query(holder.group).filter(holder.owner_id.in_(groups_of)).subquery()
+            ))
+        if not conditions:
+            return
+
+        rows = (
+            db.session.query(
+                Account.id, Account.owner_id, Account.group, Account.minimum_balance,
+                AccountBalance.balance, AccountBalance.held, CommissionAccount.code,
+            )
+            .outerjoin(AccountBalance, AccountBalance.id == Account.id)
+            .outerjoin(CommissionAccount, CommissionAccount.uuid == Account.owner_id)
+            .filter(or_(*conditions))
+            .order_by(Account.id)
+        )
+        for row in rows:
+            self.accounts[row.id] = row
+            self.owners.setdefault(row.owner_id, row)
+            if row.code:
+                self.codes.setdefault(row.code, row)
+
+        for key in ids:
+            self.accounts.setdefault(key, None)
+        for key in owners:
+            self.owners.setdefault(key, None)
+        for key in codes:
+            self.codes.setdefault(key, None)
+
+    def load_keys(self, tran_types=(), references=(), reversals=()):
+        """Which transaction types and references exist, and which of the
+        references in `reversals` an entry already reverses"""
+        tran_types = {t for t in tran_types if t is not None} - set(self.tran_types)
+        references = {r for r in references if r is not None} - set(self.references)
+        reversals = {r for r in reversals if r is not None} - set(self.reversed)
+
+        queries = []
+        if tran_types:
+            queries.append(
+                db.session.query(
+                    literal_column("'tran_type'").label("kind"),
+                    TransactionType.uuid.label("key"),
+                )
+                .filter(TransactionType.uuid.in_(tran_types))
+            )
+        if references:
+            queries.append(
+                db.session.query(
+                    literal_column("'reference'").label("kind"),
+                    Entry.reference.label("key"),
+                )
+                .filter(Entry.reference.in_(references))
+            )
+        if reversals:
+            queries.append(
+                db.session.query(
+                    literal_column("'reversed'").label("kind"),
+                    Entry.cheque_number.label("key"),
+                )
+                .filter(Entry.cheque_number.in_(reversals))
+            )
+        if not queries:
+            return
+
+        query = queries[0].union_all(*queries[1:]) if len(queries) > 1 else queries[0]
+        found = {(row.kind, row.key) for row in query}
+        for key in tran_types:
+            self.tran_types[key] = ("tran_type", key) in found
+        for key in references:
+            self.references[key] = ("reference", key) in found
+        for key in reversals:
+            self.reversed[key] = ("reversed", key) in found
+
+    def load_originals(self, references):
+        references = {r for r in references if r is not None} - set(self.originals)
+        if not references:
+            return
+        for entry in Entry.query.filter(Entry.reference.in_(references)).order_by(Entry.id):
+            self.originals.setdefault(entry.reference, entry)
+
+    def account(self, id):
+        if id is None:
+            return None
+        if int(id) not in self.accounts:
+            self.load_accounts(ids=[id])
+        return self.accounts[int(id)]
+
+    def owner(self, owner_id):
+        if owner_id not in self.owners:
+            self.load_accounts(owners=[owner_id])
+        return self.owners.get(owner_id)
+
+    def commission(self, code):
+        if code not in self.codes:
+            self.load_accounts(codes=[code])
+        return self.codes.get(code)
+
+    def lock(self, ids):
+        """Lock the balance rows of `ids` until the transaction ends
+
+        Rows are locked in id order, the order the balance triggers update
+        them in, so concurrent postings over the same accounts queue up
+        instead of deadlocking; lock everything a posting touches in one
+        call. Balances read under the lock take over from those loaded
+        up front.
+        """
+        ids = sorted({int(i) for i in ids if i is not None} - set(self.locked))
+        if not ids:
+            return
+        rows = (
+            db.session.query(AccountBalance.id, AccountBalance.balance, AccountBalance.held)
+            .filter(AccountBalance.id.in_(ids))
+            .order_by(AccountBalance.id)
+            .with_for_update()
+        )
+        for row in rows:
+            self.locked[row.id] = row
+        for key in ids:
+            self.locked.setdefault(key, None)
+
+    def release(self, hold):
+        """Count `hold` as available again, it is captured by this posting"""
+        self.released[hold.account_id] = self.released.get(hold.account_id, 0) + float(hold.amount)
+
+    def _balance_row(self, id):
+        if id is not None and int(id) in self.locked:
+            return self.locked[int(id)]
+        return self.account(id)
+
+    def balance(self, id):
+        row = self._balance_row(id)
+        if row is None or row.balance is None:
+            return 0
+        return float(row.balance)
+
+    def available(self, id):
+        """Balance less what open holds keep back"""
+        row = self._balance_row(id)
+        if row is None:
+            return 0
+        return self.balance(id) - float(row.held or 0) + self.released.get(int(id), 0)
+
+    def has_tran_type(self, uuid):
+        if uuid not in self.tran_types:
+            self.load_keys(tran_types=[uuid])
+        return self.tran_types.get(uuid, False)
+
+    def has_reference(self, reference):
+        if reference not in self.references:
+            self.load_keys(references=[reference])
+        return self.references.get(reference, False)
+
+    def closed_through(self):
+        """Last day of the latest closed accounting period, None if none is"""
+        if "closed" not in self.periods:
+            period = db.session.query(func.max(AccountBalanceSnapshot.accounting_period)).scalar()
+            self.periods["closed"] = period and AccountBalanceSnapshot.closing_date_of(period)
+        return self.periods["closed"]
+
+    def is_reversed(self, reference):
+        if reference not in self.reversed:
+            self.load_keys(reversals=[reference])
+        return self.reversed.get(reference, False)
+
+    def original(self, reference):
+        if reference not in self.originals:
+            self.load_originals([reference])
+        return self.originals.get(reference)
+
+
 class Transaction(db.Model, BaseMixin, AuditableMixin):
+    __table_args__ = (
+        db.UniqueConstraint("vendor_id", "tranid", name="transaction_vendor_id_tranid_key"),
+        db.Index(
+            "transaction_pending_idx", "id",
+            postgresql_where=db.text("status = 'PENDING'"),
+        ),
+        db.Index("transaction_date_created_id_idx", "date_created", "id"),
+    )
+
     tranid = db.Column(db.String(50))
     reference = db.Column(db.String(50))  # customer/vendor id
     vendor_id = db.Column(db.String(50))
@@ -375,3 +776,165 @@ class Transaction(db.Model, BaseMixin, AuditableMixin):
 
     def __repr__(self):
         return "<Transaction %s>" % self.uuid
+
+    @classmethod
+    def ingest(cls, transaction):
+        """Insert the transaction unless its (vendor_id, tranid) is already taken
+
+        Returns the stored row and whether this call created it. The no-op
+        update on conflict makes the same statement hand back the original
+        row to a retry, even one racing the first insert, so duplicates
+        cost one round trip and never reach posting. Both keys are
+        required: a NULL never conflicts, so it would let duplicates in.
+        """
+        if not transaction.vendor_id or not transaction.tranid:
+            raise Exception("A transaction needs a vendor and a tranid", 422)
+
+        table = cls.__table__
+        values = {
+            column.key: getattr(transaction, column.key)
+            for column in table.columns
+            if column.key != "id" and getattr(transaction, column.key) is not None
+        }
+        statement = insert(table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.vendor_id, table.c.tranid],
+            set_={"tranid": statement.excluded.tranid},
+        ).returning(*table.columns)
+
+        result = db.session.execute(statement)
+        stored = next(db.session.query(cls).instances(result))
+        return stored, stored.uuid == transaction.uuid
+
+    def process(self, context=None):
+        """Post the entries for this transaction and mark it processed
+
+        The hold placed when it was submitted is captured by the posting.
+        """
+        context = context or PostingContext.for_transaction(self)
+        self.entity_id = context.owner(self.reference).group
+        hold = AccountHold.open(self.uuid)
+        if hold is not None:
+            context.release(hold)
+
+        entry = Entry.init_transaction(self, context)
+        self.processed = True
+        self.status = "SUCCESS"
+        entry.transact(context)
+        if hold is not None:
+            hold.capture()
+
+    def hold(self):
+        """Hold what posting this transaction will take off its debit account"""
+        context = PostingContext.for_transaction(self)
+        self.entity_id = context.owner(self.reference).group
+
+        entry = Entry.init_transaction(self, context)
+        amount = sum(
+            float(e.amount) for e in entry.get_entries(context) if e.debit == entry.debit
+        )
+        return AccountHold.place(entry.debit, amount, self.uuid)
+
+    @classmethod
+    def post(cls, transaction):
+        """Ingest a synchronous transaction and post it in one database transaction
+
+        The row, its entries and the balance updates their triggers make are
+        only flushed here and are committed together with the request, so
+        there is no moment where a SUCCESS row exists without its entries.
+        Posting runs in a savepoint, retried when it is chosen as a
+        deadlock victim; when it fails the entries are rolled
+        back and the failure is recorded on the row itself, which still
+        goes out in that same single commit, before an error is raised.
+        That error keeps the failure's own 4xx status; anything else is
+        answered as a 422, since a 5xx would roll the recorded failure back.
+        Returns the stored row and whether this call created it.
+        """
+        return cls._ingest_then(transaction, cls.process)
+
+    @classmethod
+    def submit(cls, transaction):
+        """Ingest an asynchronous transaction and hold its amount
+
+        The debit account's available balance drops by what the posting
+        will take as soon as the transaction is accepted, so later
+        authorizations see it while the background worker catches up.
+        A transaction that can't be held is recorded as FAILED.
+        Returns the stored row and whether this call created it.
+        """
+        return cls._ingest_then(transaction, cls.hold)
+
+    @classmethod
+    def _ingest_then(cls, transaction, step):
+        stored, created = cls.ingest(transaction)
+        if not created:
+            return stored, False
+
+        try:
+            retry_on_conflict(lambda: step(stored))
+        except Exception as e:
+            stored.fail(e)
+            unit_of_work.commit()
+            status = e.args[1] if len(e.args) > 1 and isinstance(e.args[1], int) else 500
+            if status >= 500:
+                app.logger.exception("posting {0} failed".format(stored.uuid))
+            raise Exception(stored.reason or "The transaction could not be posted",
+                            status if status < 500 else 422)
+        return stored, True
+
+    def fail(self, error):
+        """Mark the transaction as processed without success
+
+        Whatever was held for it is given back.
+        """
+        self.processed = True
+        self.status = "FAILED"
+        self.reason = str(error.args[0]) if error.args else str(error)
+        hold = AccountHold.open(self.uuid)
+        if hold is not None:
+            hold.release()
+
+    @classmethod
+    def pending(cls):
+        """Number of transactions waiting for the background worker"""
+        return cls.query.filter_by(status="PENDING").count()
+
+    @classmethod
+    def claim(cls):
+        """Lock the oldest pending transaction no other worker holds, if any"""
+        return (
+            cls.query.filter_by(status="PENDING")
+            .order_by(cls.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+
+    @classmethod
+    def drain(cls, batch_size=100):
+        """Post up to `batch_size` pending transactions, committing each one
+
+        Rows are claimed one at a time with FOR UPDATE SKIP LOCKED, so
+        several workers can drain the queue side by side without taking
+        the same row. Every transaction commits together with its
+        entries, so the balance rows its posting locks (in id order) are
+        only held for that posting, not for a whole batch. A failure
+        rolls back the posting's savepoint and commits the row as FAILED
+        with why; a deadlock is retried first.
+        Returns a (succeeded, failed) tuple.
+        """
+        succeeded = failed = 0
+        for _ in range(batch_size):
+            transaction = cls.claim()
+            if transaction is None:
+                # end the read that found nothing
+                db.session.rollback()
+                break
+            try:
+                retry_on_conflict(transaction.process)
+                succeeded += 1
+            except Exception as e:
+                transaction.fail(e)
+                failed += 1
+            db.session.commit()
+        return succeeded, failed
@@ -1,13 +1,21 @@
 import datetime
 from sqlalchemy import CheckConstraint
-from flask import current_app as app
 
 from autoshop.extensions import db
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin
-from autoshop.commons.dbaccess import query
+from autoshop.models.directory import ITEM_ACCOUNTS
+from autoshop.commons import unit_of_work
+from autoshop.commons.loader import Loader
 from autoshop.commons.util import commas
 
+ITEM_QUANTITIES = Loader("item_quantities", lambda uuids: {
+    balance.uuid: balance.quantity
+    for balance in ItemBalance.query.filter(ItemBalance.uuid.in_(uuids))
+})
+
+ITEM_ACCOUNT_NAMES = Loader("item_account_names", ITEM_ACCOUNTS.names)
+
 class ItemCategory(db.Model, BaseMixin, AuditableMixin):
     name = db.Column(db.String(200), unique=True, nullable=False)
     description = db.Column(db.String(2000))
@@ -59,20 +67,103 @@ class Item(db.Model, BaseMixin, AuditableMixin):
     def quantity(self):
         """Get the item balance."""
         try:
-            return query(
-                " quantity from item_balances where uuid='" + str(self.uuid) + "'"
-            )[0]["quantity"]
+            return ITEM_QUANTITIES.get(self.uuid) or 0
         except Exception:
             return 0
 
 
+class ItemBalance(db.Model):
+    """Stock of an item, and of the vendors and entities it moves between
+
+    Rows are kept up to date by the statement triggers on `item_log`
+    (see sql/items.sql): every write applies its net quantity and value
+    per touched uuid in the same database transaction.
+    """
+
+    __tablename__ = "item_balances"
+
+    uuid = db.Column(db.String(50), primary_key=True)
+    quantity = db.Column(db.BigInteger, nullable=False, default=0)
+    balance = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    date_modified = db.Column(
+        db.DateTime(timezone=True), default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return "<ItemBalance %s %s>" % (self.uuid, self.quantity)
+
+    @staticmethod
+    def stock(uuid):
+        """Quantity held by `uuid`, its row locked until the transaction ends
+
+        Concurrent sales of the same item then check their stock one after
+        the other instead of both selling the last unit.
+        """
+        quantity = (
+            db.session.query(ItemBalance.quantity)
+            .filter(ItemBalance.uuid == uuid)
+            .with_for_update()
+            .scalar()
+        )
+        return int(quantity or 0)
+
+    @staticmethod
+    def rebuild():
+        """Recompute every stock balance from the item ledger.
+
+        Writers to `item_log` are blocked while the rebuild runs so the
+        result matches the ledger at commit time.
+        """
+        db.session.execute("LOCK TABLE item_log IN SHARE MODE")
+        result = db.session.execute(
+            """INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+            SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0),
+            COALESCE(sum(item_ledger.amount), 0.0), now()
+            FROM item_accounts
+            LEFT OUTER JOIN item_ledger ON item_accounts.uuid = item_ledger.account_id
+            GROUP BY item_accounts.uuid
+            ON CONFLICT (uuid) DO UPDATE SET quantity = EXCLUDED.quantity,
+            balance = EXCLUDED.balance, date_modified = EXCLUDED.date_modified"""
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def drift():
+        """List the item accounts whose stored stock differs from the ledger."""
+        rows = db.session.execute(
+            """SELECT item_accounts.uuid, COALESCE(item_balances.quantity, 0) as stored,
+            COALESCE(ledger.quantity, 0) as computed,
+            COALESCE(item_balances.balance, 0.0) as stored_value,
+            COALESCE(ledger.balance, 0.0) as computed_value
+            FROM item_accounts
+            LEFT OUTER JOIN item_balances ON item_balances.uuid = item_accounts.uuid
+            LEFT OUTER JOIN (
+                SELECT account_id, sum(quantity) as quantity, sum(amount) as balance
+                FROM item_ledger GROUP BY account_id
+            ) ledger ON ledger.account_id = item_accounts.uuid
+            WHERE item_balances.uuid IS NULL
+            OR item_balances.quantity <> COALESCE(ledger.quantity, 0)
+            OR item_balances.balance <> COALESCE(ledger.balance, 0.0)
+            ORDER BY item_accounts.uuid"""
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
 class ItemLog(db.Model, BaseMixin, AuditableMixin):
     """Inventory log model to track usage
 
     If a purchase is made, debit is vendor id and credit is item id
     if a sale is mafe, debit is item id and credit is entity_id
+    The table is partitioned by accounting_date (see sql/partitions.sql), so
+    its unique keys have to include it: uuid is only unique per date.
     """
 
+    __table_args__ = (
+        db.UniqueConstraint("uuid", "accounting_date", name="item_log_uuid_accounting_date_key"),
+    )
+
+    uuid = db.Column(db.String(50))
     item_id = db.Column(db.String(50), db.ForeignKey("item.uuid"))
     reference = db.Column(db.String(50))  # job id or vendor id
     category = db.Column(db.String(50))  # sale or purchase
@@ -93,7 +184,7 @@ class ItemLog(db.Model, BaseMixin, AuditableMixin):
 
     def __init__(self, **kwargs):
         super(ItemLog, self).__init__(**kwargs)
-        self.accounting_period = datetime.now().strftime("%Y-%m")
+        self.accounting_period = datetime.datetime.now().strftime("%Y-%m")
         self.get_uuid()
 
     def __repr__(self):
@@ -101,59 +192,29 @@ class ItemLog(db.Model, BaseMixin, AuditableMixin):
 
     @property
     def debit_account(self):
-        sql = (
-            """ name FROM item_accounts where item_accounts.uuid ='"""
-            + str(self.debit)
-            + """'
-            """
-        )
-
-        data = query(sql)
-        return data if data is None else data[0]["name"]
+        return ITEM_ACCOUNT_NAMES.get(self.debit)
 
     @property
     def credit_account(self):
-
-        sql = (
-            """ name FROM item_accounts where item_accounts.uuid ='"""
-            + str(self.credit)
-            + """'"""
-        )
-
-        data = query(sql)
-        return data if data is None else data[0]["name"]
+        return ITEM_ACCOUNT_NAMES.get(self.credit)
 
     def is_valid(self):
         """validate the object"""
 
         if self.category not in ('sale', 'purchase'):
-            return False, {"msg": "The category {0} doesn't exist".format(self.tran_type)}, 422
+            return False, {"msg": "The category {0} doesn't exist".format(self.category)}, 422
         if not Item.get(uuid=self.credit) and not Item.get(uuid=self.debit):
             return False, {"msg": "The supplied item id does not exist"}, 422
         if ItemLog.get(reference=self.reference):
             return False, {"msg": "The supplied reference already exists"}, 409
-        if ItemLog.get(reference=self.cheque_number):
-            return False, {"msg": "This transaction is already reversed"}, 409
-        if self.category == "reversal" and not ItemLog.get(
-                reference=self.cheque_number
-        ):
-            return False, {"msg": "You can only reverse an existing transaction"}, 422
-
-        # check balance
-        item = Item.get(uuid=self.debit)
-        bal_after = int(item.quantity) - int(self.quantity)
-        app.logger.info(item.quantity, self.quantity)
-
-        if Item.get(uuid=self.item_id).name != 'labour' and self.category == 'sale' and float(bal_after) < 0.0:
-            return False, {
-                "msg": "Insufficient quantity on the {0} account {1}".format(item.name, commas(item.quantity))}, 409
-
-        if self.tran_type == "reversal":
-            orig = ItemLog.get(reference=self.cheque_number)
-            self.debit = orig.credit
-            self.credit = orig.debit
-            self.amount = orig.amount
-            self.entity_id = orig.entity_id
+
+        # check the stock sold against its locked balance row
+        if self.category == 'sale':
+            item = Item.get(uuid=self.item_id)
+            stock = ItemBalance.stock(self.debit)
+            if item.name != 'labour' and stock - int(self.quantity) < 0:
+                return False, {
+                    "msg": "Insufficient quantity on the {0} account {1}".format(item.name, commas(stock))}, 409
 
         return True, self, 200
 
@@ -189,4 +250,4 @@ class ItemLog(db.Model, BaseMixin, AuditableMixin):
         if not valid:
             raise Exception(reason.get('msg'), status)
 
-        db.session.commit()
+        unit_of_work.commit()
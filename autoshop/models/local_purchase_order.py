@@ -7,6 +7,7 @@ from autoshop.models.credit_mixin import CreditMixin
 from autoshop.models.entity import Entity
 from autoshop.models.item import ItemLog
 from autoshop.models.entry import Entry
+from autoshop.commons import unit_of_work
 from autoshop.commons.util import commas
 from autoshop.models.expenditure import Expenditure
 
@@ -70,7 +71,7 @@ class LocalPurchaseOrder(db.Model, BaseMixin, AuditableMixin, CreditMixin):
 
         if not Expenditure.get(uuid=self.uuid):
             db.session.add_all(logs)
-            db.session.commit()
+            unit_of_work.commit()
 
             Expenditure.init_lpo(self)
 
@@ -1,5 +1,7 @@
 from flask_jwt_extended import get_jwt_identity
 
+from autoshop.commons import unit_of_work
+from autoshop.commons.reference import ReferenceMixin
 from autoshop.extensions import db
 from autoshop.models.account import Account
 from autoshop.models.audit_mixin import AuditableMixin
@@ -22,7 +24,7 @@ class Setting(db.Model, BaseMixin, AuditableMixin):
         return "<Setting %s>" % self.name
 
 
-class CustomerType(db.Model, BaseMixin, AuditableMixin):
+class CustomerType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     """"
        in fleet, out fleet
     """
@@ -39,7 +41,7 @@ class CustomerType(db.Model, BaseMixin, AuditableMixin):
         return "<CustomerType %s>" % self.name
 
 
-class TransactionType(db.Model, BaseMixin, AuditableMixin):
+class TransactionType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     """"
        claim, topup, reversal, charge, adjustment
     """
@@ -55,7 +57,7 @@ class TransactionType(db.Model, BaseMixin, AuditableMixin):
         return "<TransactionType %s>" % self.name
 
 
-class PaymentType(db.Model, BaseMixin, AuditableMixin):
+class PaymentType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     """
        Cash, Momo, Bank, e.t.c
     """
@@ -95,4 +97,4 @@ class PaymentType(db.Model, BaseMixin, AuditableMixin):
         db.session.add(account)
         db.session.add(setting)
         db.session.add(self)
-        db.session.commit()
+        unit_of_work.commit()
@@ -1,7 +1,7 @@
-from autoshop.commons.dbaccess import query
 from autoshop.extensions import db, pwd_context
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin, PersonMixin
+from autoshop.models.directory import HOLDERS
 
 
 class User(db.Model, BaseMixin, AuditableMixin, PersonMixin):
@@ -47,16 +47,7 @@ class User(db.Model, BaseMixin, AuditableMixin, PersonMixin):
             if self.company_id == "system":
                 return "System"
             else:
-                sql = (
-                    """ name
-                FROM account_holders
-                where uuid = '"""
-                    + self.company_id
-                    + """'
-                """
-                )
-                data = query(sql)
-                return data[0]["name"]
+                return HOLDERS.name(self.company_id) or ""
         except Exception:
             return ""
 
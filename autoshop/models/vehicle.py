@@ -1,9 +1,10 @@
+from autoshop.commons.reference import ReferenceMixin
 from autoshop.extensions import db
 from autoshop.models.audit_mixin import AuditableMixin
 from autoshop.models.base_mixin import BaseMixin
 
 
-class Make(db.Model, BaseMixin, AuditableMixin):
+class Make(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
     name = db.Column(db.String(50), unique=True, nullable=False)
     country = db.Column(db.String(50))
 
@@ -30,7 +31,7 @@ class Model(db.Model, BaseMixin, AuditableMixin):
         return "<Model %s>" % self.uuid
 
 
-class VehicleModel(db.Model, BaseMixin, AuditableMixin):
+class VehicleModel(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
 
     name = db.Column(db.String(50), unique=True, nullable=False)
     fuel_type = db.Column(db.String(50))
@@ -50,7 +51,7 @@ class VehicleModel(db.Model, BaseMixin, AuditableMixin):
         return "<VehicleModel %s>" % self.uuid
 
 
-class VehicleType(db.Model, BaseMixin, AuditableMixin):
+class VehicleType(db.Model, ReferenceMixin, BaseMixin, AuditableMixin):
 
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.String(2000))
@@ -1,5 +1,9 @@
-CREATE INDEX ON entries(credit);
-CREATE INDEX ON entries(debit);
+-- (account, accounting_date, id) lets a statement page walk both ledger
+-- sides in accounting date order, and bounds as-of balances by date
+CREATE INDEX ON entries(credit, accounting_date, id);
+CREATE INDEX ON entries(debit, accounting_date, id);
+-- (date_created, id) is the keyset for cursor pages of /entries
+CREATE INDEX IF NOT EXISTS entries_date_created_id_idx ON entries(date_created, id);
 
 CREATE VIEW account_ledgers(
 	entry_id,
@@ -44,44 +48,105 @@ CREATE VIEW account_ledgers(
 	FROM
 		entries;
 
-CREATE MATERIALIZED VIEW account_balances(
-	-- Materialized so financial reports run fast.
-	-- Modification of accounts and entries will require a
-	-- REFRESH MATERIALIZED VIEW, which we can trigger
-	-- automatically.
-	id, -- INTEGER REFERENCES accounts(id) NOT NULL UNIQUE
-	balance -- NUMERIC NOT NULL
-) AS
-	SELECT
-		accounts.id,
-		COALESCE(sum(account_ledgers.amount), 0.0)
-	FROM
-		accounts
-		LEFT OUTER JOIN account_ledgers
-		ON accounts.id = account_ledgers.account_id
-	GROUP BY accounts.id;
-
-CREATE UNIQUE INDEX ON account_balances(id);
+-- account_balances is a plain table (see models.AccountBalance) kept in
+-- step with entries by the statement triggers below. Each statement
+-- applies one net delta per touched account, so a write only costs the
+-- accounts it moves value between instead of a full ledger rebuild.
+-- Rows are upserted in account id order to keep row locks deterministic.
 
 CREATE OR REPLACE FUNCTION update_balances() RETURNS TRIGGER AS $$
 BEGIN
-	REFRESH MATERIALIZED VIEW account_balances;
+	IF TG_OP = 'INSERT' THEN
+		INSERT INTO account_balances (id, balance, date_modified)
+		SELECT account_id, sum(amount), now() FROM (
+			SELECT credit AS account_id, amount FROM new_entries
+			UNION ALL
+			SELECT debit, (0.0 - amount) FROM new_entries
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		ORDER BY account_id
+		ON CONFLICT (id) DO UPDATE
+		SET balance = account_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSIF TG_OP = 'DELETE' THEN
+		INSERT INTO account_balances (id, balance, date_modified)
+		SELECT account_id, sum(amount), now() FROM (
+			SELECT credit AS account_id, (0.0 - amount) AS amount FROM old_entries
+			UNION ALL
+			SELECT debit, amount FROM old_entries
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		ORDER BY account_id
+		ON CONFLICT (id) DO UPDATE
+		SET balance = account_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSIF TG_OP = 'UPDATE' THEN
+		INSERT INTO account_balances (id, balance, date_modified)
+		SELECT account_id, sum(amount), now() FROM (
+			SELECT credit AS account_id, amount FROM new_entries
+			UNION ALL
+			SELECT debit, (0.0 - amount) FROM new_entries
+			UNION ALL
+			SELECT credit, (0.0 - amount) FROM old_entries
+			UNION ALL
+			SELECT debit, amount FROM old_entries
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		HAVING sum(amount) <> 0
+		ORDER BY account_id
+		ON CONFLICT (id) DO UPDATE
+		SET balance = account_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSE
+		UPDATE account_balances SET balance = 0.0, date_modified = now();
+	END IF;
 	RETURN NULL;
 END
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trigger_fix_balance_entries
-AFTER INSERT 
-OR UPDATE OF amount, credit, debit 
-OR DELETE OR TRUNCATE
-ON entries
+CREATE TRIGGER trigger_fix_balance_entries_insert
+AFTER INSERT ON entries
+REFERENCING NEW TABLE AS new_entries
 FOR EACH STATEMENT
 EXECUTE PROCEDURE update_balances();
 
-CREATE TRIGGER trigger_fix_balance_accounts
-AFTER INSERT 
-OR UPDATE OF id 
-OR DELETE OR TRUNCATE
-ON accounts
+CREATE TRIGGER trigger_fix_balance_entries_update
+AFTER UPDATE ON entries
+REFERENCING OLD TABLE AS old_entries NEW TABLE AS new_entries
 FOR EACH STATEMENT
 EXECUTE PROCEDURE update_balances();
+
+CREATE TRIGGER trigger_fix_balance_entries_delete
+AFTER DELETE ON entries
+REFERENCING OLD TABLE AS old_entries
+FOR EACH STATEMENT
+EXECUTE PROCEDURE update_balances();
+
+CREATE TRIGGER trigger_fix_balance_entries_truncate
+AFTER TRUNCATE ON entries
+FOR EACH STATEMENT
+EXECUTE PROCEDURE update_balances();
+
+CREATE OR REPLACE FUNCTION open_account_balance() RETURNS TRIGGER AS $$
+BEGIN
+	INSERT INTO account_balances (id, balance, date_modified)
+	VALUES (NEW.id, 0.0, now())
+	ON CONFLICT (id) DO NOTHING;
+	RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_fix_balance_accounts
+AFTER INSERT ON accounts
+FOR EACH ROW
+EXECUTE PROCEDURE open_account_balance();
+
+INSERT INTO account_balances (id, balance, date_modified)
+SELECT accounts.id, COALESCE(sum(account_ledgers.amount), 0.0), now()
+FROM accounts LEFT OUTER JOIN account_ledgers
+ON accounts.id = account_ledgers.account_id
+GROUP BY accounts.id
+ON CONFLICT (id) DO NOTHING;
@@ -4,4 +4,5 @@ DROP TABLE IF EXISTS alembic_version;
 DROP TABLE IF EXISTS item_log CASCADE;
 DROP TABLE IF EXISTS item CASCADE;
 DROP TABLE IF EXISTS item_balances CASCADE;
+DROP TABLE IF EXISTS ledger_archives CASCADE;
 
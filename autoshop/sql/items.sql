@@ -1,7 +1,51 @@
-CREATE OR REPLACE VIEW item_accounts AS
-SELECT 'item' as group, uuid, id, name as name FROM item UNION
-SELECT 'vendor' as group, uuid, id, name FROM vendor UNION
-SELECT 'entity' as group, uuid, id, name FROM entity;
+-- (date_created, id) is the keyset for cursor pages of /item_logs
+CREATE INDEX IF NOT EXISTS item_log_date_created_id_idx ON item_log(date_created, id);
+
+-- item_accounts is a directory table (see models.ItemAccount) kept in step
+-- with item, vendor and entity by the row triggers below.
+
+CREATE TABLE IF NOT EXISTS item_accounts (
+	uuid VARCHAR(50) PRIMARY KEY,
+	"group" VARCHAR(50),
+	id INTEGER,
+	name VARCHAR(200)
+);
+
+CREATE OR REPLACE FUNCTION sync_item_accounts() RETURNS TRIGGER AS $$
+BEGIN
+	IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.uuid IS DISTINCT FROM NEW.uuid) THEN
+		DELETE FROM item_accounts WHERE uuid = OLD.uuid;
+	END IF;
+	IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.uuid IS NOT NULL THEN
+		INSERT INTO item_accounts (uuid, "group", id, name)
+		VALUES (NEW.uuid, TG_ARGV[0], NEW.id, NEW.name)
+		ON CONFLICT (uuid) DO UPDATE SET "group" = EXCLUDED."group", id = EXCLUDED.id,
+			name = EXCLUDED.name;
+	END IF;
+	RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_item_accounts ON item;
+CREATE TRIGGER trigger_item_accounts
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON item
+FOR EACH ROW EXECUTE PROCEDURE sync_item_accounts('item');
+
+DROP TRIGGER IF EXISTS trigger_item_accounts ON vendor;
+CREATE TRIGGER trigger_item_accounts
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON vendor
+FOR EACH ROW EXECUTE PROCEDURE sync_item_accounts('vendor');
+
+DROP TRIGGER IF EXISTS trigger_item_accounts ON entity;
+CREATE TRIGGER trigger_item_accounts
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON entity
+FOR EACH ROW EXECUTE PROCEDURE sync_item_accounts('entity');
+
+INSERT INTO item_accounts (uuid, "group", id, name)
+SELECT uuid, 'item', id, name FROM item WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'vendor', id, name FROM vendor WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'entity', id, name FROM entity WHERE uuid IS NOT NULL
+ON CONFLICT (uuid) DO NOTHING;
 
 
 CREATE OR REPLACE VIEW item_ledger(
@@ -50,47 +94,102 @@ CREATE OR REPLACE VIEW item_ledger(
 	FROM
 		item_log;
 
-CREATE MATERIALIZED VIEW item_balances(
-	-- Materialized so financial reports run fast.
-	-- Modification of accounts and item_log will require a
-	-- REFRESH MATERIALIZED VIEW, which we can trigger
-	-- automatically.
-	uuid, -- INTEGER REFERENCES accounts(id) NOT NULL UNIQUE
-	quantity, -- INTEGER NOT NULL
-    balance -- NUMERIC NOT NULL
-) AS
-	SELECT
-		item_accounts.uuid,
-        COALESCE(sum(item_ledger.quantity), 0.0),
-		COALESCE(sum(item_ledger.amount), 0.0)
-	FROM
-		item_accounts
-		LEFT OUTER JOIN item_ledger
-		ON item_accounts.uuid = item_ledger.account_id
-	GROUP BY item_accounts.uuid;
-
-CREATE UNIQUE INDEX ON item_balances(uuid);
+-- item_balances is a plain table (see models.ItemBalance) kept in step
+-- with item_log by the statement triggers below. Each statement applies
+-- one net quantity and value delta per touched item, vendor or entity,
+-- instead of refreshing the stock of every one of them.
+-- Rows are upserted in uuid order to keep row locks deterministic.
 
 CREATE OR REPLACE FUNCTION update_item_balances() RETURNS TRIGGER AS $$
 BEGIN
-	REFRESH MATERIALIZED VIEW item_balances;
+	IF TG_OP = 'INSERT' THEN
+		INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+		SELECT account_id, sum(quantity), sum(amount), now() FROM (
+			SELECT credit AS account_id, quantity, amount FROM new_item_log
+			UNION ALL
+			SELECT debit, (0 - quantity), (0.0 - amount) FROM new_item_log
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		ORDER BY account_id
+		ON CONFLICT (uuid) DO UPDATE
+		SET quantity = item_balances.quantity + EXCLUDED.quantity,
+			balance = item_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSIF TG_OP = 'DELETE' THEN
+		INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+		SELECT account_id, sum(quantity), sum(amount), now() FROM (
+			SELECT credit AS account_id, (0 - quantity) AS quantity,
+				(0.0 - amount) AS amount FROM old_item_log
+			UNION ALL
+			SELECT debit, quantity, amount FROM old_item_log
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		ORDER BY account_id
+		ON CONFLICT (uuid) DO UPDATE
+		SET quantity = item_balances.quantity + EXCLUDED.quantity,
+			balance = item_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSIF TG_OP = 'UPDATE' THEN
+		INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+		SELECT account_id, sum(quantity), sum(amount), now() FROM (
+			SELECT credit AS account_id, quantity, amount FROM new_item_log
+			UNION ALL
+			SELECT debit, (0 - quantity), (0.0 - amount) FROM new_item_log
+			UNION ALL
+			SELECT credit, (0 - quantity), (0.0 - amount) FROM old_item_log
+			UNION ALL
+			SELECT debit, quantity, amount FROM old_item_log
+		) deltas
+		WHERE account_id IS NOT NULL
+		GROUP BY account_id
+		HAVING sum(quantity) <> 0 OR sum(amount) <> 0
+		ORDER BY account_id
+		ON CONFLICT (uuid) DO UPDATE
+		SET quantity = item_balances.quantity + EXCLUDED.quantity,
+			balance = item_balances.balance + EXCLUDED.balance,
+			date_modified = EXCLUDED.date_modified;
+	ELSE
+		UPDATE item_balances SET quantity = 0, balance = 0.0, date_modified = now();
+	END IF;
 	RETURN NULL;
 END
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trigger_fix_balance_item_log
-AFTER INSERT 
-OR UPDATE OF quantity, amount, credit, debit 
-OR DELETE OR TRUNCATE
-ON item_log
+DROP TRIGGER IF EXISTS trigger_fix_balance_item_log ON item_log;
+
+DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_insert ON item_log;
+CREATE TRIGGER trigger_fix_balance_item_log_insert
+AFTER INSERT ON item_log
+REFERENCING NEW TABLE AS new_item_log
+FOR EACH STATEMENT
+EXECUTE PROCEDURE update_item_balances();
+
+DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_update ON item_log;
+CREATE TRIGGER trigger_fix_balance_item_log_update
+AFTER UPDATE ON item_log
+REFERENCING OLD TABLE AS old_item_log NEW TABLE AS new_item_log
+FOR EACH STATEMENT
+EXECUTE PROCEDURE update_item_balances();
+
+DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_delete ON item_log;
+CREATE TRIGGER trigger_fix_balance_item_log_delete
+AFTER DELETE ON item_log
+REFERENCING OLD TABLE AS old_item_log
+FOR EACH STATEMENT
+EXECUTE PROCEDURE update_item_balances();
+
+DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_truncate ON item_log;
+CREATE TRIGGER trigger_fix_balance_item_log_truncate
+AFTER TRUNCATE ON item_log
 FOR EACH STATEMENT
 EXECUTE PROCEDURE update_item_balances();
 
--- -- CREATE TRIGGER trigger_fix_balance_accounts
--- -- AFTER INSERT 
--- -- OR UPDATE OF uuid 
--- -- OR DELETE OR TRUNCATE
--- -- ON item_accounts
--- -- FOR EACH STATEMENT
--- -- EXECUTE PROCEDURE update_item_balances();
--- --  Views cannot have TRUNCATE triggers
+INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0),
+	COALESCE(sum(item_ledger.amount), 0.0), now()
+FROM item_accounts LEFT OUTER JOIN item_ledger
+ON item_accounts.uuid = item_ledger.account_id
+GROUP BY item_accounts.uuid
+ON CONFLICT (uuid) DO NOTHING;
@@ -0,0 +1,136 @@
+-- entries and item_log are range partitioned by accounting_date, one
+-- partition per accounting period (month) named <table>_pYYYY_MM, plus a
+-- default partition for stray dates. Date bounded reports then only scan
+-- the months they ask for, and closed months can be detached for archiving.
+-- Requires PostgreSQL 11 or later.
+
+CREATE TABLE IF NOT EXISTS ledger_archives(
+	accounting_period VARCHAR(50) PRIMARY KEY,
+	closing_date DATE NOT NULL,
+	detached_partition VARCHAR(100) NOT NULL,
+	date_created TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- Swap a plain table for a partitioned copy with the same columns, defaults
+-- and checks, moving its rows and its id sequence across. Primary key and
+-- unique constraints have to include accounting_date on a partitioned table.
+CREATE OR REPLACE FUNCTION partition_by_accounting_date(tbl TEXT, keys TEXT) RETURNS VOID AS $$
+DECLARE
+	old TEXT := tbl || '_unpartitioned';
+	seq TEXT := pg_get_serial_sequence(tbl, 'id');
+	bounds RECORD;
+	dependent RECORD;
+BEGIN
+	IF (SELECT relkind FROM pg_class WHERE oid = tbl::regclass) = 'p' THEN
+		RETURN;
+	END IF;
+
+	EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, old);
+	EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+	-- free the constraint and index names for the new table
+	FOR dependent IN
+		SELECT conname FROM pg_constraint
+		WHERE conrelid = old::regclass AND contype IN ('p', 'u', 'f')
+	LOOP
+		EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', old, dependent.conname);
+	END LOOP;
+	FOR dependent IN
+		SELECT indexrelid::regclass AS name FROM pg_index WHERE indrelid = old::regclass
+	LOOP
+		EXECUTE format('DROP INDEX %s', dependent.name);
+	END LOOP;
+
+	EXECUTE format(
+		'UPDATE %I SET accounting_date = date_created::date WHERE accounting_date IS NULL', old);
+	EXECUTE format(
+		'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS, %s) '
+		'PARTITION BY RANGE (accounting_date)', tbl, old, keys);
+	EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', seq, tbl);
+	EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+	EXECUTE format(
+		'SELECT min(accounting_date) AS first, max(accounting_date) AS last FROM %I', old)
+		INTO bounds;
+	PERFORM create_accounting_partitions(
+		tbl, COALESCE(bounds.first, current_date),
+		GREATEST(COALESCE(bounds.last, current_date), current_date));
+
+	EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, old);
+	EXECUTE format('DROP TABLE %I', old);
+END
+$$ LANGUAGE plpgsql;
+
+-- Make sure every month from start_date to end_date has its own partition.
+-- Rows already sitting in the default partition for a new month are moved
+-- into it; statement triggers on the parent do not fire for that move, so
+-- maintained balances are untouched.
+CREATE OR REPLACE FUNCTION create_accounting_partitions(tbl TEXT, start_date DATE, end_date DATE) RETURNS INTEGER AS $$
+DECLARE
+	first_day DATE := date_trunc('month', start_date);
+	part TEXT;
+	created INTEGER := 0;
+BEGIN
+	WHILE first_day <= end_date LOOP
+		part := tbl || to_char(first_day, '"_p"YYYY_MM');
+		IF to_regclass(part) IS NULL THEN
+			EXECUTE format(
+				'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, tbl);
+			EXECUTE format(
+				'WITH moved AS (DELETE FROM %I WHERE accounting_date >= %L AND accounting_date < %L RETURNING *) '
+				'INSERT INTO %I SELECT * FROM moved',
+				tbl || '_default', first_day, first_day + interval '1 month', part);
+			EXECUTE format(
+				'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+				tbl, part, first_day, (first_day + interval '1 month')::date);
+			created := created + 1;
+		END IF;
+		first_day := first_day + interval '1 month';
+	END LOOP;
+	RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+-- Detach the entries partition of a closed accounting period so it can be
+-- dumped and dropped. Periods go oldest first, and only once closed: the
+-- period's balance snapshot stands in for the detached entries whenever
+-- balances are rebuilt from the ledger. An empty <partition>_archived table
+-- that refuses every row takes the period's place, so an entry back-dated
+-- into it fails instead of landing in the default partition (where it
+-- would block the next detach); drop it before reattaching the period.
+CREATE OR REPLACE FUNCTION detach_accounting_period(period TEXT) RETURNS TEXT AS $$
+DECLARE
+	first_day DATE := to_date(period, 'YYYY-MM');
+	part TEXT := 'entries' || to_char(first_day, '"_p"YYYY_MM');
+BEGIN
+	IF to_regclass(part) IS NULL THEN
+		RAISE EXCEPTION 'entries has no partition for %', period;
+	END IF;
+	IF NOT EXISTS (SELECT 1 FROM account_balance_snapshots WHERE accounting_period = period) THEN
+		RAISE EXCEPTION 'accounting period % has not been closed', period;
+	END IF;
+	IF EXISTS (SELECT 1 FROM entries WHERE accounting_date < first_day) THEN
+		RAISE EXCEPTION 'earlier accounting periods must be detached first';
+	END IF;
+
+	EXECUTE format('ALTER TABLE entries DETACH PARTITION %I', part);
+	EXECUTE format(
+		'CREATE TABLE %I (LIKE entries INCLUDING DEFAULTS, CONSTRAINT %I CHECK (false))',
+		part || '_archived', part || '_archived');
+	EXECUTE format(
+		'ALTER TABLE entries ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+		part || '_archived', first_day, (first_day + interval '1 month')::date);
+	INSERT INTO ledger_archives (accounting_period, closing_date, detached_partition)
+	VALUES (period, (first_day + interval '1 month' - interval '1 day')::date, part);
+	RETURN part;
+END
+$$ LANGUAGE plpgsql;
+
+SELECT partition_by_accounting_date('entries',
+	'PRIMARY KEY (id, accounting_date), '
+	'FOREIGN KEY (debit) REFERENCES accounts(id) ON DELETE RESTRICT, '
+	'FOREIGN KEY (credit) REFERENCES accounts(id) ON DELETE RESTRICT');
+
+SELECT partition_by_accounting_date('item_log',
+	'PRIMARY KEY (id, accounting_date), UNIQUE (uuid, accounting_date), '
+	'FOREIGN KEY (item_id) REFERENCES item(uuid), '
+	'FOREIGN KEY (entity_id) REFERENCES entity(uuid)');
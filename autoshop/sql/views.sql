@@ -1,13 +1,63 @@
-CREATE OR REPLACE VIEW account_holders AS
-SELECT 'customer' as group, uuid, name as name FROM customer UNION
-SELECT 'vendor' as group, uuid, name FROM vendor UNION
-SELECT 'entity' as group, uuid, name FROM entity UNION
-SELECT 'commission account' as group, uuid, name FROM commission_account UNION
-SELECT 'payment type' as group, uuid, name FROM payment_type;
+-- account_holders is a directory table (see models.AccountHolder) kept in
+-- step with the tables that hold accounts by the row triggers below, so a
+-- holder's name is one primary key probe instead of a five way UNION.
+
+CREATE TABLE IF NOT EXISTS account_holders (
+	uuid VARCHAR(50) PRIMARY KEY,
+	"group" VARCHAR(50),
+	name VARCHAR(200)
+);
+
+CREATE OR REPLACE FUNCTION sync_account_holders() RETURNS TRIGGER AS $$
+BEGIN
+	IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.uuid IS DISTINCT FROM NEW.uuid) THEN
+		DELETE FROM account_holders WHERE uuid = OLD.uuid;
+	END IF;
+	IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.uuid IS NOT NULL THEN
+		INSERT INTO account_holders (uuid, "group", name)
+		VALUES (NEW.uuid, TG_ARGV[0], NEW.name)
+		ON CONFLICT (uuid) DO UPDATE SET "group" = EXCLUDED."group", name = EXCLUDED.name;
+	END IF;
+	RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_account_holders ON customer;
+CREATE TRIGGER trigger_account_holders
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON customer
+FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('customer');
+
+DROP TRIGGER IF EXISTS trigger_account_holders ON vendor;
+CREATE TRIGGER trigger_account_holders
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON vendor
+FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('vendor');
+
+DROP TRIGGER IF EXISTS trigger_account_holders ON entity;
+CREATE TRIGGER trigger_account_holders
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON entity
+FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('entity');
+
+DROP TRIGGER IF EXISTS trigger_account_holders ON commission_account;
+CREATE TRIGGER trigger_account_holders
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON commission_account
+FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('commission account');
+
+DROP TRIGGER IF EXISTS trigger_account_holders ON payment_type;
+CREATE TRIGGER trigger_account_holders
+AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON payment_type
+FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('payment type');
+
+INSERT INTO account_holders (uuid, "group", name)
+SELECT uuid, 'customer', name FROM customer WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'vendor', name FROM vendor WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'entity', name FROM entity WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'commission account', name FROM commission_account WHERE uuid IS NOT NULL UNION ALL
+SELECT uuid, 'payment type', name FROM payment_type WHERE uuid IS NOT NULL
+ON CONFLICT (uuid) DO NOTHING;
 
 CREATE OR REPLACE FUNCTION get_sales(date DATE) RETURNS NUMERIC AS $$
     SELECT sum(cast(amount as NUMERIC)) FROM item_log
-    WHERE TO_CHAR(date_created :: DATE, 'yyyy-mm-dd')=cast(date as VARCHAR)
+    WHERE accounting_date = date
 $$ LANGUAGE SQL;
 
 CREATE OR REPLACE FUNCTION get_expenses(date DATE) RETURNS NUMERIC AS $$
@@ -18,8 +68,8 @@ $$ LANGUAGE SQL;
 CREATE OR REPLACE FUNCTION get_total_sales(start_date date, end_date date) RETURNS NUMERIC AS $$
     SELECT sum(amount) FROM item_log
     WHERE category='sale'
-    and date_created>=start_date
-    and date_created<=end_date;
+    and accounting_date>=start_date
+    and accounting_date<=end_date;
 $$ LANGUAGE SQL;
 
 CREATE OR REPLACE FUNCTION get_total_expenses(start_date date, end_date date) RETURNS NUMERIC AS $$
@@ -30,12 +80,12 @@ $$ LANGUAGE SQL;
 
 CREATE OR REPLACE FUNCTION get_item_trans(item VARCHAR, category_id VARCHAR, date DATE) RETURNS NUMERIC AS $$
     SELECT sum(cast(amount as NUMERIC)) FROM item_log
-    WHERE TO_CHAR(date_created :: DATE, 'yyyy-mm-dd')=cast(date as VARCHAR)
+    WHERE accounting_date = date
     and item_log.item_id=item and item_log.category=category_id
 $$ LANGUAGE SQL;
 
 CREATE OR REPLACE FUNCTION get_item_total(item VARCHAR, category_id VARCHAR, date DATE) RETURNS NUMERIC AS $$
     SELECT sum(cast(quantity as NUMERIC)) FROM item_log
-    WHERE TO_CHAR(date_created :: DATE, 'yyyy-mm-dd')=cast(date as VARCHAR)
+    WHERE accounting_date = date
     and item_log.item_id=item and item_log.category=category_id
 $$ LANGUAGE SQL;
\ No newline at end of file
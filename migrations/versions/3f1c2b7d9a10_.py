@@ -0,0 +1,168 @@
+"""account_balances table
+
+Revision ID: 3f1c2b7d9a10
+Revises: 08859847cd65
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2b7d9a10'
+down_revision = '08859847cd65'
+branch_labels = None
+depends_on = None
+
+
+BALANCE_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION update_balances() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO account_balances (id, balance, date_modified)
+            SELECT account_id, sum(amount), now() FROM (
+                SELECT credit AS account_id, amount FROM new_entries
+                UNION ALL
+                SELECT debit, (0.0 - amount) FROM new_entries
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+            ON CONFLICT (id) DO UPDATE
+            SET balance = account_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO account_balances (id, balance, date_modified)
+            SELECT account_id, sum(amount), now() FROM (
+                SELECT credit AS account_id, (0.0 - amount) AS amount FROM old_entries
+                UNION ALL
+                SELECT debit, amount FROM old_entries
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+            ON CONFLICT (id) DO UPDATE
+            SET balance = account_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO account_balances (id, balance, date_modified)
+            SELECT account_id, sum(amount), now() FROM (
+                SELECT credit AS account_id, amount FROM new_entries
+                UNION ALL
+                SELECT debit, (0.0 - amount) FROM new_entries
+                UNION ALL
+                SELECT credit, (0.0 - amount) FROM old_entries
+                UNION ALL
+                SELECT debit, amount FROM old_entries
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            HAVING sum(amount) <> 0
+            ORDER BY account_id
+            ON CONFLICT (id) DO UPDATE
+            SET balance = account_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSE
+            UPDATE account_balances SET balance = 0.0, date_modified = now();
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER trigger_fix_balance_entries_insert
+    AFTER INSERT ON entries
+    REFERENCING NEW TABLE AS new_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_update
+    AFTER UPDATE ON entries
+    REFERENCING OLD TABLE AS old_entries NEW TABLE AS new_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_delete
+    AFTER DELETE ON entries
+    REFERENCING OLD TABLE AS old_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_truncate
+    AFTER TRUNCATE ON entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE OR REPLACE FUNCTION open_account_balance() RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO account_balances (id, balance, date_modified)
+        VALUES (NEW.id, 0.0, now())
+        ON CONFLICT (id) DO NOTHING;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER trigger_fix_balance_accounts
+    AFTER INSERT ON accounts
+    FOR EACH ROW
+    EXECUTE PROCEDURE open_account_balance();
+
+    INSERT INTO account_balances (id, balance, date_modified)
+    SELECT accounts.id, COALESCE(sum(account_ledgers.amount), 0.0), now()
+    FROM accounts LEFT OUTER JOIN account_ledgers
+    ON accounts.id = account_ledgers.account_id
+    GROUP BY accounts.id
+    ON CONFLICT (id) DO NOTHING;
+"""
+
+
+def upgrade():
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_entries ON entries')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_accounts ON accounts')
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS account_balances')
+    op.execute('DROP FUNCTION IF EXISTS update_balances()')
+
+    op.create_table('account_balances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=20, scale=2), nullable=False),
+    sa.Column('date_modified', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(BALANCE_TRIGGERS)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_entries_insert ON entries')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_entries_update ON entries')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_entries_delete ON entries')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_entries_truncate ON entries')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_accounts ON accounts')
+    op.execute('DROP FUNCTION IF EXISTS open_account_balance()')
+    op.execute('DROP FUNCTION IF EXISTS update_balances()')
+    op.drop_table('account_balances')
+
+    op.execute("""
+    CREATE MATERIALIZED VIEW account_balances(id, balance) AS
+        SELECT accounts.id, COALESCE(sum(account_ledgers.amount), 0.0)
+        FROM accounts LEFT OUTER JOIN account_ledgers
+        ON accounts.id = account_ledgers.account_id
+        GROUP BY accounts.id;
+
+    CREATE UNIQUE INDEX ON account_balances(id);
+
+    CREATE OR REPLACE FUNCTION update_balances() RETURNS TRIGGER AS $$
+    BEGIN
+        REFRESH MATERIALIZED VIEW account_balances;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER trigger_fix_balance_entries
+    AFTER INSERT OR UPDATE OF amount, credit, debit OR DELETE OR TRUNCATE
+    ON entries FOR EACH STATEMENT EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_accounts
+    AFTER INSERT OR UPDATE OF id OR DELETE OR TRUNCATE
+    ON accounts FOR EACH STATEMENT EXECUTE PROCEDURE update_balances();
+    """)
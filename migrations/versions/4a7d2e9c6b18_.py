@@ -0,0 +1,32 @@
+"""keyset pagination indexes
+
+Revision ID: 4a7d2e9c6b18
+Revises: 8c3f6a2d1e75
+Create Date: 2026-10-18 15:02:37.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7d2e9c6b18'
+down_revision = '8c3f6a2d1e75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'transaction_date_created_id_idx', 'transaction', ['date_created', 'id'])
+    # entries and item_log are partitioned, the index cascades to each partition
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS entries_date_created_id_idx ON entries(date_created, id)')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS item_log_date_created_id_idx ON item_log(date_created, id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS item_log_date_created_id_idx')
+    op.execute('DROP INDEX IF EXISTS entries_date_created_id_idx')
+    op.drop_index('transaction_date_created_id_idx', table_name='transaction')
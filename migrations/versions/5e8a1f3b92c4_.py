@@ -0,0 +1,27 @@
+"""pending transaction queue index
+
+Revision ID: 5e8a1f3b92c4
+Revises: c2d9e4a7f316
+Create Date: 2026-10-18 12:15:48.661204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a1f3b92c4'
+down_revision = 'c2d9e4a7f316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'transaction_pending_idx', 'transaction', ['id'],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade():
+    op.drop_index('transaction_pending_idx', table_name='transaction')
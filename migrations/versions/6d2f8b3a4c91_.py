@@ -0,0 +1,42 @@
+"""account holds
+
+Revision ID: 6d2f8b3a4c91
+Revises: 4a7d2e9c6b18
+Create Date: 2026-10-18 16:21:05.734912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2f8b3a4c91'
+down_revision = '4a7d2e9c6b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('account_balances', sa.Column(
+        'held', sa.Numeric(precision=20, scale=2), server_default='0', nullable=False))
+    op.create_table('account_holds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('reference', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=20, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('date_created', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('date_modified', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reference')
+    )
+    op.create_index(
+        'account_holds_held_idx', 'account_holds', ['account_id'],
+        postgresql_where=sa.text("status = 'HELD'"))
+
+
+def downgrade():
+    op.drop_index('account_holds_held_idx', table_name='account_holds')
+    op.drop_table('account_holds')
+    op.drop_column('account_balances', 'held')
@@ -0,0 +1,29 @@
+"""statement indexes on entries
+
+Revision ID: 7b4e0c51d2a8
+Revises: 3f1c2b7d9a10
+Create Date: 2026-10-18 10:02:11.530917
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e0c51d2a8'
+down_revision = '3f1c2b7d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('entries_credit_id_idx', 'entries', ['credit', 'id'])
+    op.create_index('entries_debit_id_idx', 'entries', ['debit', 'id'])
+    op.execute('DROP INDEX IF EXISTS entries_credit_idx')
+    op.execute('DROP INDEX IF EXISTS entries_debit_idx')
+
+
+def downgrade():
+    op.create_index('entries_credit_idx', 'entries', ['credit'])
+    op.create_index('entries_debit_idx', 'entries', ['debit'])
+    op.drop_index('entries_debit_id_idx', table_name='entries')
+    op.drop_index('entries_credit_id_idx', table_name='entries')
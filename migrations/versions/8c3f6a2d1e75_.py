@@ -0,0 +1,289 @@
+"""partition entries and item_log by accounting_date
+
+Revision ID: 8c3f6a2d1e75
+Revises: d41b7c0e5a93
+Create Date: 2026-10-18 14:26:03.457110
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3f6a2d1e75'
+down_revision = 'd41b7c0e5a93'
+branch_labels = None
+depends_on = None
+
+
+# snapshot of sql/partitions.sql at this revision
+PARTITIONS = """
+    CREATE TABLE IF NOT EXISTS ledger_archives(
+        accounting_period VARCHAR(50) PRIMARY KEY,
+        closing_date DATE NOT NULL,
+        detached_partition VARCHAR(100) NOT NULL,
+        date_created TIMESTAMP WITH TIME ZONE DEFAULT now()
+    );
+
+    -- Swap a plain table for a partitioned copy with the same columns, defaults
+    -- and checks, moving its rows and its id sequence across. Primary key and
+    -- unique constraints have to include accounting_date on a partitioned table.
+    CREATE OR REPLACE FUNCTION partition_by_accounting_date(tbl TEXT, keys TEXT) RETURNS VOID AS $$
+    DECLARE
+        old TEXT := tbl || '_unpartitioned';
+        seq TEXT := pg_get_serial_sequence(tbl, 'id');
+        bounds RECORD;
+        dependent RECORD;
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = tbl::regclass) = 'p' THEN
+            RETURN;
+        END IF;
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, old);
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+        -- free the constraint and index names for the new table
+        FOR dependent IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = old::regclass AND contype IN ('p', 'u', 'f')
+        LOOP
+            EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', old, dependent.conname);
+        END LOOP;
+        FOR dependent IN
+            SELECT indexrelid::regclass AS name FROM pg_index WHERE indrelid = old::regclass
+        LOOP
+            EXECUTE format('DROP INDEX %s', dependent.name);
+        END LOOP;
+
+        EXECUTE format(
+            'UPDATE %I SET accounting_date = date_created::date WHERE accounting_date IS NULL', old);
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS, %s) '
+            'PARTITION BY RANGE (accounting_date)', tbl, old, keys);
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', seq, tbl);
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+        EXECUTE format(
+            'SELECT min(accounting_date) AS first, max(accounting_date) AS last FROM %I', old)
+            INTO bounds;
+        PERFORM create_accounting_partitions(
+            tbl, COALESCE(bounds.first, current_date),
+            GREATEST(COALESCE(bounds.last, current_date), current_date));
+
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, old);
+        EXECUTE format('DROP TABLE %I', old);
+    END
+    $$ LANGUAGE plpgsql;
+
+    -- Make sure every month from start_date to end_date has its own partition.
+    -- Rows already sitting in the default partition for a new month are moved
+    -- into it; statement triggers on the parent do not fire for that move, so
+    -- maintained balances are untouched.
+    CREATE OR REPLACE FUNCTION create_accounting_partitions(tbl TEXT, start_date DATE, end_date DATE) RETURNS INTEGER AS $$
+    DECLARE
+        first_day DATE := date_trunc('month', start_date);
+        part TEXT;
+        created INTEGER := 0;
+    BEGIN
+        WHILE first_day <= end_date LOOP
+            part := tbl || to_char(first_day, '"_p"YYYY_MM');
+            IF to_regclass(part) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, tbl);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE accounting_date >= %L AND accounting_date < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    tbl || '_default', first_day, first_day + interval '1 month', part);
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    tbl, part, first_day, (first_day + interval '1 month')::date);
+                created := created + 1;
+            END IF;
+            first_day := first_day + interval '1 month';
+        END LOOP;
+        RETURN created;
+    END
+    $$ LANGUAGE plpgsql;
+
+    -- Detach the entries partition of a closed accounting period so it can be
+    -- dumped and dropped. Periods go oldest first, and only once closed: the
+    -- period's balance snapshot stands in for the detached entries whenever
+    -- balances are rebuilt from the ledger.
+    CREATE OR REPLACE FUNCTION detach_accounting_period(period TEXT) RETURNS TEXT AS $$
+    DECLARE
+        first_day DATE := to_date(period, 'YYYY-MM');
+        part TEXT := 'entries' || to_char(first_day, '"_p"YYYY_MM');
+    BEGIN
+        IF to_regclass(part) IS NULL THEN
+            RAISE EXCEPTION 'entries has no partition for %', period;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM account_balance_snapshots WHERE accounting_period = period) THEN
+            RAISE EXCEPTION 'accounting period % has not been closed', period;
+        END IF;
+        IF EXISTS (SELECT 1 FROM entries WHERE accounting_date < first_day) THEN
+            RAISE EXCEPTION 'earlier accounting periods must be detached first';
+        END IF;
+
+        EXECUTE format('ALTER TABLE entries DETACH PARTITION %I', part);
+        INSERT INTO ledger_archives (accounting_period, closing_date, detached_partition)
+        VALUES (period, (first_day + interval '1 month' - interval '1 day')::date, part);
+        RETURN part;
+    END
+    $$ LANGUAGE plpgsql;
+
+    SELECT partition_by_accounting_date('entries',
+        'PRIMARY KEY (id, accounting_date), '
+        'FOREIGN KEY (debit) REFERENCES accounts(id) ON DELETE RESTRICT, '
+        'FOREIGN KEY (credit) REFERENCES accounts(id) ON DELETE RESTRICT');
+
+    SELECT partition_by_accounting_date('item_log',
+        'PRIMARY KEY (id, accounting_date), UNIQUE (uuid, accounting_date), '
+        'FOREIGN KEY (item_id) REFERENCES item(uuid), '
+        'FOREIGN KEY (entity_id) REFERENCES entity(uuid)');
+"""
+
+LEDGER_VIEWS = """
+    CREATE VIEW account_ledgers(
+        entry_id, reference, account_id, tran_type, tran_category, category,
+        amount, entity_id, date_created, accounting_date, accounting_period
+    ) AS
+        SELECT entries.id, entries.reference, entries.credit, entries.tran_type,
+            'credit', entries.category, entries.amount, entries.entity_id,
+            entries.date_created, entries.accounting_date, entries.accounting_period
+        FROM entries
+        UNION ALL
+        SELECT entries.id, entries.reference, entries.debit, entries.tran_type,
+            'debit', entries.category, (0.0 - entries.amount), entries.entity_id,
+            entries.date_created, entries.accounting_date, entries.accounting_period
+        FROM entries;
+
+    CREATE INDEX ON entries(credit, id);
+    CREATE INDEX ON entries(debit, id);
+
+    CREATE TRIGGER trigger_fix_balance_entries_insert
+    AFTER INSERT ON entries
+    REFERENCING NEW TABLE AS new_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_update
+    AFTER UPDATE ON entries
+    REFERENCING OLD TABLE AS old_entries NEW TABLE AS new_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_delete
+    AFTER DELETE ON entries
+    REFERENCING OLD TABLE AS old_entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE TRIGGER trigger_fix_balance_entries_truncate
+    AFTER TRUNCATE ON entries
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_balances();
+
+    CREATE VIEW item_ledger(
+        entry_id, log_id, reference, account_id, item_id, tran_category, quantity,
+        amount, entity_id, date_created, accounting_date, accounting_period
+    ) AS
+        SELECT item_log.id, item_log.uuid, item_log.reference, item_log.credit,
+            item_log.item_id, 'credit', item_log.quantity, item_log.amount,
+            item_log.entity_id, item_log.date_created, item_log.accounting_date,
+            item_log.accounting_period
+        FROM item_log
+        UNION ALL
+        SELECT item_log.id, item_log.uuid, item_log.reference, item_log.debit,
+            item_log.item_id, 'debit', (0 - item_log.quantity), (0.0 - item_log.amount),
+            item_log.entity_id, item_log.date_created, item_log.accounting_date,
+            item_log.accounting_period
+        FROM item_log;
+
+    CREATE MATERIALIZED VIEW item_balances(uuid, quantity, balance) AS
+        SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0.0),
+            COALESCE(sum(item_ledger.amount), 0.0)
+        FROM item_accounts
+        LEFT OUTER JOIN item_ledger ON item_accounts.uuid = item_ledger.account_id
+        GROUP BY item_accounts.uuid;
+
+    CREATE UNIQUE INDEX ON item_balances(uuid);
+
+    CREATE TRIGGER trigger_fix_balance_item_log
+    AFTER INSERT OR UPDATE OF quantity, amount, credit, debit OR DELETE OR TRUNCATE
+    ON item_log FOR EACH STATEMENT EXECUTE PROCEDURE update_item_balances();
+"""
+
+# date bounded reports filter on accounting_date so they prune partitions
+REPORTS = """
+    CREATE OR REPLACE FUNCTION get_sales(date DATE) RETURNS NUMERIC AS $$
+        SELECT sum(cast(amount as NUMERIC)) FROM item_log
+        WHERE accounting_date = date
+    $$ LANGUAGE SQL;
+
+    CREATE OR REPLACE FUNCTION get_total_sales(start_date date, end_date date) RETURNS NUMERIC AS $$
+        SELECT sum(amount) FROM item_log
+        WHERE category='sale'
+        and accounting_date>=start_date
+        and accounting_date<=end_date;
+    $$ LANGUAGE SQL;
+
+    CREATE OR REPLACE FUNCTION get_item_trans(item VARCHAR, category_id VARCHAR, date DATE) RETURNS NUMERIC AS $$
+        SELECT sum(cast(amount as NUMERIC)) FROM item_log
+        WHERE accounting_date = date
+        and item_log.item_id=item and item_log.category=category_id
+    $$ LANGUAGE SQL;
+
+    CREATE OR REPLACE FUNCTION get_item_total(item VARCHAR, category_id VARCHAR, date DATE) RETURNS NUMERIC AS $$
+        SELECT sum(cast(quantity as NUMERIC)) FROM item_log
+        WHERE accounting_date = date
+        and item_log.item_id=item and item_log.category=category_id
+    $$ LANGUAGE SQL;
+"""
+
+
+def drop_ledger_views():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS item_balances')
+    op.execute('DROP VIEW IF EXISTS item_ledger')
+    op.execute('DROP VIEW IF EXISTS account_ledgers')
+
+
+def upgrade():
+    drop_ledger_views()
+    op.execute(PARTITIONS)
+    op.execute(LEDGER_VIEWS)
+    op.execute(REPORTS)
+
+
+def downgrade():
+    # rows of detached partitions live outside entries, a plain table
+    # can't take them back and they would be lost with ledger_archives
+    detached = op.get_bind().execute(sa.text(
+        "SELECT detached_partition FROM ledger_archives ORDER BY accounting_period"
+    )).fetchall()
+    if detached:
+        raise RuntimeError(
+            "Reattach or restore the detached partitions before downgrading: "
+            + ", ".join(row[0] for row in detached)
+        )
+
+    drop_ledger_views()
+    for table, keys in (
+        ('entries', 'PRIMARY KEY (id), '
+                    'FOREIGN KEY (debit) REFERENCES accounts(id) ON DELETE RESTRICT, '
+                    'FOREIGN KEY (credit) REFERENCES accounts(id) ON DELETE RESTRICT'),
+        ('item_log', 'PRIMARY KEY (id), UNIQUE (uuid), '
+                     'FOREIGN KEY (item_id) REFERENCES item(uuid), '
+                     'FOREIGN KEY (entity_id) REFERENCES entity(uuid)'),
+    ):
+        op.execute("""
+            ALTER TABLE {0} RENAME TO {0}_partitioned;
+            ALTER SEQUENCE {0}_id_seq OWNED BY NONE;
+            CREATE TABLE {0} (LIKE {0}_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS, {1});
+            INSERT INTO {0} SELECT * FROM {0}_partitioned;
+            DROP TABLE {0}_partitioned;
+            ALTER SEQUENCE {0}_id_seq OWNED BY {0}.id;
+        """.format(table, keys))
+    op.execute(LEDGER_VIEWS)
+    op.execute('DROP FUNCTION IF EXISTS detach_accounting_period(TEXT)')
+    op.execute('DROP FUNCTION IF EXISTS create_accounting_partitions(TEXT, DATE, DATE)')
+    op.execute('DROP FUNCTION IF EXISTS partition_by_accounting_date(TEXT, TEXT)')
+    op.execute('DROP TABLE IF EXISTS ledger_archives')
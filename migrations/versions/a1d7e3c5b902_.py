@@ -0,0 +1,24 @@
+"""index account_balance_snapshots by accounting_period
+
+Revision ID: a1d7e3c5b902
+Revises: f3b8d2a6c417
+Create Date: 2026-10-18 19:40:05.771203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d7e3c5b902'
+down_revision = 'f3b8d2a6c417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'account_balance_snapshots_period_idx', 'account_balance_snapshots', ['accounting_period'])
+
+
+def downgrade():
+    op.drop_index('account_balance_snapshots_period_idx', table_name='account_balance_snapshots')
@@ -0,0 +1,137 @@
+"""account_holders and item_accounts directory tables
+
+Revision ID: b7e4c1d9f253
+Revises: 6d2f8b3a4c91
+Create Date: 2026-10-18 17:03:48.215907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4c1d9f253'
+down_revision = '6d2f8b3a4c91'
+branch_labels = None
+depends_on = None
+
+
+ACCOUNT_HOLDERS = ('customer', 'vendor', 'entity', 'commission_account', 'payment_type')
+ITEM_ACCOUNTS = ('item', 'vendor', 'entity')
+
+
+def _group(table):
+    return table.replace('_', ' ')
+
+
+DIRECTORY_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION sync_account_holders() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.uuid IS DISTINCT FROM NEW.uuid) THEN
+            DELETE FROM account_holders WHERE uuid = OLD.uuid;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.uuid IS NOT NULL THEN
+            INSERT INTO account_holders (uuid, "group", name)
+            VALUES (NEW.uuid, TG_ARGV[0], NEW.name)
+            ON CONFLICT (uuid) DO UPDATE SET "group" = EXCLUDED."group", name = EXCLUDED.name;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION sync_item_accounts() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.uuid IS DISTINCT FROM NEW.uuid) THEN
+            DELETE FROM item_accounts WHERE uuid = OLD.uuid;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.uuid IS NOT NULL THEN
+            INSERT INTO item_accounts (uuid, "group", id, name)
+            VALUES (NEW.uuid, TG_ARGV[0], NEW.id, NEW.name)
+            ON CONFLICT (uuid) DO UPDATE SET "group" = EXCLUDED."group", id = EXCLUDED.id,
+                name = EXCLUDED.name;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+ITEM_BALANCES = """
+    CREATE MATERIALIZED VIEW item_balances(uuid, quantity, balance) AS
+        SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0.0),
+            COALESCE(sum(item_ledger.amount), 0.0)
+        FROM item_accounts
+        LEFT OUTER JOIN item_ledger ON item_accounts.uuid = item_ledger.account_id
+        GROUP BY item_accounts.uuid;
+
+    CREATE UNIQUE INDEX ON item_balances(uuid);
+"""
+
+
+def upgrade():
+    # item_balances is built on the item_accounts view, rebuild it on the table
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS item_balances')
+    op.execute('DROP VIEW IF EXISTS account_holders')
+    op.execute('DROP VIEW IF EXISTS item_accounts')
+
+    op.create_table('account_holders',
+    sa.Column('uuid', sa.String(length=50), nullable=False),
+    sa.Column('group', sa.String(length=50), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=True),
+    sa.PrimaryKeyConstraint('uuid')
+    )
+    op.create_table('item_accounts',
+    sa.Column('uuid', sa.String(length=50), nullable=False),
+    sa.Column('group', sa.String(length=50), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=True),
+    sa.PrimaryKeyConstraint('uuid')
+    )
+    op.execute(DIRECTORY_TRIGGERS)
+
+    for table in ACCOUNT_HOLDERS:
+        op.execute(
+            """CREATE TRIGGER trigger_account_holders
+            AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON {0}
+            FOR EACH ROW EXECUTE PROCEDURE sync_account_holders('{1}')""".format(table, _group(table)))
+        op.execute(
+            """INSERT INTO account_holders (uuid, "group", name)
+            SELECT uuid, '{1}', name FROM {0} WHERE uuid IS NOT NULL
+            ON CONFLICT (uuid) DO NOTHING""".format(table, _group(table)))
+    for table in ITEM_ACCOUNTS:
+        op.execute(
+            """CREATE TRIGGER trigger_item_accounts
+            AFTER INSERT OR UPDATE OF uuid, name OR DELETE ON {0}
+            FOR EACH ROW EXECUTE PROCEDURE sync_item_accounts('{0}')""".format(table))
+        op.execute(
+            """INSERT INTO item_accounts (uuid, "group", id, name)
+            SELECT uuid, '{0}', id, name FROM {0} WHERE uuid IS NOT NULL
+            ON CONFLICT (uuid) DO NOTHING""".format(table))
+
+    op.execute(ITEM_BALANCES)
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS item_balances')
+    for table in ACCOUNT_HOLDERS:
+        op.execute('DROP TRIGGER IF EXISTS trigger_account_holders ON {0}'.format(table))
+    for table in ITEM_ACCOUNTS:
+        op.execute('DROP TRIGGER IF EXISTS trigger_item_accounts ON {0}'.format(table))
+    op.execute('DROP FUNCTION IF EXISTS sync_account_holders()')
+    op.execute('DROP FUNCTION IF EXISTS sync_item_accounts()')
+    op.drop_table('item_accounts')
+    op.drop_table('account_holders')
+
+    op.execute("""
+    CREATE OR REPLACE VIEW account_holders AS
+    SELECT 'customer' as group, uuid, name as name FROM customer UNION
+    SELECT 'vendor' as group, uuid, name FROM vendor UNION
+    SELECT 'entity' as group, uuid, name FROM entity UNION
+    SELECT 'commission account' as group, uuid, name FROM commission_account UNION
+    SELECT 'payment type' as group, uuid, name FROM payment_type;
+
+    CREATE OR REPLACE VIEW item_accounts AS
+    SELECT 'item' as group, uuid, id, name as name FROM item UNION
+    SELECT 'vendor' as group, uuid, id, name FROM vendor UNION
+    SELECT 'entity' as group, uuid, id, name FROM entity;
+    """)
+    op.execute(ITEM_BALANCES)
@@ -0,0 +1,40 @@
+"""unique (vendor_id, tranid) on transaction
+
+Revision ID: c2d9e4a7f316
+Revises: 7b4e0c51d2a8
+Create Date: 2026-10-18 11:40:27.204113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d9e4a7f316'
+down_revision = '7b4e0c51d2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # which of the duplicates is the real one is for a person to decide,
+    # they may already have posted entries
+    duplicates = op.get_bind().execute(sa.text(
+        """SELECT vendor_id, tranid, count(*) FROM "transaction"
+        WHERE vendor_id IS NOT NULL AND tranid IS NOT NULL
+        GROUP BY vendor_id, tranid HAVING count(*) > 1
+        ORDER BY vendor_id, tranid LIMIT 50"""
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            "Resolve the duplicate (vendor_id, tranid) transactions first: "
+            + ", ".join("({0}, {1}) x{2}".format(*row) for row in duplicates)
+        )
+
+    op.create_unique_constraint(
+        'transaction_vendor_id_tranid_key', 'transaction', ['vendor_id', 'tranid']
+    )
+
+
+def downgrade():
+    op.drop_constraint('transaction_vendor_id_tranid_key', 'transaction', type_='unique')
@@ -0,0 +1,89 @@
+"""archived accounting periods refuse back-dated entries
+
+Revision ID: c8f2a4d6e913
+Revises: a1d7e3c5b902
+Create Date: 2026-10-18 20:05:19.402716
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f2a4d6e913'
+down_revision = 'a1d7e3c5b902'
+branch_labels = None
+depends_on = None
+
+
+DETACH = """
+    CREATE OR REPLACE FUNCTION detach_accounting_period(period TEXT) RETURNS TEXT AS $$
+    DECLARE
+        first_day DATE := to_date(period, 'YYYY-MM');
+        part TEXT := 'entries' || to_char(first_day, '"_p"YYYY_MM');
+    BEGIN
+        IF to_regclass(part) IS NULL THEN
+            RAISE EXCEPTION 'entries has no partition for %', period;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM account_balance_snapshots WHERE accounting_period = period) THEN
+            RAISE EXCEPTION 'accounting period % has not been closed', period;
+        END IF;
+        IF EXISTS (SELECT 1 FROM entries WHERE accounting_date < first_day) THEN
+            RAISE EXCEPTION 'earlier accounting periods must be detached first';
+        END IF;
+
+        EXECUTE format('ALTER TABLE entries DETACH PARTITION %I', part);{0}
+        INSERT INTO ledger_archives (accounting_period, closing_date, detached_partition)
+        VALUES (period, (first_day + interval '1 month' - interval '1 day')::date, part);
+        RETURN part;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+# an empty stand-in for the detached period that refuses every row
+STAND_IN = """
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE entries INCLUDING DEFAULTS, CONSTRAINT %I CHECK (false))',
+            part || '_archived', part || '_archived');
+        EXECUTE format(
+            'ALTER TABLE entries ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            part || '_archived', first_day, (first_day + interval '1 month')::date);"""
+
+
+def upgrade():
+    op.execute(DETACH.replace('{0}', STAND_IN))
+    # periods archived before this revision get their stand-in now
+    op.execute("""
+    DO $$
+    DECLARE
+        archive RECORD;
+        first_day DATE;
+    BEGIN
+        FOR archive IN SELECT * FROM ledger_archives ORDER BY accounting_period LOOP
+            first_day := to_date(archive.accounting_period, 'YYYY-MM');
+            CONTINUE WHEN to_regclass(archive.detached_partition || '_archived') IS NOT NULL;
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE entries INCLUDING DEFAULTS, CONSTRAINT %I CHECK (false))',
+                archive.detached_partition || '_archived', archive.detached_partition || '_archived');
+            EXECUTE format(
+                'ALTER TABLE entries ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                archive.detached_partition || '_archived', first_day,
+                (first_day + interval '1 month')::date);
+        END LOOP;
+    END
+    $$
+    """)
+
+
+def downgrade():
+    op.execute("""
+    DO $$
+    DECLARE
+        archive RECORD;
+    BEGIN
+        FOR archive IN SELECT * FROM ledger_archives LOOP
+            EXECUTE format('DROP TABLE IF EXISTS %I', archive.detached_partition || '_archived');
+        END LOOP;
+    END
+    $$
+    """)
+    op.execute(DETACH.replace('{0}', ''))
@@ -0,0 +1,32 @@
+"""account balance snapshots per accounting period
+
+Revision ID: d41b7c0e5a93
+Revises: 5e8a1f3b92c4
+Create Date: 2026-10-18 13:02:36.118502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7c0e5a93'
+down_revision = '5e8a1f3b92c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('account_balance_snapshots',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('accounting_period', sa.String(length=50), nullable=False),
+    sa.Column('closing_date', sa.Date(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=20, scale=2), nullable=False),
+    sa.Column('date_created', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('account_id', 'accounting_period')
+    )
+
+
+def downgrade():
+    op.drop_table('account_balance_snapshots')
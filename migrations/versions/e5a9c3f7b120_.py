@@ -0,0 +1,153 @@
+"""item_balances table
+
+Revision ID: e5a9c3f7b120
+Revises: b7e4c1d9f253
+Create Date: 2026-10-18 17:48:12.604381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3f7b120'
+down_revision = 'b7e4c1d9f253'
+branch_labels = None
+depends_on = None
+
+
+ITEM_BALANCE_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION update_item_balances() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+            SELECT account_id, sum(quantity), sum(amount), now() FROM (
+                SELECT credit AS account_id, quantity, amount FROM new_item_log
+                UNION ALL
+                SELECT debit, (0 - quantity), (0.0 - amount) FROM new_item_log
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+            ON CONFLICT (uuid) DO UPDATE
+            SET quantity = item_balances.quantity + EXCLUDED.quantity,
+                balance = item_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+            SELECT account_id, sum(quantity), sum(amount), now() FROM (
+                SELECT credit AS account_id, (0 - quantity) AS quantity,
+                    (0.0 - amount) AS amount FROM old_item_log
+                UNION ALL
+                SELECT debit, quantity, amount FROM old_item_log
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+            ON CONFLICT (uuid) DO UPDATE
+            SET quantity = item_balances.quantity + EXCLUDED.quantity,
+                balance = item_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+            SELECT account_id, sum(quantity), sum(amount), now() FROM (
+                SELECT credit AS account_id, quantity, amount FROM new_item_log
+                UNION ALL
+                SELECT debit, (0 - quantity), (0.0 - amount) FROM new_item_log
+                UNION ALL
+                SELECT credit, (0 - quantity), (0.0 - amount) FROM old_item_log
+                UNION ALL
+                SELECT debit, quantity, amount FROM old_item_log
+            ) deltas
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+            HAVING sum(quantity) <> 0 OR sum(amount) <> 0
+            ORDER BY account_id
+            ON CONFLICT (uuid) DO UPDATE
+            SET quantity = item_balances.quantity + EXCLUDED.quantity,
+                balance = item_balances.balance + EXCLUDED.balance,
+                date_modified = EXCLUDED.date_modified;
+        ELSE
+            UPDATE item_balances SET quantity = 0, balance = 0.0, date_modified = now();
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER trigger_fix_balance_item_log_insert
+    AFTER INSERT ON item_log
+    REFERENCING NEW TABLE AS new_item_log
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_item_balances();
+
+    CREATE TRIGGER trigger_fix_balance_item_log_update
+    AFTER UPDATE ON item_log
+    REFERENCING OLD TABLE AS old_item_log NEW TABLE AS new_item_log
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_item_balances();
+
+    CREATE TRIGGER trigger_fix_balance_item_log_delete
+    AFTER DELETE ON item_log
+    REFERENCING OLD TABLE AS old_item_log
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_item_balances();
+
+    CREATE TRIGGER trigger_fix_balance_item_log_truncate
+    AFTER TRUNCATE ON item_log
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE update_item_balances();
+
+    INSERT INTO item_balances (uuid, quantity, balance, date_modified)
+    SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0),
+        COALESCE(sum(item_ledger.amount), 0.0), now()
+    FROM item_accounts LEFT OUTER JOIN item_ledger
+    ON item_accounts.uuid = item_ledger.account_id
+    GROUP BY item_accounts.uuid
+    ON CONFLICT (uuid) DO NOTHING;
+"""
+
+
+def upgrade():
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_item_log ON item_log')
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS item_balances')
+    op.execute('DROP FUNCTION IF EXISTS update_item_balances()')
+
+    op.create_table('item_balances',
+    sa.Column('uuid', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=20, scale=2), nullable=False),
+    sa.Column('date_modified', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('uuid')
+    )
+    op.execute(ITEM_BALANCE_TRIGGERS)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_insert ON item_log')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_update ON item_log')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_delete ON item_log')
+    op.execute('DROP TRIGGER IF EXISTS trigger_fix_balance_item_log_truncate ON item_log')
+    op.execute('DROP FUNCTION IF EXISTS update_item_balances()')
+    op.drop_table('item_balances')
+
+    op.execute("""
+    CREATE MATERIALIZED VIEW item_balances(uuid, quantity, balance) AS
+        SELECT item_accounts.uuid, COALESCE(sum(item_ledger.quantity), 0.0),
+            COALESCE(sum(item_ledger.amount), 0.0)
+        FROM item_accounts
+        LEFT OUTER JOIN item_ledger ON item_accounts.uuid = item_ledger.account_id
+        GROUP BY item_accounts.uuid;
+
+    CREATE UNIQUE INDEX ON item_balances(uuid);
+
+    CREATE OR REPLACE FUNCTION update_item_balances() RETURNS TRIGGER AS $$
+    BEGIN
+        REFRESH MATERIALIZED VIEW item_balances;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER trigger_fix_balance_item_log
+    AFTER INSERT OR UPDATE OF quantity, amount, credit, debit OR DELETE OR TRUNCATE
+    ON item_log FOR EACH STATEMENT EXECUTE PROCEDURE update_item_balances();
+    """)
@@ -0,0 +1,31 @@
+"""statement indexes on entries by accounting date
+
+Revision ID: f3b8d2a6c417
+Revises: e5a9c3f7b120
+Create Date: 2026-10-18 19:12:40.318552
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d2a6c417'
+down_revision = 'e5a9c3f7b120'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'entries_credit_accounting_date_id_idx', 'entries', ['credit', 'accounting_date', 'id'])
+    op.create_index(
+        'entries_debit_accounting_date_id_idx', 'entries', ['debit', 'accounting_date', 'id'])
+    op.drop_index('entries_credit_id_idx', table_name='entries')
+    op.drop_index('entries_debit_id_idx', table_name='entries')
+
+
+def downgrade():
+    op.create_index('entries_credit_id_idx', 'entries', ['credit', 'id'])
+    op.create_index('entries_debit_id_idx', 'entries', ['debit', 'id'])
+    op.drop_index('entries_debit_accounting_date_id_idx', table_name='entries')
+    op.drop_index('entries_credit_accounting_date_id_idx', table_name='entries')
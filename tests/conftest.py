@@ -1,6 +1,11 @@
 import json
+import os
+
 import pytest
 
+import autoshop
+from autoshop.commons.dbaccess import execute_sql
+
 from autoshop.models import User
 from autoshop.app import create_app
 from autoshop.extensions import db as _db
@@ -25,6 +30,28 @@ def db(app):
     _db.drop_all()
 
 
+@pytest.fixture
+def ledger(db):
+    """Partitions, ledger views and balance triggers, as `init` sets them up
+
+    They are written for Postgres, so the test is skipped unless
+    DATABASE_URL points at a (throwaway) Postgres database.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('needs Postgres, set DATABASE_URL')
+
+    folder = os.path.join(os.path.dirname(autoshop.__file__), 'sql')
+    for name in ('partitions.sql', 'accounting.sql', 'views.sql', 'items.sql'):
+        with open(os.path.join(folder, name)) as file:
+            execute_sql(file)
+
+    yield db
+
+    db.session.close()
+    with db.engine.begin() as conn:
+        conn.execute('DROP SCHEMA public CASCADE; CREATE SCHEMA public')
+
+
 @pytest.fixture
 def admin_user(db):
     user = User(
@@ -0,0 +1,20 @@
+import base64
+
+from autoshop.models import Account
+
+
+def test_statement_rejects_bad_arguments(client, db, admin_headers):
+    account = Account(owner_id="owner", acc_type="customer", group="entity")
+    db.session.add(account)
+    db.session.commit()
+    url = "/api/v1/accounts/entries/%d" % account.id
+
+    rep = client.get(url + "?page_size=x", headers=admin_headers)
+    assert rep.status_code == 422
+
+    # a cursor the client edited, the running balance is not trusted
+    forged = base64.urlsafe_b64encode(
+        b'{"accounting_date":"2026-01-01","entry_id":1,"tran_category":"x","balance":1000000}')
+    rep = client.get(url + "?after=" + forged.decode("ascii"), headers=admin_headers)
+    assert rep.status_code == 422
+    assert rep.get_json() == {"msg": "Invalid cursor"}
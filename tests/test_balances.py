@@ -0,0 +1,59 @@
+from autoshop.models import Account, AccountBalance, Entry
+
+
+def make_accounts(db, count):
+    accounts = [
+        Account(owner_id="owner%d" % i, acc_type="customer", group="entity") for i in range(count)
+    ]
+    db.session.add_all(accounts)
+    db.session.commit()
+    return [account.id for account in accounts]
+
+
+def ledger_sums(db):
+    rows = db.session.execute(
+        "SELECT account_id, sum(amount) FROM account_ledgers GROUP BY account_id")
+    return {account_id: float(amount) for account_id, amount in rows}
+
+
+def stored_balances(db):
+    return {row.id: float(row.balance) for row in AccountBalance.query}
+
+
+def test_triggers_keep_balances_in_step_with_the_ledger(ledger):
+    db = ledger
+    a, b, c = make_accounts(db, 3)
+    # opening an account opens its balance
+    assert stored_balances(db) == {a: 0, b: 0, c: 0}
+
+    entries = [
+        Entry(reference="r1", amount=30, debit=a, credit=b, tran_type="bill"),
+        Entry(reference="r2", amount=10, debit=b, credit=c, tran_type="bill"),
+        Entry(reference="r3", amount=5, debit=a, credit=c, tran_type="bill"),
+    ]
+    db.session.add_all(entries)
+    db.session.commit()
+    assert stored_balances(db) == {a: -35, b: 20, c: 15}
+
+    entries[0].amount = 40
+    db.session.delete(entries[2])
+    db.session.commit()
+
+    assert stored_balances(db) == {a: -40, b: 30, c: 10}
+    assert stored_balances(db) == ledger_sums(db)
+    assert AccountBalance.drift() == []
+
+
+def test_rebuild_repairs_drifted_balances(ledger):
+    db = ledger
+    a, b = make_accounts(db, 2)
+    db.session.add(Entry(reference="r1", amount=30, debit=a, credit=b, tran_type="bill"))
+    db.session.commit()
+
+    db.session.execute("UPDATE account_balances SET balance = 999 WHERE id = :id", {"id": a})
+    db.session.commit()
+    assert [row["id"] for row in AccountBalance.drift()] == [a]
+
+    assert AccountBalance.rebuild() == 2
+    assert AccountBalance.drift() == []
+    assert stored_balances(db) == ledger_sums(db) == {a: -30, b: 30}
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from autoshop.models import Entry, PostingContext
+from autoshop.models.charge import (
+    Band, Charge, ChargeSplit, FeeSchedule, Split, Tarriff, TarriffPlan, invalidate_fee_schedule
+)
+
+
+def make_plan():
+    return TarriffPlan(
+        'T1', 'Payment charges',
+        [
+            Band(1001, 5000, 'percentage', '2'),
+            Band(0, 1000, 'flat', '10'),
+        ],
+        [Split(1, 'acc1', 75), Split(2, 'acc2', 25)]
+    )
+
+
+def test_fee_bands():
+    plan = make_plan()
+
+    assert plan.fee(0) == 10.0
+    assert plan.fee(1000) == 10.0
+    assert plan.fee(2000) == 40.0
+    assert plan.fee(5000) == 100.0
+    assert plan.fee(1000.5) is None
+    assert plan.fee(5001) is None
+    assert plan.fee(-1) is None
+
+
+def test_fees_in_one_pass():
+    plan = make_plan()
+
+    amounts = [2000, 0, 7000, 1000, 1000.5, 5000]
+    assert plan.fees(amounts) == [plan.fee(amount) for amount in amounts]
+    assert plan.fees([]) == []
+
+
+def test_fee_shares():
+    plan = make_plan()
+
+    shares = plan.shares(40.0)
+    assert [(split.account_id, share) for split, share in shares] == [(1, 30.0), (2, 10.0)]
+
+
+def test_split_without_an_account_is_not_posted(app, db):
+    tarriff = Tarriff(name="Bill charges", tran_type="bill", payment_type="cash", entity_id="ALL")
+    db.session.add(tarriff)
+    db.session.flush()
+    db.session.add_all([
+        Charge(code=tarriff.uuid, min_value=0, max_value=1000, charge_type="flat", amount="10"),
+        ChargeSplit(code=tarriff.uuid, account_code="closed", percentage=100),
+    ])
+    db.session.commit()
+
+    messages = []
+    sink = app.logger.add(messages.append, level="ERROR")
+    try:
+        plan = FeeSchedule.compile().tarriff("bill", "cash")
+    finally:
+        app.logger.remove(sink)
+    assert [split.account_id for split in plan.splits] == [None]
+    assert "Charge split closed of tarriff" in "".join(messages)
+
+    invalidate_fee_schedule()
+    entry = Entry(reference="ref", amount=100, tran_type="bill", pay_type="cash", debit=1, credit=2)
+    try:
+        with pytest.raises(Exception) as error:
+            entry.get_entries(PostingContext())
+    finally:
+        # the schedule is cached per process, don't leave this one to other tests
+        invalidate_fee_schedule()
+    assert error.value.args == ("The Bill charges charge split closed has no account", 500)
+
+
+def test_quote_rejects_malformed_bodies(client, admin_headers):
+    bodies = [
+        [{"code": "T1", "amount": 10}],
+        "amounts",
+        {"code": "T1", "amounts": 10},
+        {"quotes": {"code": "T1", "amount": 10}},
+        {"quotes": ["T1"]},
+        {"code": ["T1"], "amounts": [10]},
+        {"code": "T1", "amounts": ["ten"]},
+    ]
+    for body in bodies:
+        rep = client.post("/api/v1/charges/quote", data=json.dumps(body), headers=admin_headers)
+        assert rep.status_code == 422, body
@@ -0,0 +1,36 @@
+import gzip
+import json
+
+from flask import Response
+
+from autoshop.commons.compression import compress_response
+from autoshop.commons.streaming import stream_json
+
+
+def test_gzip_above_threshold(app):
+    body = json.dumps([{'id': i, 'name': 'account'} for i in range(100)])
+    with app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+        response = Response(body, mimetype='application/json')
+        response.set_etag('abc')
+        response = compress_response(response, app.config)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.vary
+        assert response.get_etag() == ('abc', True)
+        assert gzip.decompress(response.get_data()).decode() == body
+
+        small = compress_response(Response('{}', mimetype='application/json'), app.config)
+        assert 'Content-Encoding' not in small.headers
+
+    with app.test_request_context('/'):
+        response = compress_response(Response(body, mimetype='application/json'), app.config)
+        assert 'Content-Encoding' not in response.headers
+
+
+def test_gzip_stream_chunks(app):
+    batches = (['{"id": %d}' % i] for i in range(3))
+    with app.test_request_context('/', headers={'Accept-Encoding': 'gzip, deflate'}):
+        response = compress_response(stream_json(batches), app.config)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        chunks = list(response.response)
+        assert len(chunks) > 2
+        assert gzip.decompress(b''.join(chunks)) == b'[{"id": 0},{"id": 1},{"id": 2}]'
@@ -0,0 +1,37 @@
+from autoshop.models import User
+
+
+def test_list_conditional_get(client, db, admin_headers):
+    url = '/api/v1/users'
+    rep = client.get(url, headers=admin_headers)
+    assert rep.status_code == 200
+    etag = rep.headers['ETag']
+    assert etag.startswith('W/')
+
+    rep = client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert rep.status_code == 304
+    assert rep.get_data() == b''
+
+    # another page of the same data is another representation
+    rep = client.get(url + '?page_size=1', headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert rep.status_code == 200
+
+    db.session.add(User(username='other', email='other@mail.com', password='x'))
+    db.session.commit()
+    rep = client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert rep.status_code == 200
+    assert rep.headers['ETag'] != etag
+
+
+def test_detail_if_modified_since(client, db, admin_user, admin_headers):
+    url = '/api/v1/users/%d' % admin_user.id
+    rep = client.get(url, headers=admin_headers)
+    assert rep.status_code == 200
+    last_modified = rep.headers['Last-Modified']
+
+    rep = client.get(url, headers=dict(admin_headers, **{'If-Modified-Since': last_modified}))
+    assert rep.status_code == 304
+
+    rep = client.get(url, headers=dict(admin_headers, **{'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'}))
+    assert rep.status_code == 200
+    assert rep.get_json()['user']['username'] == 'admin'
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import exc
+
+from autoshop.commons.dbaccess import prepare, retry_on_conflict
+from autoshop.models import User
+
+
+def test_prepare_numbers_parameters():
+    statement = prepare(
+        "test_statement",
+        " name FROM item WHERE uuid = :uuid AND entity_id = :entity"
+        " AND parent = :uuid AND created::date = :day",
+    )
+
+    assert statement.keys == ["uuid", "entity", "day"]
+    assert "uuid = $1 AND entity_id = $2 AND parent = $1" in statement.sql
+    assert "created::date = $3" in statement.sql
+    assert str(statement.statement) == "EXECUTE test_statement(:uuid, :entity, :day)"
+
+
+def test_prepare_rejects_redefinition():
+    prepare("test_redefined", " 1")
+    assert prepare("test_redefined", " 1") is prepare("test_redefined", " 1")
+    with pytest.raises(ValueError):
+        prepare("test_redefined", " 2")
+
+
+class Deadlock(Exception):
+    pgcode = "40P01"
+
+
+def test_retry_on_conflict_runs_the_work_again(db):
+    calls = []
+
+    def work():
+        calls.append(len(calls))
+        name = "u%d" % len(calls)
+        db.session.add(User(username=name, email=name + "@mail.com", password="x"))
+        db.session.flush()
+        if len(calls) == 1:
+            raise exc.OperationalError("SELECT", {}, Deadlock())
+        return "posted"
+
+    assert retry_on_conflict(work) == "posted"
+    db.session.commit()
+    assert calls == [0, 1]
+    assert [user.username for user in User.query.all()] == ["u2"]
+
+
+def test_retry_on_conflict_raises_other_errors(db):
+    calls = []
+
+    def work():
+        calls.append(1)
+        db.session.add(User(username="u", email="u@mail.com", password="x"))
+        db.session.flush()
+        raise ValueError("invalid")
+
+    with pytest.raises(ValueError):
+        retry_on_conflict(work)
+    db.session.commit()
+    assert calls == [1]
+    assert User.query.count() == 0
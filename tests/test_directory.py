@@ -0,0 +1,82 @@
+from autoshop.models import AccountHolder, Customer
+from autoshop.models.directory import HOLDERS
+
+
+def rename(db, uuid, name):
+    db.session.execute(
+        "UPDATE account_holders SET name = :name WHERE uuid = :uuid", {"name": name, "uuid": uuid})
+    db.session.commit()
+
+
+def test_names_are_cached_per_process(app, db):
+    db.session.add_all([
+        AccountHolder(uuid="c1", group="customer", name="Jane"),
+        AccountHolder(uuid="v1", group="vendor", name="Parts Ltd"),
+    ])
+    db.session.commit()
+
+    assert HOLDERS.names(["c1", "v1", "missing", None]) == {"c1": "Jane", "v1": "Parts Ltd"}
+    rename(db, "c1", "Janet")
+    assert HOLDERS.name("c1") == "Jane"
+
+    HOLDERS.forget("c1")
+    assert HOLDERS.name("c1") == "Janet"
+    assert HOLDERS.name("missing") is None
+
+
+def test_cache_expires(app, db):
+    db.session.add(AccountHolder(uuid="c1", group="customer", name="Jane"))
+    db.session.commit()
+    assert HOLDERS.name("c1") == "Jane"
+
+    rename(db, "c1", "Janet")
+    app.config["DIRECTORY_CACHE_TTL"] = -1
+    assert HOLDERS.name("c1") == "Janet"
+
+
+def test_committed_source_write_forgets_the_name(app, db):
+    customer = Customer(name="Jane", phone="0700", entity_id="entity", type_id="type")
+    db.session.add(customer)
+    db.session.add(AccountHolder(uuid=customer.uuid, group="customer", name="Jane"))
+    db.session.commit()
+    assert HOLDERS.name(customer.uuid) == "Jane"
+
+    # the trigger keeping account_holders in step is Postgres only
+    customer.name = "Janet"
+    db.session.query(AccountHolder).filter_by(uuid=customer.uuid).update({"name": "Janet"})
+    db.session.commit()
+    assert HOLDERS.name(customer.uuid) == "Janet"
+
+
+def test_rolled_back_source_write_forgets_the_name(app, db):
+    customer = Customer(name="Jane", phone="0700", entity_id="entity", type_id="type")
+    db.session.add(customer)
+    db.session.add(AccountHolder(uuid=customer.uuid, group="customer", name="Jane"))
+    db.session.commit()
+    uuid = customer.uuid
+
+    customer.name = "Janet"
+    db.session.query(AccountHolder).filter_by(uuid=uuid).update({"name": "Janet"})
+    db.session.flush()
+    # read inside the transaction, as a request's unit of work does
+    assert HOLDERS.name(uuid) == "Janet"
+
+    db.session.rollback()
+    assert HOLDERS.name(uuid) == "Jane"
+
+
+def test_released_savepoint_keeps_the_write_pending(app, db):
+    customer = Customer(name="Jane", phone="0700", entity_id="entity", type_id="type")
+    db.session.add(customer)
+    db.session.add(AccountHolder(uuid=customer.uuid, group="customer", name="Jane"))
+    db.session.commit()
+    uuid = customer.uuid
+
+    db.session.begin_nested()
+    customer.name = "Janet"
+    db.session.commit()
+    # pysqlite can't roll a released savepoint back, check the bookkeeping
+    assert ("customer", uuid) in db.session.info["directory_writes"]
+
+    db.session.rollback()
+    assert "directory_writes" not in db.session.info
@@ -0,0 +1,59 @@
+import pytest
+
+from autoshop.models import Account, AccountBalance, Entry, TransactionType
+
+
+@pytest.fixture
+def accounts(db):
+    accounts = [
+        Account(owner_id="customer", acc_type="customer", group="entity"),
+        Account(owner_id="entity", acc_type="entity", group="entity"),
+    ]
+    db.session.add_all(accounts)
+    db.session.flush()
+    db.session.add_all([AccountBalance(id=account.id, balance=100) for account in accounts])
+    db.session.add_all([
+        TransactionType(uuid="bill", name="bill"),
+        TransactionType(uuid="reversal", name="reversal"),
+    ])
+    db.session.add(Entry(reference="orig", amount=10, tran_type="bill",
+                         debit=accounts[0].id, credit=accounts[1].id))
+    db.session.commit()
+    return accounts
+
+
+def reversal(reference, original="orig"):
+    return Entry(reference=reference, tran_type="reversal", cheque_number=original,
+                 amount=0, debit=None, credit=None)
+
+
+def test_reversal_is_valid_once(db, accounts):
+    entry = reversal("rev-1")
+    assert entry.is_valid()[0]
+    assert (entry.debit, entry.credit, float(entry.amount)) == (accounts[1].id, accounts[0].id, 10)
+
+    db.session.add(entry)
+    db.session.commit()
+    assert reversal("rev-2").is_valid() == (
+        False, {"msg": "This transaction is already reversed"}, 409)
+    assert reversal("rev-3", "missing").is_valid() == (
+        False, {"msg": "You can only reverse an existing transaction"}, 422)
+
+
+def test_validate_batch_reverses_once(db, accounts):
+    results = Entry.validate_batch([reversal("rev-1"), reversal("rev-2")])
+    assert results[0][0]
+    assert results[1] == (False, {"msg": "This transaction is already reversed"}, 409)
+
+    db.session.add(Entry(reference="rev-0", amount=10, tran_type="reversal", cheque_number="orig",
+                         debit=accounts[1].id, credit=accounts[0].id))
+    db.session.commit()
+    results = Entry.validate_batch([reversal("rev-1")])
+    assert results == [(False, {"msg": "This transaction is already reversed"}, 409)]
+
+
+def test_transact_batch_posts_nothing_with_a_repeated_reversal(db, accounts):
+    results = Entry.transact_batch([reversal("rev-1"), reversal("rev-2")])
+    assert [status for posted, reason, status in results] == [424, 409]
+    assert not any(posted for posted, reason, status in results)
+    assert Entry.query.filter_by(tran_type="reversal").count() == 0
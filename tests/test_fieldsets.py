@@ -0,0 +1,26 @@
+from autoshop.api.resources.user import UserSchema
+from autoshop.commons.pagination import paginate
+from autoshop.models import User
+
+
+def test_fields_prune_dump_and_columns(app, db, admin_user):
+    with app.test_request_context('/api/v1/users?fields=username,creator,bogus'):
+        page = paginate(User.query, UserSchema(many=True))[0]
+        assert page['results'] == [{'username': 'admin', 'creator': None}]
+        user = User.query.get(admin_user.id)
+        loaded = set(user.__dict__)
+    assert {'id', 'username', 'created_by'} <= loaded
+    assert not {'email', 'password'} & loaded
+
+
+def test_fields_with_unknown_computed_load_every_column(app, db, admin_user):
+    with app.test_request_context('/api/v1/users?fields=username,role'):
+        page = paginate(User.query, UserSchema(many=True))[0]
+        assert set(page['results'][0]) == {'username', 'role'}
+        assert 'email' in User.query.get(admin_user.id).__dict__
+
+
+def test_no_fields_dump_everything(app, db, admin_user):
+    with app.test_request_context('/api/v1/users'):
+        page = paginate(User.query, UserSchema(many=True))[0]
+    assert {'username', 'email', 'role', 'creator'} <= set(page['results'][0])
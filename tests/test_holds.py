@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import event
+
+from autoshop.manage import worker
+from autoshop.models import (
+    Account, AccountBalance, AccountHold, PostingContext, Transaction, TransactionType
+)
+
+
+@pytest.fixture
+def account(db):
+    account = Account(owner_id="owner", acc_type="customer", group="entity")
+    db.session.add(account)
+    db.session.flush()
+    db.session.add(AccountBalance(id=account.id, balance=100))
+    db.session.commit()
+    return account
+
+
+def test_hold_moves_available_balance(db, account):
+    hold = AccountHold.place(account.id, 30, "ref-1")
+    AccountHold.place(account.id, 20, "ref-2")
+    assert AccountBalance.available_of(account.id) == 50
+
+    hold.release()
+    assert hold.status == "RELEASED"
+    assert AccountBalance.available_of(account.id) == 80
+    assert AccountHold.open("ref-1") is None
+
+    AccountHold.open("ref-2").capture()
+    assert AccountBalance.available_of(account.id) == 100
+
+
+def test_hold_settles_once(db, account):
+    hold = AccountHold.place(account.id, 30, "ref")
+    hold.capture()
+    with pytest.raises(Exception) as error:
+        hold.release()
+    assert error.value.args == ("This hold is already captured", 409)
+    assert AccountBalance.available_of(account.id) == 100
+
+
+def test_posting_context_counts_released_holds(db, account):
+    hold = AccountHold.place(account.id, 30, "ref")
+    context = PostingContext(ids=[account.id])
+    assert context.balance(account.id) == 100
+    assert context.available(account.id) == 70
+
+    context.release(hold)
+    assert context.available(account.id) == 100
+    context.lock([account.id])
+    assert context.available(account.id) == 100
+
+
+def test_drain_commits_each_held_transaction(db):
+    account = Account(owner_id="customer", acc_type="customer", group="entity")
+    db.session.add_all([account, Account(owner_id="entity", acc_type="entity", group="entity")])
+    db.session.flush()
+    db.session.add(AccountBalance(id=account.id, balance=100))
+    db.session.add(TransactionType(uuid="bill", name="bill"))
+    transactions = [
+        Transaction(reference="customer", vendor_id="vendor", tranid=str(i),
+                    tran_type="bill", pay_type="cash", amount="10", entity_id="entity")
+        for i in range(3)
+    ]
+    db.session.add_all(transactions)
+    db.session.flush()
+    for transaction in transactions:
+        transaction.hold()
+    db.session.commit()
+    assert AccountBalance.available_of(account.id) == 70
+
+    # COMMITs that reach the database, savepoint releases don't count
+    commits = []
+
+    def count(conn):
+        commits.append(conn)
+
+    event.listen(db.engine, "commit", count)
+    try:
+        assert Transaction.drain() == (3, 0)
+    finally:
+        event.remove(db.engine, "commit", count)
+
+    # one per transaction, its posting and captured hold together
+    assert len(commits) == 3
+    assert {t.status for t in Transaction.query} == {"SUCCESS"}
+    assert {h.status for h in AccountHold.query} == {"CAPTURED"}
+    assert db.session.query(AccountBalance.held).filter_by(id=account.id).scalar() == 0
+
+
+def test_worker_survives_a_failed_drain(app, db, monkeypatch):
+    outcomes = [RuntimeError("connection lost"), (2, 0), (0, 0)]
+    calls = []
+
+    def drain(batch_size):
+        calls.append(batch_size)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(Transaction, "drain", drain)
+    result = app.test_cli_runner().invoke(
+        worker, ["--batch-size", "2", "--interval", "0", "--once"])
+    assert result.exit_code == 0, result.output
+    assert calls == [2, 2, 2]
@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from autoshop.models import Item, ItemBalance, ItemLog
+
+
+def sale(item, quantity):
+    return ItemLog(
+        item_id=item.uuid, debit=item.uuid, credit="entity", reference="job-1",
+        category="sale", quantity=quantity, amount=100, entity_id="entity",
+    )
+
+
+def test_stock_is_read_from_item_balances(app, db):
+    item = Item(code="OIL", name="Engine oil")
+    db.session.add(item)
+    db.session.add(ItemBalance(uuid=item.uuid, quantity=3, balance=300))
+    db.session.commit()
+
+    with app.test_request_context("/"):
+        assert item.quantity == 3
+    assert ItemBalance.stock(item.uuid) == 3
+    assert ItemBalance.stock("unknown") == 0
+
+    assert sale(item, 3).is_valid()[0]
+    valid, reason, status = sale(item, 4).is_valid()
+    assert not valid
+    assert status == 409
+    assert reason["msg"].startswith("Insufficient quantity on the Engine oil account")
+
+
+def test_log_uuid_is_unique_per_accounting_date(db):
+    item = Item(code="OIL", name="Engine oil")
+    db.session.add(item)
+    first, second = sale(item, 1), sale(item, 1)
+    second.uuid = first.uuid
+    first.accounting_date = datetime.date(2026, 1, 31)
+    second.accounting_date = datetime.date(2026, 2, 1)
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    again = sale(item, 1)
+    again.uuid, again.accounting_date = first.uuid, first.accounting_date
+    db.session.add(again)
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
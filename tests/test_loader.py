@@ -0,0 +1,28 @@
+from autoshop.commons.loader import Loader
+
+
+def test_loader_batches_primed_keys(app):
+    calls = []
+
+    def fetch(keys):
+        calls.append(sorted(keys))
+        return {key: key * 10 for key in keys if key != 3}
+
+    names = Loader("test_names", fetch)
+    with app.test_request_context("/"):
+        names.prime([1, 2, 3, None, 2])
+        assert [names.get(1), names.get(2), names.get(3)] == [10, 20, None]
+        assert names.get(4) == 40
+        assert calls == [[1, 2, 3], [4]]
+
+
+def test_loader_prime_failure_falls_back(app):
+    def fetch(keys):
+        if len(keys) > 1:
+            raise RuntimeError("boom")
+        return {keys[0]: "one"}
+
+    names = Loader("test_failing", fetch)
+    with app.test_request_context("/"):
+        names.prime([1, 2])
+        assert names.get(1) == "one"
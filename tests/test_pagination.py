@@ -0,0 +1,89 @@
+import base64
+
+from sqlalchemy import event
+
+from autoshop.api.resources.user import UserSchema
+from autoshop.commons.pagination import decode_cursor, encode_cursor, paginate
+from autoshop.models import User
+
+
+def make_users(db, count):
+    for i in range(count):
+        db.session.add(User(username='user%d' % i, email='user%d@mail.com' % i, password='x'))
+    db.session.commit()
+
+
+def test_paginate_after_cursor(app, db):
+    make_users(db, 5)
+    schema = UserSchema(many=True)
+    cursor = (User.date_created, User.id)
+
+    seen = []
+    url = '/api/v1/users?page_size=2&after='
+    while url:
+        with app.test_request_context(url):
+            page = paginate(User.query, schema, cursor=cursor)[0]
+        assert page['total'] == 5
+        seen.extend(user['id'] for user in page['results'])
+        url = page['next']
+    assert seen == [5, 4, 3, 2, 1]
+
+    with app.test_request_context('/api/v1/users?after=bm9wZQ&include_total=false'):
+        assert paginate(User.query, schema, cursor=cursor) == ({'msg': 'Invalid cursor'}, 422)
+
+
+def test_paginate_pages_without_total(app, db):
+    make_users(db, 3)
+    schema = UserSchema(many=True)
+    query = User.query.order_by(User.id)
+
+    with app.test_request_context('/api/v1/users?page=1&page_size=2&include_total=false'):
+        page = paginate(query, schema)[0]
+    assert page['total'] is None
+    assert [user['id'] for user in page['results']] == [1, 2]
+    assert 'page=2' in page['next']
+
+    with app.test_request_context('/api/v1/users?page=2&page_size=2'):
+        page = paginate(query, schema)[0]
+    assert (page['total'], page['pages']) == (3, 2)
+    assert [user['id'] for user in page['results']] == [3]
+    assert 'page=2' in page['next']
+
+
+def test_paginate_without_total_counts_nothing(app, db):
+    make_users(db, 5)
+    schema = UserSchema(many=True)
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for url in ('/api/v1/users?page_size=2&after=&include_total=false',
+                    '/api/v1/users?page=2&page_size=2&include_total=false'):
+            with app.test_request_context(url):
+                paginate(User.query, schema, cursor=(User.date_created, User.id))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert sent
+    assert not any('count(' in statement.lower() for statement in sent)
+
+
+def test_paginate_rejects_bad_page_arguments(app, db):
+    schema = UserSchema(many=True)
+    for args in ('page=two', 'page_size=x', 'page=0', 'page_size=-1&after='):
+        with app.test_request_context('/api/v1/users?' + args):
+            assert paginate(User.query, schema, cursor=(User.id,)) == (
+                {'msg': 'page and page_size must be positive integers'}, 422)
+
+
+def test_cursor_is_signed(app):
+    with app.test_request_context():
+        token = encode_cursor({'balance': 100})
+        assert decode_cursor(token) == {'balance': 100}
+
+        payload, signature = token.rsplit('.', 1)
+        forged = base64.urlsafe_b64encode(b'{"balance":1000000}').decode('ascii')
+        assert decode_cursor(forged + '.' + signature) is None
+        assert decode_cursor(payload) is None
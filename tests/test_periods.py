@@ -0,0 +1,75 @@
+import datetime
+
+import pytest
+
+from autoshop.models import Account, AccountBalance, AccountBalanceSnapshot, Entry, TransactionType
+
+
+@pytest.fixture
+def accounts(db):
+    accounts = [
+        Account(owner_id="customer", acc_type="customer", group="entity"),
+        Account(owner_id="entity", acc_type="entity", group="entity"),
+    ]
+    db.session.add_all(accounts)
+    db.session.add(TransactionType(uuid="bill", name="bill"))
+    db.session.commit()
+    return [account.id for account in accounts]
+
+
+def bill(reference, day, accounts):
+    return Entry(reference=reference, amount=10, tran_type="bill", accounting_date=day,
+                 debit=accounts[0], credit=accounts[1])
+
+
+def test_entries_dated_into_a_closed_period_are_rejected(db, accounts):
+    db.session.add_all([AccountBalance(id=id, balance=100) for id in accounts])
+    db.session.add(AccountBalanceSnapshot(
+        account_id=accounts[0], accounting_period="2026-01", balance=100,
+        closing_date=datetime.date(2026, 1, 31)))
+    db.session.commit()
+
+    closed = (False, {"msg": "The accounting period 2026-01 is closed"}, 422)
+    assert bill("r1", datetime.date(2026, 1, 31), accounts).is_valid() == closed
+    assert bill("r2", datetime.date(2026, 2, 1), accounts).is_valid()[0]
+
+    results = Entry.validate_batch([
+        bill("r3", datetime.date(2026, 2, 1), accounts),
+        bill("r4", datetime.date(2025, 12, 1), accounts),
+    ])
+    assert results[0][0]
+    assert results[1] == (False, {"msg": "The accounting period 2025-12 is closed"}, 422)
+
+
+def balance_as_of(client, headers, account_id, day):
+    rep = client.get(
+        "/api/v1/accounts/%d/balance?as_of=%s" % (account_id, day), headers=headers)
+    assert rep.status_code == 200
+    return rep.get_json()
+
+
+def test_balance_as_of_before_and_after_a_close(client, ledger, accounts, admin_headers):
+    db = ledger
+    customer = accounts[0]
+    db.session.add_all([
+        bill("jan", datetime.date(2026, 1, 10), accounts),
+        bill("feb", datetime.date(2026, 2, 10), accounts),
+    ])
+    db.session.commit()
+
+    before = balance_as_of(client, admin_headers, customer, "2026-01-31")
+    assert (before["balance"], before["snapshot"]) == (-10, None)
+
+    AccountBalanceSnapshot.close("2026-01")
+
+    closed = balance_as_of(client, admin_headers, customer, "2026-01-31")
+    assert closed["balance"] == -10
+    assert closed["snapshot"] == {
+        "accounting_period": "2026-01", "closing_date": "2026-01-31", "balance": -10}
+    later = balance_as_of(client, admin_headers, customer, "2026-02-28")
+    assert (later["balance"], later["snapshot"]["accounting_period"]) == (-20, "2026-01")
+    earlier = balance_as_of(client, admin_headers, customer, "2025-12-31")
+    assert (earlier["balance"], earlier["snapshot"]) == (0, None)
+
+    # the closed period takes no more entries
+    assert bill("late", datetime.date(2026, 1, 20), accounts).is_valid()[2] == 422
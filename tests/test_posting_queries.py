@@ -0,0 +1,68 @@
+from sqlalchemy import event
+
+from autoshop.models import Account, AccountBalance, Entry, TransactionType
+from autoshop.models.charge import Charge, ChargeSplit, Tarriff, fee_schedule, invalidate_fee_schedule
+
+
+def make_account(db, owner_id, balance=0):
+    account = Account(owner_id=owner_id, acc_type="customer", group="entity")
+    db.session.add(account)
+    db.session.flush()
+    db.session.add(AccountBalance(id=account.id, balance=balance))
+    return account
+
+
+def make_tarriff(db, pay_type, splits):
+    tarriff = Tarriff(name=pay_type, tran_type="payment", payment_type=pay_type, entity_id="ALL")
+    db.session.add(tarriff)
+    db.session.flush()
+    db.session.add(Charge(code=tarriff.uuid, min_value=0, max_value=10000,
+                          charge_type="flat", amount="10"))
+    for i in range(splits):
+        account = make_account(db, "%s-split%d" % (pay_type, i))
+        db.session.add(ChargeSplit(code=tarriff.uuid, account_code=account.uuid,
+                                   percentage=100.0 / splits))
+    make_account(db, pay_type)
+
+
+def statements(db, work):
+    """SELECTs and other statements `work` sends"""
+    sent = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement.lstrip().split(None, 1)[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        work()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return sent.count("SELECT"), len(sent) - sent.count("SELECT")
+
+
+def test_posting_reads_do_not_grow_with_splits(db):
+    db.session.add(TransactionType(uuid="payment", name="payment"))
+    customer = make_account(db, "customer", balance=1000)
+    make_account(db, "entity")
+    make_tarriff(db, "cash", 1)
+    make_tarriff(db, "bank", 5)
+    db.session.commit()
+
+    invalidate_fee_schedule()
+    fee_schedule()
+    try:
+        counts = {}
+        for pay_type in ("cash", "bank"):
+            entry = Entry(reference="ref-" + pay_type, amount=100, tran_type="payment",
+                          pay_type=pay_type, entity_id="entity", debit=customer.id,
+                          credit=customer.id)
+            counts[pay_type] = statements(db, entry.transact)
+            db.session.commit()
+    finally:
+        invalidate_fee_schedule()
+
+    assert Entry.query.filter_by(tran_type="charge").count() == 6
+    # the reads are a fixed handful, only the inserted rows grow
+    assert counts["cash"][0] == counts["bank"][0]
+    assert counts["cash"][0] <= 6
+    assert counts["bank"][1] - counts["cash"][1] == 4
@@ -0,0 +1,42 @@
+from autoshop.commons.reference import invalidate
+from autoshop.models import TransactionType
+
+
+def test_reference_list_cached_until_written(client, db, admin_headers):
+    url = '/api/v1/transaction_types'
+    rep = client.post(url, json={'name': 'topup', 'description': 'top up'}, headers=admin_headers)
+    assert rep.status_code == 201
+
+    first = client.get(url, headers=admin_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    # a write behind the API's back is not seen until invalidation
+    db.session.add(TransactionType(name='claim', description='claim'))
+    db.session.commit()
+    assert client.get(url, headers=admin_headers).get_json() == first.get_json()
+
+    rep = client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert rep.status_code == 304
+    assert rep.headers['ETag'] == etag
+
+    rep = client.post(url, json={'name': 'charge', 'description': 'charge'}, headers=admin_headers)
+    assert rep.status_code == 201
+    rep = client.get(url, headers=dict(admin_headers, **{'If-None-Match': etag}))
+    assert rep.status_code == 200
+    assert rep.headers['ETag'] != etag
+    assert rep.get_json()['total'] == 3
+
+
+def test_lookup_served_from_cache(app, db):
+    with app.app_context():
+        db.session.add(TransactionType(name='topup', description='top up'))
+        db.session.commit()
+        assert TransactionType.get(name='topup').description == 'top up'
+
+        db.session.execute("DELETE FROM transaction_type")
+        db.session.commit()
+        assert TransactionType.get(name='topup') is not None
+
+        invalidate(TransactionType)
+        assert TransactionType.get(name='topup') is None
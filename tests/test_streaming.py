@@ -0,0 +1,30 @@
+from autoshop.commons.streaming import stream_json
+
+
+def batches():
+    yield ['{"id": 1}', '{"id": 2}']
+    yield ['{"id": 3}']
+
+
+def test_stream_json_array(app):
+    with app.test_request_context("/"):
+        response = stream_json(batches())
+        assert response.is_streamed
+        assert response.mimetype == "application/json"
+        assert response.get_data() == b'[{"id": 1},{"id": 2},{"id": 3}]'
+
+    with app.test_request_context("/"):
+        assert stream_json(iter([])).get_data() == b"[]"
+
+
+def test_stream_ndjson(app):
+    with app.test_request_context("/", headers={"Accept": "application/x-ndjson"}):
+        response = stream_json(batches())
+        assert response.mimetype == "application/x-ndjson"
+        assert response.get_data() == b'{"id": 1}\n{"id": 2}\n{"id": 3}\n'
+
+    with app.test_request_context("/?format=ndjson"):
+        response = stream_json(batches())
+        assert response.mimetype == "application/x-ndjson"
+        # run the stream to its end, it holds the request context until then
+        response.get_data()
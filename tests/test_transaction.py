@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from autoshop.models import Customer, PaymentType, Transaction, TransactionType
+
+
+@pytest.mark.parametrize("keys", [{"tranid": "t1"}, {"vendor_id": "vendor"}, {}])
+def test_ingest_requires_vendor_and_tranid(db, keys):
+    transaction = Transaction(reference="customer", tran_type="bill", amount="10", **keys)
+    with pytest.raises(Exception) as error:
+        Transaction.ingest(transaction)
+    assert error.value.args == ("A transaction needs a vendor and a tranid", 422)
+    assert Transaction.query.count() == 0
+
+
+def bill(db):
+    customer = Customer(name="Jane", phone="0700", entity_id="entity", type_id="type")
+    db.session.add_all([
+        customer,
+        TransactionType(uuid="bill", name="bill"),
+        PaymentType(uuid="cash", name="cash"),
+    ])
+    db.session.commit()
+    return {
+        "tranid": "t1", "reference": customer.uuid, "is_synchronous": True, "amount": 10,
+        "narration": "bill", "phone": "0700", "tran_type": "bill", "pay_type": "cash",
+    }
+
+
+def test_post_without_a_vendor_is_rejected(client, db, admin_headers):
+    # the admin user belongs to no company, so it has no vendor_id to post under
+    data = bill(db)
+    rep = client.post("/api/v1/transactions", data=json.dumps(data), headers=admin_headers)
+    assert rep.status_code == 422
+    assert rep.get_json() == {"msg": "A transaction needs a vendor and a tranid"}
+    assert Transaction.query.count() == 0
+
+
+@pytest.mark.parametrize("error, status, msg", [
+    (Exception("Insufficient balance", 400), 400, "Insufficient balance"),
+    (ZeroDivisionError("division by zero"), 422, "division by zero"),
+    (Exception(), 422, "The transaction could not be posted"),
+])
+def test_failed_synchronous_post_is_recorded(client, db, admin_headers, monkeypatch, error, status, msg):
+    def ingest(cls, transaction):
+        # ON CONFLICT ... RETURNING needs postgres
+        db.session.add(transaction)
+        db.session.flush()
+        return transaction, True
+
+    def process(self, context=None):
+        raise error
+
+    monkeypatch.setattr(Transaction, "ingest", classmethod(ingest))
+    monkeypatch.setattr(Transaction, "process", process)
+    data = bill(db)
+    rep = client.post("/api/v1/transactions", data=json.dumps(data), headers=admin_headers)
+    assert rep.status_code == status
+    assert rep.get_json() == {"msg": msg}
+
+    # the request committed the failure
+    db.session.rollback()
+    transaction = Transaction.query.one()
+    assert (transaction.status, transaction.processed) == ("FAILED", True)
+    assert transaction.reason == (error.args[0] if error.args else "")
@@ -0,0 +1,44 @@
+from flask import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from autoshop.commons import unit_of_work
+from autoshop.models import User
+
+
+def new_user(name):
+    return User(username=name, email='%s@mail.com' % name, password='x')
+
+
+def test_one_commit_per_request(app, db):
+    commits = []
+
+    def count(session):
+        commits.append(session)
+
+    event.listen(Session, 'after_commit', count)
+    try:
+        with app.test_request_context('/', method='POST'):
+            app.preprocess_request()
+            db.session.add(new_user('first'))
+            unit_of_work.commit()
+            db.session.add(new_user('second'))
+            unit_of_work.commit()
+            assert commits == []
+            app.process_response(Response(status=201))
+        assert len(commits) == 1
+    finally:
+        event.remove(Session, 'after_commit', count)
+    assert User.query.count() == 2
+
+
+def test_rollback_discards_the_request(app, db):
+    with app.test_request_context('/', method='POST'):
+        app.preprocess_request()
+        db.session.add(new_user('first'))
+        unit_of_work.commit()
+        unit_of_work.rollback()
+        db.session.add(new_user('second'))
+        unit_of_work.commit()
+        app.process_response(Response(status=201))
+    assert User.query.count() == 0